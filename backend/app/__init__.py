@@ -1,13 +1,22 @@
 """
 PolyVoice.AI 应用包
+
+导出的对象在第一次访问时才导入对应的模块，导入 app.config、app.local_analysis 等
+轻量模块（例如测试）时不会创建 SpeakingCoach、加载语音模型
 """
 
-from app.speaking_coach import SpeakingCoach
-from app.config import Config
-from app.api import router
+import importlib
+
+_EXPORTS = {
+    'SpeakingCoach': 'app.speaking_coach',
+    'Config': 'app.config',
+    'router': 'app.api',
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    'SpeakingCoach',
-    'Config',
-    'router'
-]
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
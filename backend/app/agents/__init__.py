@@ -4,6 +4,16 @@
 使用AutoGen框架构建的多智能体系统，用于处理语言诊断任务：
 1. 内容提取智能体：分析诊断内容，提取关键信息
 2. 浏览器智能体：搜索并获取相关教学资源
+
+start_diagnosis_session 在第一次访问时才导入AutoGen
 """
 
-from .diagnosis_agents import start_diagnosis_session 
\ No newline at end of file
+import importlib
+
+__all__ = ['start_diagnosis_session']
+
+
+def __getattr__(name):
+    if name == 'start_diagnosis_session':
+        return importlib.import_module('app.agents.diagnosis_agents').start_diagnosis_session
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
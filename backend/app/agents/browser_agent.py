@@ -4,14 +4,20 @@
 使用browser-use框架进行网络搜索和内容提取
 """
 
+import asyncio
 import traceback
 import json
-from typing import Callable
+from typing import Any, Callable, Dict, List, Optional
 from browser_use import Agent
 from app.logger import logger
 from app.config import config as app_config
-from langchain_openai import ChatOpenAI
 from autogen import AssistantAgent
+from app.llm.clients import client_registry
+
+from .browser_pool import browser_pool
+from .search_cache import search_cache
+from .search_fetcher import search_fetcher
+from .schema import ExtractionResult
 
 # 定义一个辅助函数，在新线程中运行异步任务
 def run_async_in_thread(async_func, *args, **kwargs):
@@ -62,6 +68,78 @@ def run_async_in_thread(async_func, *args, **kwargs):
     else:
         raise result[1]  # 失败，重新抛出异常
 
+def parse_search_result(search_result: Any) -> List[Dict[str, str]]:
+    """
+    将browser-use的运行结果解析为搜索结果列表
+    
+    Args:
+        search_result: Agent.run()的返回值
+        
+    Returns:
+        最多5条搜索结果，每项包含title、url和snippet
+    """
+    # browser-use返回运行历史，最终结果是done动作输出的文本
+    if hasattr(search_result, "final_result"):
+        search_result = search_result.final_result()
+    if isinstance(search_result, str):
+        try:
+            search_result = json.loads(search_result)
+        except ValueError:
+            pass
+    
+    # 注意：实际结果格式取决于agent.run()返回的数据结构
+    if isinstance(search_result, list):
+        return search_result[:5]  # 只取前5个结果
+    if isinstance(search_result, dict) and "results" in search_result:
+        return search_result["results"][:5]
+    # 如果返回格式不符合预期，返回原始结果
+    return [{"title": "搜索结果", "url": "", "snippet": str(search_result)}]
+
+
+def merge_results(primary: List[Dict[str, str]], extra: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    合并两组搜索结果，按链接去重
+
+    Args:
+        primary: 优先保留的结果
+        extra: 补充的结果，primary不为空时丢弃没有链接的条目（例如无法解析的浏览器输出）
+
+    Returns:
+        合并后的搜索结果
+    """
+    seen = {result.get("url") for result in primary if result.get("url")}
+    merged = list(primary)
+    for result in extra:
+        url = result.get("url")
+        if url in seen or (primary and not url):
+            continue
+        seen.add(url)
+        merged.append(result)
+    return merged
+
+
+def format_results(results: List[Dict[str, str]]) -> str:
+    """
+    将搜索结果格式化为回复文本
+    
+    Args:
+        results: 搜索结果列表
+        
+    Returns:
+        格式化后的字符串
+    """
+    formatted_results = "我找到了以下相关资源：\n\n"
+    for i, result in enumerate(results, 1):
+        title = result.get("title", "无标题")
+        url = result.get("url", "")
+        snippet = result.get("snippet", "")
+        
+        formatted_results += f"{i}. **{title}**\n"
+        formatted_results += f"   链接: {url}\n"
+        formatted_results += f"   摘要: {snippet}\n\n"
+    return formatted_results
+
+
 class BrowserAgent(AssistantAgent):
 
     def __init__(self, message_callback: Callable = None):
@@ -74,6 +152,8 @@ class BrowserAgent(AssistantAgent):
         
         # 消息回调函数
         self.message_callback = message_callback
+        # 运行浏览器任务的事件循环，为空时在临时线程中运行
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
 
         # 注册消息回复函数（关键代码）
         self.register_reply(
@@ -90,8 +170,113 @@ class BrowserAgent(AssistantAgent):
             callback: 回调函数，将消息添加到列表中
         """
         self.message_callback = callback
+
+    def set_event_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        设置运行浏览器任务的事件循环
+        
+        execute_steps 在AutoGen的工作线程中被调用，浏览器任务会被调度到这个事件循环上执行
+        
+        Args:
+            loop: 主事件循环
+        """
+        self.loop = loop
+
+    def _run_coroutine(self, coro_func):
+        """
+        在主事件循环上运行协程并同步等待结果
+        
+        Args:
+            coro_func: 无参数的异步函数
+            
+        Returns:
+            协程的结果
+        """
+        if self.loop is not None and self.loop.is_running():
+            try:
+                running_loop = asyncio.get_running_loop()
+            except RuntimeError:
+                running_loop = None
+            # 只有在其它线程中才能阻塞等待主循环，否则会死锁
+            if running_loop is not self.loop:
+                return asyncio.run_coroutine_threadsafe(coro_func(), self.loop).result()
+        return run_async_in_thread(coro_func)
         
 
+    async def _run_browser_task(self, task: str):
+        """
+        从浏览器池借出一个隔离的上下文运行browser-use任务
+        
+        Args:
+            task: 浏览器任务描述
+            
+        Returns:
+            browser-use Agent的运行结果
+        """
+        async with browser_pool.context() as browser_context:
+            # 每次搜索创建新的Agent实例，浏览器由池复用
+            browser_agent = Agent(
+                task=task,
+                llm=client_registry.chat_model(app_config.llm[app_config.browser.llm]),
+                browser=browser_context.browser if browser_context else None,
+                browser_context=browser_context,
+                use_vision=False,
+                enable_memory=False
+            )
+            return await browser_agent.run()
+
+    async def search(self, keywords: List[str]) -> List[Dict[str, str]]:
+        """
+        搜索关键词相关的教学资源，优先使用缓存
+        
+        Args:
+            keywords: 搜索关键词列表
+            
+        Returns:
+            搜索结果列表，每项包含title、url和snippet
+        """
+        if search_cache is not None:
+            # SQLite读取和近似匹配扫描放到线程中执行，不阻塞事件循环
+            cached = await asyncio.to_thread(search_cache.get, keywords)
+            if cached is not None:
+                log_message = f"⚡ 命中搜索缓存，共{len(cached)}条结果"
+                logger.info(log_message)
+                if self.message_callback:
+                    self.message_callback(log_message)
+                return cached
+        
+        search_query = ' '.join(keywords)
+        
+        # 快速路径：直接请求搜索结果页，结果足够时不再启动浏览器
+        results = []
+        if search_fetcher is not None:
+            results = await search_fetcher.search(search_query)
+            log_message = f"⚡ 直连搜索获取到{len(results)}条结果"
+            logger.info(log_message)
+            if self.message_callback:
+                self.message_callback(log_message)
+        
+        if len(results) < app_config.search_fetcher.min_results:
+            task = f"从www.bilibili.com网址搜索'{search_query}'的信息。找到至少3个相关结果，提取标题、URL和摘要。"
+            try:
+                search_result = await self._run_browser_task(task)
+            except Exception as e:
+                # 浏览器失败时退回到直连搜索已经拿到的结果
+                if not results:
+                    raise
+                logger.warning(f"浏览器搜索失败，使用直连搜索的{len(results)}条结果: {e}")
+            else:
+                # 记录完成信息
+                log_message = f"✅ 搜索完成，获取到结果"
+                logger.info(log_message)
+                
+                # 直连搜索的结果排在前面，浏览器的结果补足数量
+                results = merge_results(results, parse_search_result(search_result))
+        # 只缓存解析出有效链接的结果
+        if search_cache is not None and any(result.get("url") for result in results):
+            await asyncio.to_thread(search_cache.put, keywords, results)
+        return results
+
     def execute_steps(self, recipient, messages, sender, config):
         """
         处理前一个智能体的返回值，构建搜索查询并执行搜索任务
@@ -103,11 +288,10 @@ class BrowserAgent(AssistantAgent):
         # 如果设置了回调函数，记录接收到的消息
         self.message_callback(f"🔍 浏览器智能体收到消息: {last_message}")
         
-        # 提取关键词
-        keywords = json.loads(last_message).get("search_keywords", [])
-        # 提取诊断摘要
-        diagnosis_summary = json.loads(last_message).get("summary", "")
-        self.message_callback(f"🔍 诊断摘要: {diagnosis_summary}")
+        # 提取关键词和诊断摘要
+        extraction = ExtractionResult.parse(last_message)
+        keywords = extraction.search_keywords
+        self.message_callback(f"🔍 诊断摘要: {extraction.summary}")
         
         # 执行任务
         # 构建搜索查询
@@ -119,48 +303,14 @@ class BrowserAgent(AssistantAgent):
         self.message_callback(log_message)
         
         try:
-            # 每次搜索创建新的Agent实例
-            task = f"从www.bilibili.com网址搜索'{search_query}'的信息。找到至少3个相关结果，提取标题、URL和摘要。"
-            browser_agent = Agent(
-                task=task,
-                llm=ChatOpenAI(
-                    model="gpt-4o-mini",
-                    api_key=app_config.default_llm.api_key,
-                    base_url=app_config.default_llm.base_url,
-                    temperature=app_config.default_llm.temperature
-                ),
-                use_vision=False,
-                enable_memory=False
-            )
-            
-            # 在新线程中运行异步代码
-            search_result = run_async_in_thread(browser_agent.run)
-            
-            # 记录完成信息
-            log_message = f"✅ 搜索完成，获取到结果"
-            logger.info(log_message)
-            
-            # 处理结果并返回
-            # 注意：实际结果格式取决于agent.run()返回的数据结构
-            # 这里假设结果可以解析为我们需要的格式
-            if isinstance(search_result, list):
-                results = search_result[:5]  # 只取前5个结果
-            elif isinstance(search_result, dict) and "results" in search_result:
-                results = search_result["results"][:5]
-            else:
-                # 如果返回格式不符合预期，尝试解析或返回原始结果
-                results = [{"title": "搜索结果", "url": "", "snippet": str(search_result)}]
+            # 在主事件循环上运行搜索
+            results = self._run_coroutine(lambda: self.search(keywords))
             
             # 格式化搜索结果为字符串
-            formatted_results = "我找到了以下相关资源：\n\n"
-            for i, result in enumerate(results, 1):
-                title = result.get("title", "无标题")
-                url = result.get("url", "")
-                snippet = result.get("snippet", "")
-                
-                formatted_results += f"{i}. **{title}**\n"
-                formatted_results += f"   链接: {url}\n"
-                formatted_results += f"   摘要: {snippet}\n\n"
+            formatted_results = format_results(results)
+            
+            if self.message_callback:
+                self.message_callback(formatted_results, "result")
             
             return True, formatted_results
             
@@ -0,0 +1,161 @@
+"""
+浏览器池模块
+
+保持若干个预热好的无头Chromium实例，每个搜索任务使用独立的浏览器上下文，
+任务结束后回收上下文并复用浏览器，避免每次搜索都冷启动浏览器。
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Optional
+
+from browser_use import Browser, BrowserConfig
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+
+from app.config import config
+from app.logger import logger
+
+
+class PooledBrowser:
+    """池中的一个浏览器实例及其使用统计"""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.uses = 0
+        self.created_at = time.monotonic()
+
+    async def is_healthy(self) -> bool:
+        """检查底层Playwright浏览器是否仍然连接"""
+        try:
+            playwright_browser = await self.browser.get_playwright_browser()
+            return playwright_browser.is_connected()
+        except Exception as e:
+            logger.warning(f"浏览器健康检查失败: {e}")
+            return False
+
+    async def close(self):
+        try:
+            await self.browser.close()
+        except Exception as e:
+            logger.warning(f"关闭浏览器失败: {e}")
+
+
+class BrowserPool:
+    """无头浏览器池
+
+    Attributes:
+        max_concurrency: 同时运行的搜索任务上限，也是同时存在的浏览器数量上限
+        max_idle: 空闲时保留的浏览器数量上限
+        max_uses_per_browser: 每个浏览器最多服务的任务数，达到后关闭并重新启动
+        headless: 是否以无头模式运行
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 2,
+        max_idle: int = 1,
+        max_uses_per_browser: int = 20,
+        headless: bool = True
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_idle = max(0, max_idle)
+        self.max_uses_per_browser = max(1, max_uses_per_browser)
+        self.headless = headless
+        self._idle: Deque[PooledBrowser] = deque()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # 浏览器对象绑定在创建它的事件循环上
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self) -> bool:
+        """绑定到当前事件循环，返回当前循环是否可以使用这个池"""
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._loop is loop
+
+    async def _launch(self) -> PooledBrowser:
+        logger.info("启动新的无头浏览器")
+        browser = Browser(config=BrowserConfig(headless=self.headless))
+        # 提前启动Playwright浏览器，把冷启动开销放在这里
+        await browser.get_playwright_browser()
+        return PooledBrowser(browser)
+
+    async def _acquire(self) -> PooledBrowser:
+        """取出一个健康的空闲浏览器，没有则启动新的"""
+        while self._idle:
+            pooled = self._idle.popleft()
+            if await pooled.is_healthy():
+                return pooled
+            await pooled.close()
+        return await self._launch()
+
+    async def _release(self, pooled: PooledBrowser):
+        """归还浏览器，超过使用次数、不健康或空闲已满时关闭"""
+        pooled.uses += 1
+        if (
+            pooled.uses >= self.max_uses_per_browser
+            or len(self._idle) >= self.max_idle
+            or not await pooled.is_healthy()
+        ):
+            await pooled.close()
+            return
+        self._idle.append(pooled)
+
+    @asynccontextmanager
+    async def context(self) -> AsyncIterator[Optional[BrowserContext]]:
+        """
+        获取一个隔离的浏览器上下文，退出时回收
+
+        在非池所属的事件循环中调用时返回None，调用方应自行启动浏览器
+
+        Yields:
+            浏览器上下文或None
+        """
+        if not self._bind_loop():
+            yield None
+            return
+
+        async with self._semaphore:
+            pooled = await self._acquire()
+            try:
+                context = await pooled.browser.new_context(BrowserContextConfig())
+            except Exception:
+                # 连上下文都创建不了的浏览器不再放回池中
+                await pooled.close()
+                raise
+            try:
+                yield context
+            finally:
+                try:
+                    await context.close()
+                except Exception as e:
+                    logger.warning(f"关闭浏览器上下文失败: {e}")
+                await self._release(pooled)
+
+    async def warm_up(self, count: int = 1):
+        """
+        预先启动浏览器放入空闲队列
+
+        Args:
+            count: 预热的浏览器数量，不超过max_idle
+        """
+        if not self._bind_loop():
+            return
+        while len(self._idle) < min(count, self.max_idle):
+            self._idle.append(await self._launch())
+
+    async def close(self):
+        """关闭所有空闲浏览器"""
+        while self._idle:
+            await self._idle.popleft().close()
+
+
+browser_pool = BrowserPool(
+    max_concurrency=config.browser.max_concurrency,
+    max_idle=config.browser.max_idle,
+    max_uses_per_browser=config.browser.max_uses_per_browser,
+    headless=config.browser.headless
+)
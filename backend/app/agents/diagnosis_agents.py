@@ -3,14 +3,17 @@
 
 使用AutoGen构建的多智能体协作系统，负责提取诊断内容并调用浏览器智能体
 """
+import asyncio
 import traceback
 from app.logger import logger
 from app.prompt.diagnosis import DIAGNOSIS_SYSTEM_PROMPT
 from app.prompt.diagnosis_extract import DIAGNOSIS_EXTRACT_SYSTEM_PROMPT
 from autogen import AssistantAgent, GroupChat, GroupChatManager
 from app.config import config
+from app.llm.clients import client_registry
 
 from .browser_agent import BrowserAgent
+from .diagnosis_pipeline import DiagnosisPipeline
 
 class ContentExtractorAgent(AssistantAgent):
     """
@@ -44,27 +47,41 @@ class ContentExtractorAgent(AssistantAgent):
         
         return reply
 
+def build_llm_config() -> dict:
+    """
+    根据默认LLM配置构建AutoGen的llm_config
+    
+    Returns:
+        AutoGen的llm_config字典
+    """
+    return {
+        "config_list": [{
+            "model": config.default_llm.model,
+            "api_key": config.default_llm.api_key,
+            "base_url": config.default_llm.base_url,
+            "api_type": config.default_llm.api_type or "openai",
+            "max_tokens": config.default_llm.max_tokens or 4096,
+            # AutoGen为每个智能体创建OpenAI客户端，共用进程级的连接池
+            "http_client": client_registry.http_client(config.default_llm),
+        }],
+        "temperature": config.default_llm.temperature or 0.7
+    }
+
 class DiagnosisAgents:
     """
     诊断智能体系统，使用AutoGen框架构建
+    
+    每个诊断请求使用独立的实例，消息队列和回调互不干扰，多个请求可以并行处理
     """
     
-    def __init__(self):
+    def __init__(self, llm_config: dict = None):
         """
         初始化诊断智能体系统
         
+        Args:
+            llm_config: AutoGen的llm_config，由多个实例共享，实例不会修改它
         """
-        # 配置LLM，这里使用系统环境变量中的API密钥
-        self.llm_config = {
-            "config_list": [{
-                "model": config.default_llm.model,
-                "api_key": config.default_llm.api_key,
-                "base_url": config.default_llm.base_url,
-                "api_type": config.default_llm.api_type or "openai",
-                "max_tokens": config.default_llm.max_tokens or 4096,
-            }],
-            "temperature": config.default_llm.temperature or 0.7
-        }
+        self.llm_config = llm_config or build_llm_config()
 
         # 创建内容提取智能体，使用自定义的ContentExtractorAgent
         self.contentExtractor = ContentExtractorAgent(
@@ -75,11 +92,15 @@ class DiagnosisAgents:
         self.browserAgent = BrowserAgent()
         
         # 存储要发送到前端的消息
-        self.frontend_messages = []
+        self.frontend_messages: asyncio.Queue = None
     
     async def analyze_content(self, diagnosis_content: str, diagnosis_type: str):
         """
         分析诊断内容并搜索相关资源
+
+        默认使用DiagnosisPipeline直接执行 提取 → 搜索 两步，配置 diagnosis.mode = "autogen"
+        时使用AutoGen群聊，群聊是同步阻塞的，放到线程池中执行。两种方式的回调都通过asyncio队列
+        回到事件循环，日志和结果在产生时就立即推送给客户端
         
         Args:
             diagnosis_content: 诊断内容
@@ -94,45 +115,47 @@ class DiagnosisAgents:
         
         yield {"type": "log", "data": log_message}
         
-        # 清空之前的消息
-        self.frontend_messages = []
+        loop = asyncio.get_running_loop()
+        # 智能体线程产生的消息，None表示对话结束
+        self.frontend_messages = asyncio.Queue()
         
-        # 设置回调函数，用于收集LLM回复
-        def collect_message(message):
-            """普通函数，将消息添加到列表中"""
-            self.frontend_messages.append({"type": "log", "data": message})
+        # 设置回调函数，在智能体线程中调用，把消息投递回事件循环
+        def collect_message(message, event_type="log"):
+            """线程安全地将消息放入队列"""
+            loop.call_soon_threadsafe(self.frontend_messages.put_nowait, {"type": event_type, "data": message})
             
         # 将回调函数设置到ContentExtractor
         self.contentExtractor.set_message_callback(collect_message)
         self.browserAgent.set_message_callback(collect_message)
+        # 浏览器搜索直接调度到当前事件循环，不再为每次搜索创建线程和事件循环
+        self.browserAgent.set_event_loop(loop)
         
+        chat_future = None
         try:
-            extractor_prompt = DIAGNOSIS_EXTRACT_SYSTEM_PROMPT.format(diagnosis_type=diagnosis_type, diagnosis_content=diagnosis_content)
-            
-            groupchat = GroupChat(
-                agents=[
-                    self.contentExtractor,
-                    self.browserAgent
-                ],
-                messages=[],
-                max_round=2,
-                speaker_selection_method="round_robin"  # 使用轮流发言模式，确保每个智能体都有机会发言
-            )
-            manager = GroupChatManager(
-                groupchat=groupchat,
-                llm_config=self.llm_config
-            )
+            if config.diagnosis.mode == "autogen":
+                chat_future = loop.run_in_executor(None, self._run_group_chat, diagnosis_content, diagnosis_type)
+            else:
+                pipeline = DiagnosisPipeline(
+                    extractor=self.contentExtractor,
+                    browser=self.browserAgent,
+                    message_callback=collect_message,
+                    fan_out=config.diagnosis.fan_out,
+                    search_concurrency=config.diagnosis.search_concurrency,
+                    max_results=config.diagnosis.max_results
+                )
+                chat_future = asyncio.ensure_future(pipeline.run(diagnosis_content, diagnosis_type))
+            chat_future.add_done_callback(lambda _: self.frontend_messages.put_nowait(None))
             
-            # 启动对话 - 注意这里要同步调用，不需要await
-            manager.initiate_chat(
-                recipient=self.contentExtractor,  # 发送给内容提取智能体
-                message=extractor_prompt
-            )
-            
-            # 将收集到的消息发送到前端
-            for message in self.frontend_messages:
+            # 消息产生后立即发送到前端
+            while True:
+                message = await self.frontend_messages.get()
+                if message is None:
+                    break
                 yield message
             
+            # 诊断过程中的异常在这里重新抛出
+            await chat_future
+            
             # 完成处理
             yield {"type": "complete", "data": "诊断分析完成"}
             
@@ -141,9 +164,70 @@ class DiagnosisAgents:
             logger.error(error_message)
             logger.error(f"调用栈信息:\n{traceback.format_exc()}")
             yield {"type": "error", "data": error_message}
+        finally:
+            # 客户端断开时停止仍在运行的诊断
+            if chat_future is not None and not chat_future.done():
+                chat_future.cancel()
+
+    def _run_group_chat(self, diagnosis_content: str, diagnosis_type: str):
+        """
+        通过AutoGen群聊运行诊断（同步阻塞，在线程池中执行）
+        
+        Args:
+            diagnosis_content: 诊断内容
+            diagnosis_type: 诊断类型
+        """
+        extractor_prompt = DIAGNOSIS_EXTRACT_SYSTEM_PROMPT.format(diagnosis_type=diagnosis_type, diagnosis_content=diagnosis_content)
+        groupchat = GroupChat(
+            agents=[
+                self.contentExtractor,
+                self.browserAgent
+            ],
+            messages=[],
+            max_round=2,
+            speaker_selection_method="round_robin"  # 使用轮流发言模式，确保每个智能体都有机会发言
+        )
+        manager = GroupChatManager(
+            groupchat=groupchat,
+            llm_config=self.llm_config
+        )
+        
+        # 启动对话 - 同步调用
+        manager.initiate_chat(
+            recipient=self.contentExtractor,  # 发送给内容提取智能体
+            message=extractor_prompt
+        )
+    
+
+class DiagnosisAgentFactory:
+    """
+    诊断智能体工厂
+    
+    只构建一次不可变的配置（llm_config、提示词），为每个请求创建隔离可变状态的智能体实例；
+    模型配置或连接池配置热加载后重新构建llm_config，之后创建的智能体使用新的模型、地址和客户端
+    """
+    
+    def __init__(self):
+        self.llm_config = build_llm_config()
+        for section in ("llm", "http_pool", "resilience"):
+            config.subscribe(section, self._rebuild_llm_config)
+
+    def _rebuild_llm_config(self, settings):
+        """整体替换llm_config，正在运行的诊断继续使用创建时的配置"""
+        self.llm_config = build_llm_config()
+        logger.info(f"诊断智能体已应用新的LLM配置，模型: {config.default_llm.model}")
     
+    def create(self) -> DiagnosisAgents:
+        """
+        为一次诊断请求创建新的智能体实例
+        
+        Returns:
+            新的DiagnosisAgents实例
+        """
+        return DiagnosisAgents(self.llm_config)
+
 
-agents = DiagnosisAgents()
+agent_factory = DiagnosisAgentFactory()
 
 async def start_diagnosis_session(diagnosis_content: str, diagnosis_type: str):
     """
@@ -156,5 +240,6 @@ async def start_diagnosis_session(diagnosis_content: str, diagnosis_type: str):
     Yields:
         处理状态和结果
     """
+    agents = agent_factory.create()
     async for result in agents.analyze_content(diagnosis_content, diagnosis_type):
         yield result
@@ -0,0 +1,206 @@
+"""
+诊断流水线
+
+诊断流程是固定的两步：提取关键词 → 搜索资源。这里直接按顺序执行两个步骤，
+不经过AutoGen的群聊编排，步骤之间传递类型化的中间结果，并且可以对多个关键问题并发搜索。
+"""
+
+import asyncio
+import json
+import re
+from typing import Callable, Dict, List, Set
+
+from app.logger import logger
+from app.prompt.diagnosis_extract import DIAGNOSIS_EXTRACT_SYSTEM_PROMPT
+
+from .browser_agent import format_results
+from .extract_cache import extraction_cache
+from .schema import ExtractionResult, SearchResult
+
+
+class DiagnosisPipeline:
+    """提取 → 搜索 两步诊断流水线
+
+    Attributes:
+        extractor: 内容提取智能体
+        browser: 浏览器智能体，提供异步的search方法
+        message_callback: 消息回调，签名为 callback(message, event_type="log")
+        fan_out: 是否为每个关键问题单独并发搜索
+        search_concurrency: 扇出模式下同时进行的搜索数量上限
+        max_results: 合并后最多返回的结果数
+    """
+
+    def __init__(
+        self,
+        extractor,
+        browser,
+        message_callback: Callable,
+        fan_out: bool = False,
+        search_concurrency: int = 3,
+        max_results: int = 8
+    ):
+        self.extractor = extractor
+        self.browser = browser
+        self.message_callback = message_callback
+        self.fan_out = fan_out
+        self.search_concurrency = max(1, search_concurrency)
+        self.max_results = max_results
+
+    async def run(self, diagnosis_content: str, diagnosis_type: str) -> List[SearchResult]:
+        """
+        执行诊断流水线
+
+        Args:
+            diagnosis_content: 诊断内容
+            diagnosis_type: 诊断类型
+
+        Returns:
+            搜索结果列表
+        """
+        extraction = await self.extract(diagnosis_content, diagnosis_type)
+        self.message_callback(f"🔍 诊断摘要: {extraction.summary}")
+
+        results = await self.search(extraction)
+        self.message_callback(format_results([result.to_dict() for result in results]), "result")
+        return results
+
+    async def extract(self, diagnosis_content: str, diagnosis_type: str) -> ExtractionResult:
+        """
+        提取诊断内容的关键问题和搜索关键词，相同内容直接使用缓存
+
+        Args:
+            diagnosis_content: 诊断内容
+            diagnosis_type: 诊断类型
+
+        Returns:
+            提取结果
+        """
+        if extraction_cache is not None:
+            # 内存未命中时会读取SQLite，放到线程中执行，不阻塞事件循环
+            cached = await asyncio.to_thread(extraction_cache.get, diagnosis_type, diagnosis_content)
+            if cached is not None:
+                log_message = f"⚡ 命中关键词提取缓存: {json.dumps(cached, ensure_ascii=False)}"
+                logger.info(log_message)
+                self.message_callback(log_message)
+                return ExtractionResult.from_dict(cached)
+
+        extractor_prompt = DIAGNOSIS_EXTRACT_SYSTEM_PROMPT.format(diagnosis_type=diagnosis_type, diagnosis_content=diagnosis_content)
+        # AutoGen智能体的调用是同步阻塞的，放到线程中执行
+        reply = await asyncio.to_thread(
+            self.extractor.generate_reply,
+            messages=[{"role": "user", "content": extractor_prompt}]
+        )
+        if isinstance(reply, dict):
+            reply = reply.get("content") or ""
+
+        log_message = f"💬 ContentExtractor响应: {reply}"
+        logger.info(log_message)
+        self.message_callback(log_message)
+
+        extraction = ExtractionResult.parse(reply)
+        if extraction_cache is not None and extraction.search_keywords:
+            await asyncio.to_thread(extraction_cache.put, diagnosis_type, diagnosis_content, extraction.to_dict())
+        return extraction
+
+    async def search(self, extraction: ExtractionResult) -> List[SearchResult]:
+        """
+        搜索提取出的关键词
+
+        扇出模式下每个关键问题单独搜索，在并发上限内并行执行，
+        每个子搜索完成后立即推送部分结果，最后按URL去重并按相关度排序；所有子搜索都失败时抛出异常
+
+        Args:
+            extraction: 提取结果
+
+        Returns:
+            去重排序后的搜索结果
+
+        Raises:
+            RuntimeError: 扇出的子搜索全部失败
+        """
+        keywords = extraction.search_keywords
+        if self.fan_out:
+            queries = [[issue] for issue in extraction.key_issues] or [[keyword] for keyword in keywords]
+        else:
+            queries = []
+        if len(queries) <= 1:
+            queries = [keywords]
+
+        self.message_callback(f"🔍 浏览器智能体开始搜索: {' | '.join(' '.join(query) for query in queries)}")
+        if len(queries) == 1:
+            batches = [await self.browser.search(queries[0])]
+        else:
+            semaphore = asyncio.Semaphore(self.search_concurrency)
+
+            async def search_one(query: List[str]):
+                async with semaphore:
+                    return query, await self.browser.search(query)
+
+            tasks = [asyncio.create_task(search_one(query)) for query in queries]
+            batches = []
+            errors = []
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        query, batch = await next_done
+                    except Exception as e:
+                        logger.warning(f"子搜索失败: {e}")
+                        self.message_callback(f"❌ 子搜索失败: {e}")
+                        errors.append(e)
+                        continue
+                    batches.append(batch)
+                    self.message_callback(f"✅ 「{' '.join(query)}」的搜索结果:\n\n{format_results(batch)}", "partial_result")
+            finally:
+                # 诊断被取消（例如客户端断开）时，停止仍在进行的子搜索
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            # 全部失败时作为诊断错误上报，而不是返回空结果
+            if not batches:
+                raise RuntimeError(f"{len(errors)} 个子搜索全部失败: {errors[-1]}")
+
+        return merge_results(batches, [*extraction.key_issues, *keywords], self.max_results)
+
+
+def _terms(text: str) -> Set[str]:
+    """提取用于相关度计算的词：英文按单词，中文按单字"""
+    return set(re.findall(r"[a-z0-9]+|[\u4e00-\u9fff]", text.lower()))
+
+
+def merge_results(batches: List[List[Dict[str, str]]], query_terms: List[str], max_results: int = 8) -> List[SearchResult]:
+    """
+    合并多个子搜索的结果：按URL去重，按相关度排序
+
+    相关度 = 出现该结果的子搜索数量 + 标题和摘要与查询词的重合程度
+
+    Args:
+        batches: 每个子搜索的结果列表
+        query_terms: 关键问题和搜索关键词
+        max_results: 最多返回的结果数
+
+    Returns:
+        排序后的搜索结果
+    """
+    terms = set().union(*(_terms(term) for term in query_terms)) if query_terms else set()
+    merged: Dict[str, SearchResult] = {}
+    hits: Dict[str, int] = {}
+    order: List[str] = []
+    for batch in batches:
+        for item in batch:
+            result = SearchResult.from_dict(item)
+            # 没有链接的结果无法去重，用标题区分
+            key = result.url or f"title:{result.title}"
+            if key not in merged:
+                merged[key] = result
+                hits[key] = 0
+                order.append(key)
+            hits[key] += 1
+
+    def score(key: str) -> float:
+        result = merged[key]
+        overlap = len(terms & _terms(f"{result.title} {result.snippet}")) / len(terms) if terms else 0.0
+        return hits[key] + overlap
+
+    # sorted是稳定的，相关度相同时保持原始顺序
+    ranked = sorted(order, key=score, reverse=True)
+    return [merged[key] for key in ranked[:max_results]]
@@ -0,0 +1,139 @@
+"""
+关键词提取缓存模块
+
+相同的语法、发音建议会反复出现，ContentExtractor每次都要完整调用一次LLM。
+这里按 (诊断类型, 归一化内容) 缓存提取结果，内存中为LRU，同时持久化到本地SQLite，
+服务重启后依然可以命中。
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import PROJECT_ROOT, config
+from app.logger import logger
+
+
+def extraction_key(diagnosis_type: str, diagnosis_content: str) -> str:
+    """
+    计算提取结果的缓存键，内容忽略大小写和空白差异
+
+    Args:
+        diagnosis_type: 诊断类型
+        diagnosis_content: 诊断内容
+
+    Returns:
+        缓存键
+    """
+    normalized = re.sub(r"\s+", " ", diagnosis_content).strip().lower()
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"{diagnosis_type}:{digest}"
+
+
+class ExtractionCache:
+    """内存LRU加SQLite持久化的提取结果缓存
+
+    Attributes:
+        path: SQLite数据库文件路径，为空时只使用内存
+        max_entries: 内存中最多保留的条目数
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_entries: int = 1024):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """懒加载数据库连接，并在首次使用时建表"""
+        if self.path is None:
+            return None
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS extractions (
+                    key TEXT PRIMARY KEY,
+                    extraction TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key: str, extraction: Dict[str, Any]):
+        self._items[key] = extraction
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def get(self, diagnosis_type: str, diagnosis_content: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的提取结果，内存未命中时查询磁盘
+
+        Args:
+            diagnosis_type: 诊断类型
+            diagnosis_content: 诊断内容
+
+        Returns:
+            提取结果字典，未命中时返回None
+        """
+        key = extraction_key(diagnosis_type, diagnosis_content)
+        with self._lock:
+            extraction = self._items.get(key)
+            if extraction is not None:
+                self._items.move_to_end(key)
+                return extraction
+
+            try:
+                conn = self._connect()
+                if conn is None:
+                    return None
+                row = conn.execute("SELECT extraction FROM extractions WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"读取提取缓存失败: {e}")
+                return None
+            if row is None:
+                return None
+            extraction = json.loads(row[0])
+            self._remember(key, extraction)
+            return extraction
+
+    def put(self, diagnosis_type: str, diagnosis_content: str, extraction: Dict[str, Any]):
+        """
+        写入提取结果
+
+        Args:
+            diagnosis_type: 诊断类型
+            diagnosis_content: 诊断内容
+            extraction: 提取结果，包含key_issues、search_keywords和summary
+        """
+        key = extraction_key(diagnosis_type, diagnosis_content)
+        with self._lock:
+            self._remember(key, extraction)
+            try:
+                conn = self._connect()
+                if conn is None:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO extractions (key, extraction, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(extraction, ensure_ascii=False), time.time())
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"写入提取缓存失败: {e}")
+
+
+extraction_cache = ExtractionCache(
+    path=PROJECT_ROOT / config.extract_cache.path if config.extract_cache.path else None,
+    max_entries=config.extract_cache.max_entries
+) if config.extract_cache.enabled else None
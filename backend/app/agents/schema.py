@@ -0,0 +1,65 @@
+"""
+诊断流程的中间结果类型
+"""
+
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List
+
+
+@dataclass
+class ExtractionResult:
+    """ContentExtractor提取出的诊断信息"""
+    key_issues: List[str] = field(default_factory=list)
+    search_keywords: List[str] = field(default_factory=list)
+    summary: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExtractionResult":
+        return cls(
+            key_issues=list(data.get("key_issues") or []),
+            search_keywords=list(data.get("search_keywords") or []),
+            summary=data.get("summary") or ""
+        )
+
+    @classmethod
+    def parse(cls, reply: str) -> "ExtractionResult":
+        """
+        解析ContentExtractor返回的JSON，兼容LLM用```json代码块包裹的情况
+
+        Args:
+            reply: LLM的回复文本
+
+        Returns:
+            提取结果
+
+        Raises:
+            ValueError: 回复不是合法的JSON
+        """
+        match = re.search(r"```(?:json)?\s*(.*?)```", reply, re.DOTALL)
+        if match:
+            reply = match.group(1)
+        return cls.from_dict(json.loads(reply.strip()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class SearchResult:
+    """一条教学资源搜索结果"""
+    title: str
+    url: str = ""
+    snippet: str = ""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchResult":
+        return cls(
+            title=data.get("title") or "无标题",
+            url=data.get("url") or "",
+            snippet=data.get("snippet") or ""
+        )
+
+    def to_dict(self) -> Dict[str, str]:
+        return asdict(self)
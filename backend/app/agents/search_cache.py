@@ -0,0 +1,174 @@
+"""
+搜索结果缓存模块
+
+学习者反复遇到的问题（复数、冠词、th发音等）会产生相同或几乎相同的搜索关键词，
+这里把格式化前的搜索结果按归一化的关键词集合缓存到本地SQLite，
+重复诊断可以直接返回结果，不需要启动浏览器，也不消耗LLM调用。
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app.config import PROJECT_ROOT, config
+from app.logger import logger
+
+
+def normalize_keywords(keywords: Iterable[str]) -> Tuple[str, ...]:
+    """
+    归一化关键词集合：小写、合并空白、去重并排序，与关键词顺序无关
+
+    Args:
+        keywords: 关键词列表
+
+    Returns:
+        归一化后的关键词元组
+    """
+    normalized = {re.sub(r"\s+", " ", keyword).strip().lower() for keyword in keywords}
+    return tuple(sorted(keyword for keyword in normalized if keyword))
+
+
+def _tokens(keywords: Tuple[str, ...]) -> FrozenSet[str]:
+    return frozenset(token for keyword in keywords for token in keyword.split(" "))
+
+
+def _similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """两个词集合的Jaccard相似度"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class SearchCache:
+    """基于SQLite的搜索结果缓存
+
+    Attributes:
+        path: SQLite数据库文件路径
+        ttl_seconds: 缓存有效期（秒）
+        fuzzy_threshold: 近似匹配的相似度阈值，大于等于1时只做精确匹配
+        fuzzy_scan_limit: 近似匹配时扫描的最近条目数量
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_seconds: float = 7 * 24 * 3600,
+        fuzzy_threshold: float = 0.8,
+        fuzzy_scan_limit: int = 500
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.fuzzy_threshold = fuzzy_threshold
+        self.fuzzy_scan_limit = fuzzy_scan_limit
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """懒加载数据库连接，并在首次使用时建表"""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_results (
+                    key TEXT PRIMARY KEY,
+                    tokens TEXT NOT NULL,
+                    results TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_search_results_created_at ON search_results (created_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, keywords: Iterable[str]) -> Optional[List[Dict[str, str]]]:
+        """
+        读取缓存的搜索结果，先精确匹配，再按词集合相似度近似匹配
+
+        Args:
+            keywords: 搜索关键词列表
+
+        Returns:
+            搜索结果列表，未命中时返回None
+        """
+        normalized = normalize_keywords(keywords)
+        if not normalized:
+            return None
+        key = json.dumps(normalized, ensure_ascii=False)
+        min_created_at = time.time() - self.ttl_seconds
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT results FROM search_results WHERE key = ? AND created_at >= ?",
+                    (key, min_created_at)
+                ).fetchone()
+                if row is not None:
+                    return json.loads(row[0])
+
+                if self.fuzzy_threshold >= 1:
+                    return None
+
+                rows = conn.execute(
+                    "SELECT tokens, results FROM search_results WHERE created_at >= ? "
+                    "ORDER BY created_at DESC LIMIT ?",
+                    (min_created_at, self.fuzzy_scan_limit)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"读取搜索缓存失败: {e}")
+            return None
+
+        tokens = _tokens(normalized)
+        best_score, best_results = 0.0, None
+        for row_tokens, row_results in rows:
+            score = _similarity(tokens, frozenset(row_tokens.split(" ")))
+            if score > best_score:
+                best_score, best_results = score, row_results
+        if best_results is not None and best_score >= self.fuzzy_threshold:
+            logger.info(f"搜索缓存近似命中: {normalized}, 相似度 {best_score:.2f}")
+            return json.loads(best_results)
+        return None
+
+    def put(self, keywords: Iterable[str], results: List[Dict[str, str]]):
+        """
+        写入搜索结果，并顺带清理过期条目
+
+        Args:
+            keywords: 搜索关键词列表
+            results: 搜索结果列表
+        """
+        normalized = normalize_keywords(keywords)
+        if not normalized:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO search_results (key, tokens, results, created_at) VALUES (?, ?, ?, ?)",
+                    (
+                        json.dumps(normalized, ensure_ascii=False),
+                        " ".join(sorted(_tokens(normalized))),
+                        json.dumps(results, ensure_ascii=False),
+                        now
+                    )
+                )
+                conn.execute("DELETE FROM search_results WHERE created_at < ?", (now - self.ttl_seconds,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"写入搜索缓存失败: {e}")
+
+
+search_cache = SearchCache(
+    path=PROJECT_ROOT / config.search_cache.path,
+    ttl_seconds=config.search_cache.ttl_seconds,
+    fuzzy_threshold=config.search_cache.fuzzy_threshold
+) if config.search_cache.enabled else None
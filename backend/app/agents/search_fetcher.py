@@ -0,0 +1,151 @@
+"""
+搜索结果直连抓取模块
+
+直接通过HTTP请求网站的搜索结果页并用轻量的HTML解析器提取标题、链接和摘要，
+作为LLM驱动浏览器之前的快速路径。结果不足时才回退到browser-use智能体。
+"""
+
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import httpx
+
+from app.config import config
+from app.logger import logger
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+}
+
+
+class BilibiliSearchResultParser(HTMLParser):
+    """从B站搜索结果页中提取视频卡片
+
+    每个视频卡片中有指向 /video/ 的链接，标题在链接内 h3 的 title 属性或文本中，
+    UP主名称作为摘要。
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.results: List[Dict[str, str]] = []
+        self._seen_urls = set()
+        self._current: Optional[Dict[str, str]] = None
+        self._in_title = False
+        self._in_author = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        css_class = attrs.get("class") or ""
+        if tag == "a":
+            url = self._normalize_url(attrs.get("href") or "")
+            if "/video/" in url and url not in self._seen_urls:
+                # 同一个卡片里有多个指向视频的链接，沿用尚未填好标题的卡片
+                if self._current is None or self._current["title"]:
+                    self._current = {"title": "", "url": url, "snippet": ""}
+                    self._seen_urls.add(url)
+                    self.results.append(self._current)
+        elif tag == "h3" and self._current is not None and not self._current["title"]:
+            self._current["title"] = (attrs.get("title") or "").strip()
+            self._in_title = not self._current["title"]
+        elif tag == "span" and "author" in css_class and self._current is not None:
+            self._in_author = True
+
+    def handle_endtag(self, tag):
+        if tag == "h3":
+            self._in_title = False
+        elif tag == "span":
+            self._in_author = False
+
+    def handle_data(self, data):
+        if self._current is None:
+            return
+        if self._in_title:
+            self._current["title"] += data
+        elif self._in_author and data.strip():
+            self._current["snippet"] = f"UP主: {data.strip()}"
+
+    def _normalize_url(self, href: str) -> str:
+        """补全协议和域名，并去掉查询参数"""
+        if not href:
+            return ""
+        parts = urlsplit(urljoin(self.base_url, href))
+        return urlunsplit((parts.scheme or "https", parts.netloc, parts.path, "", ""))
+
+    def get_results(self) -> List[Dict[str, str]]:
+        """返回有标题的搜索结果"""
+        return [
+            {**result, "title": " ".join(result["title"].split())}
+            for result in self.results
+            if result["title"].strip()
+        ]
+
+
+class BilibiliSearchFetcher:
+    """通过HTTP直接抓取B站搜索结果
+
+    Attributes:
+        base_url: 搜索站点地址，测试时可以指向本地的HTML夹具服务器
+        timeout: 请求超时时间（秒）
+        max_results: 最多返回的结果数
+    """
+
+    def __init__(self, base_url: str = "https://search.bilibili.com", timeout: float = 5.0, max_results: int = 5):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_results = max_results
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """懒创建共享的异步HTTP客户端，复用连接池"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5)
+            )
+        return self._client
+
+    async def search(self, query: str) -> List[Dict[str, str]]:
+        """
+        搜索关键词并解析结果页
+
+        Args:
+            query: 搜索查询
+
+        Returns:
+            搜索结果列表，请求或解析失败时返回空列表
+        """
+        try:
+            response = await self._get_client().get(f"{self.base_url}/all", params={"keyword": query})
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"直连搜索请求失败: {e}")
+            return []
+
+        parser = BilibiliSearchResultParser(str(response.url))
+        try:
+            parser.feed(response.text)
+            parser.close()
+        except Exception as e:
+            logger.warning(f"解析搜索结果页失败: {e}")
+        return parser.get_results()[:self.max_results]
+
+    async def close(self):
+        """关闭HTTP客户端"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+search_fetcher = BilibiliSearchFetcher(
+    base_url=config.search_fetcher.base_url,
+    timeout=config.search_fetcher.timeout
+) if config.search_fetcher.enabled else None
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, File, HTTPException, UploadFile, Request
+from fastapi import APIRouter, File, HTTPException, UploadFile, Request, Response
 from pydantic import BaseModel, Field
 from sse_starlette.sse import EventSourceResponse
-import json
 import uuid
+from typing import Any, Dict, Optional
 from app.speaking_coach import SpeakingCoach
+from app.whisper_models import TIERS
+from app.event_encoding import encode_event
+from app.event_coalescer import EventCoalescer
+from app.config import config
 from app.logger import logger
 
 router = APIRouter()
@@ -15,12 +19,30 @@ diagnosis_sessions = {}
 # 创建口语教练实例
 speaking_coach = SpeakingCoach()
 
+# 合并逐字产生的文本事件
+event_coalescer = EventCoalescer(
+    max_chars=config.stream.flush_chars,
+    max_delay=config.stream.flush_ms / 1000
+) if config.stream.coalesce else None
+
+
+def _on_stream_changed(settings):
+    """配置热加载后调整合并阈值，开关的变化需要重启后生效"""
+    if event_coalescer is not None:
+        event_coalescer.max_chars = settings.flush_chars
+        event_coalescer.max_delay = settings.flush_ms / 1000
+
+
+config.subscribe("stream", _on_stream_changed)
+
 class ConversationMessage(BaseModel):
     """对话消息模型"""
-    type: str = Field(..., description="消息类型，可以是'text'、'audio'、'error'或'recognized_text'")
-    text: str = Field(..., description="文本内容，对于文本类型消息存储文本内容")
+    type: str = Field(..., description="消息类型，可以是'text'、'audio'、'error'、'recognized_text'或'no_speech'")
+    text: str = Field(..., description="文本内容，对于文本类型消息存储文本内容，音频消息为空")
     # mp3 音频字节转成base64
     audio: str = Field("", description="音频内容，存储为base64编码的字符串，仅当type为'audio'时有值")
+    audio_key: str = Field("", description="音频的内容哈希，可通过 /audio/{audio_key} 获取音频")
+    transcription: Optional[Dict[str, Any]] = Field(None, description="识别结果的逐词时间和置信度，仅当type为'recognized_text'时有值")
 
 
 @router.post("/stream_audio_chat")
@@ -54,17 +76,26 @@ async def upload_audio(
 @router.get("/stream_audio_chat/{session_id}")
 async def stream_audio_chat(
     request: Request,
-    session_id: str
+    session_id: str,
+    compact: bool = False,
+    delta: bool = False,
+    tier: Optional[str] = None
 ):
     """
     流式音频聊天接口
     
     Args:
         session_id: 会话ID
+        compact: 使用紧凑协议：事件直接输出，不重复字段，音频事件只带audio_key，
+            客户端通过 /audio/{audio_key} 以二进制获取音频
+        delta: 增量模式：各部分内容在生成过程中以 {标签}_delta 事件输出，结束时输出 {标签}_done
+        tier: 识别分级：fast优先速度，accurate优先准确度，default为默认模型；为空时按录音时长和置信度自动选择
         
     Returns:
         流式响应
     """
+    if tier is not None and tier not in TIERS:
+        raise HTTPException(status_code=400, detail=f"不支持的识别分级: {tier}，可用选项: {', '.join(TIERS)}")
     try:
         # 获取之前上传的音频数据
         if session_id not in audio_sessions:
@@ -75,23 +106,35 @@ async def stream_audio_chat(
         async def event_generator():
             try:
                 # 使用流式处理音频输入
-                async for response in speaking_coach.process_audio_input_stream(audio_bytes):
+                responses = speaking_coach.process_audio_input_stream(
+                    audio_bytes, session_id, inline_audio=not compact, delta=delta, tier=tier
+                )
+                if event_coalescer is not None:
+                    responses = event_coalescer.coalesce(responses)
+                async for response in responses:
                     if await request.is_disconnected():
                         logger.info("客户端断开连接")
                         break
+                    
+                    if compact:
+                        yield encode_event(response)
+                        continue
                         
-                    # 将响应转换为ConversationMessage格式
+                    # 将响应转换为ConversationMessage格式，音频只放在audio字段，不在text中重复
+                    is_audio = response["type"] == "audio"
                     conversation_message = ConversationMessage(
                         type=response["type"],
-                        text=response.get("data", ""),
-                        audio=response.get("data", "") if response["type"] == "audio" else ""
+                        text="" if is_audio else response.get("data", ""),
+                        audio=response.get("data", "") if is_audio else "",
+                        audio_key=response.get("audio_key", ""),
+                        transcription=response.get("transcription")
                     )
                     
                     # 将ConversationMessage转换为JSON字符串
-                    yield json.dumps(conversation_message.model_dump())
+                    yield encode_event(conversation_message.model_dump())
                 
                 # 输出结束后，发送type=end消息
-                yield json.dumps({"type": "end"})
+                yield encode_event({"type": "end"})
                 
                 # 处理完成后删除会话数据
                 if session_id in audio_sessions:
@@ -99,7 +142,7 @@ async def stream_audio_chat(
                 
             except Exception as e:
                 logger.error(f"流式音频聊天出错: {str(e)}")
-                yield json.dumps({"type": "error", "text": str(e)})
+                yield encode_event({"type": "error", "text": str(e)})
                 
                 # 发生错误时也需要清理
                 if session_id in audio_sessions:
@@ -111,6 +154,30 @@ async def stream_audio_chat(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/audio/{audio_key}")
+async def get_audio(audio_key: str):
+    """
+    按内容哈希获取合成好的音频，用于播放预合成的用户响应建议，以及紧凑协议下的回复音频
+    
+    Args:
+        audio_key: 音频的内容哈希
+        
+    Returns:
+        MP3音频
+    """
+    audio_bytes = await speaking_coach.tts_scheduler.fetch(audio_key, timeout=30)
+    if audio_bytes is None:
+        raise HTTPException(status_code=404, detail="音频不存在或已过期")
+    # 客户端已经取走，之后按LRU正常淘汰
+    speaking_coach.tts_scheduler.cache.unpin(audio_key)
+    # 哈希由文本和语言决定，内容不会变化，允许客户端缓存
+    return Response(
+        content=audio_bytes,
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "private, max-age=3600, immutable"}
+    )
+
+
 class DiagnosisRequest(BaseModel):
     content: str
 
@@ -193,10 +260,10 @@ async def advanced_diagnosis(
                         break
                         
                     # 转换为JSON字符串
-                    yield json.dumps(result)
+                    yield encode_event(result)
                 
                 # 发送完成事件
-                yield json.dumps({"type": "complete", "data": "诊断完成"})
+                yield encode_event({"type": "complete", "data": "诊断完成"})
                 # 处理完成后删除会话数据
                 if session_id in diagnosis_sessions:
                     del diagnosis_sessions[session_id]
@@ -204,7 +271,7 @@ async def advanced_diagnosis(
             except Exception as e:
                 logger.error(f"高级诊断流式处理出错: {str(e)}")
                 logger.error(e.format_exc())
-                yield json.dumps({"type": "error", "data": str(e)})
+                yield encode_event({"type": "error", "data": str(e)})
         
         # 返回SSE响应
         return EventSourceResponse(event_generator())
@@ -0,0 +1,115 @@
+"""
+音频缓存模块
+
+按内容哈希缓存合成好的音频，重复的文本无需再次合成，
+也可以通过哈希直接取回预合成的音频。客户端还没取走的音频可以固定一段时间，不会被淘汰。
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+def audio_key(text: str, language: str) -> str:
+    """
+    计算音频的内容哈希
+
+    Args:
+        text: 合成的文本
+        language: 语言代码
+
+    Returns:
+        十六进制的哈希字符串
+    """
+    return hashlib.sha256(f"{language}\n{text}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """按总字节数限制容量的LRU音频缓存
+
+    固定的条目在取走或到期之前不会被淘汰，固定的音频较多时总大小可能暂时超过上限。
+
+    Attributes:
+        max_bytes: 缓存的最大总字节数
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        """
+        初始化音频缓存
+
+        Args:
+            max_bytes: 缓存的最大总字节数
+        """
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        # 固定的条目及其到期时间（time.monotonic）
+        self._pins: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        读取缓存的音频
+
+        Args:
+            key: 内容哈希
+
+        Returns:
+            音频字节，不存在时返回None
+        """
+        with self._lock:
+            audio_bytes = self._items.get(key)
+            if audio_bytes is not None:
+                self._items.move_to_end(key)
+            return audio_bytes
+
+    def put(self, key: str, audio_bytes: bytes, pin_seconds: float = 0):
+        """
+        写入音频，超出容量时淘汰最久未使用且没有固定的条目
+
+        Args:
+            key: 内容哈希
+            audio_bytes: 音频字节
+            pin_seconds: 固定的秒数，在此期间或调用unpin之前不会被淘汰，0表示不固定
+        """
+        if len(audio_bytes) > self.max_bytes and pin_seconds <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if pin_seconds > 0:
+                self._pins[key] = max(self._pins.get(key, 0), now + pin_seconds)
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = audio_bytes
+            self._size += len(audio_bytes)
+            if self._size > self.max_bytes:
+                self._evict(now)
+
+    def unpin(self, key: str):
+        """
+        取消固定，之后按LRU正常淘汰
+
+        Args:
+            key: 内容哈希
+        """
+        with self._lock:
+            self._pins.pop(key, None)
+
+    def _evict(self, now: float):
+        """从最久未使用的条目开始淘汰，跳过仍在固定期内的条目"""
+        for key in list(self._items):
+            if self._size <= self.max_bytes:
+                break
+            deadline = self._pins.get(key)
+            if deadline is not None:
+                if deadline > now:
+                    continue
+                del self._pins[key]
+            self._size -= len(self._items.pop(key))
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._items
@@ -1,9 +1,11 @@
 import threading
 import tomllib
+import weakref
 from pathlib import Path
-from typing import Dict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from pydantic import BaseModel, Field
+from loguru import logger
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 def get_project_root() -> Path:
@@ -14,7 +16,12 @@ def get_project_root() -> Path:
 PROJECT_ROOT = get_project_root()
 
 
-class LLMSettings(BaseModel):
+class SettingsModel(BaseModel):
+    """不可变的配置段，热加载时整体替换而不是原地修改"""
+    model_config = ConfigDict(frozen=True)
+
+
+class LLMSettings(SettingsModel):
     model: str = Field(..., description="Model name")
     base_url: str = Field(..., description="API base URL")
     api_key: str = Field(..., description="API key")
@@ -22,25 +29,181 @@ class LLMSettings(BaseModel):
     temperature: float = Field(1.0, description="Sampling temperature")
     api_type: str = Field(None, description="AzureOpenai or Openai")
 
-class TTSSettings(BaseModel):
+class TTSSettings(SettingsModel):
     model: str = Field(..., description="Model name")
     model_path: str = Field(..., description="local tts model path")
     language: str = Field(..., description="speak language")
+    workers: int = Field(1, description="number of concurrent synthesis workers")
+    audio_cache_mb: int = Field(64, description="size limit of the synthesized audio cache in MB")
+    audio_pin_seconds: float = Field(300, description="keep audio that clients fetch by audio_key out of eviction until fetched or for this many seconds")
+    presynthesize_suggestions: bool = Field(True, description="synthesize userResponseSuggestion lines in the background")
 
-class WhisperSettings(BaseModel):
+class WhisperSettings(SettingsModel):
     model: str = Field(..., description="Model name")
     whisper_path: str = Field(..., description="local whisper model path")
+    cache_entries: int = Field(128, description="transcripts kept in the in-memory LRU, 0 disables caching")
+    cache_dir: str = Field("", description="on-disk transcript cache directory relative to the project root, empty for memory only")
+    pin_language: bool = Field(True, description="detect the language on the first utterance and reuse it for the session")
+    detect_threshold: float = Field(0.7, description="minimum detection probability required to pin a language")
+    redetect_logprob: float = Field(-1.0, description="re-detect the language when the pinned transcription's mean logprob falls below this")
+    device: str = Field("auto", description="faster-whisper device: cpu, cuda or auto")
+    compute_type: str = Field("int8", description="faster-whisper compute type, e.g. int8, int8_float16, float16")
+    cpu_threads: int = Field(8, description="CPU threads per loaded model")
+    num_workers: int = Field(2, description="concurrent transcriptions per loaded model")
+    fast_model: str = Field("", description="model used for short utterances, empty disables the fast tier")
+    accurate_model: str = Field("", description="model used for long or low-confidence utterances, empty disables the accurate tier")
+    tier_path: str = Field("models/whisper-{model}", description="directory of tier models other than the default, {model} is the model size")
+    fast_max_duration: float = Field(4.0, description="utterances up to this many seconds of speech use the fast tier")
+    accurate_min_duration: float = Field(0.0, description="utterances at least this long use the accurate tier, 0 disables")
+    escalate_logprob: float = Field(-0.8, description="retranscribe with the next larger tier when the mean logprob falls below this")
+    memory_budget_mb: int = Field(0, description="memory budget for loaded models in MB, least recently used tiers are unloaded, 0 is unlimited")
+    preload_tiers: bool = Field(False, description="load every tier at startup instead of on first use")
+
+class CoachSettings(SettingsModel):
+    analysis_mode: str = Field("llm", description="llm asks the LLM for suggestions, local uses rule-based analysis")
+    low_confidence_threshold: float = Field(0.5, description="word probability below which a pronunciation hint is given")
+
+
+class RouterSettings(SettingsModel):
+    enabled: bool = Field(False, description="route LLM streams across several [llm.<name>] providers")
+    providers: List[str] = Field(default_factory=lambda: ["default"], description="provider names from [llm.<name>], default is [llm] only")
+    hedge_after: float = Field(2.0, description="seconds to wait for the first token before hedging to the next provider")
+    window_size: int = Field(20, description="recent requests kept per provider for latency and error statistics")
+    error_threshold: float = Field(0.5, description="error rate at which a provider is considered unhealthy")
+    cooldown: float = Field(30.0, description="seconds after the last failure before an unhealthy provider is retried")
+
+
+class HTTPPoolSettings(SettingsModel):
+    max_connections: int = Field(20, description="connections per shared LLM HTTP client")
+    max_keepalive_connections: int = Field(10, description="idle connections kept alive per shared client")
+    keepalive_expiry: float = Field(60.0, description="seconds an idle connection is kept")
+
+
+class ResilienceSettings(SettingsModel):
+    enabled: bool = Field(True, description="wrap LLM requests with timeouts, retries and a circuit breaker")
+    connect_timeout: float = Field(5.0, description="seconds allowed to establish the HTTP connection")
+    first_token_timeout: float = Field(30.0, description="seconds allowed until the first streamed token")
+    inter_token_timeout: float = Field(15.0, description="seconds allowed between two streamed tokens")
+    max_retries: int = Field(2, description="retries before the first token is emitted")
+    backoff_base: float = Field(0.5, description="base backoff in seconds, doubled per retry with full jitter")
+    backoff_max: float = Field(4.0, description="cap on a single backoff in seconds")
+    failure_threshold: int = Field(5, description="consecutive failures that open the circuit")
+    reset_timeout: float = Field(30.0, description="seconds the circuit stays open before a probe request")
+
+
+class ResponseCacheSettings(SettingsModel):
+    enabled: bool = Field(False, description="cache LLM responses for requests with a short history")
+    max_entries: int = Field(256, description="responses kept in the LRU")
+    ttl_seconds: float = Field(24 * 3600, description="how long cached responses stay valid")
+    max_history: int = Field(1, description="cache requests with at most this many conversation messages, 1 caches first turns only")
+    normalize: bool = Field(True, description="fall back to matching case, punctuation and whitespace insensitive text")
+    replay_speed: float = Field(1.0, description="speed multiplier for replaying cached chunks, 0 replays without pacing")
+    max_chunk_delay: float = Field(0.05, description="cap in seconds on the replayed gap between two chunks")
+
+
+class VADSettings(SettingsModel):
+    enabled: bool = Field(True, description="trim silence and reject uploads without speech before transcription")
+    frame_ms: int = Field(30, description="analysis frame length in milliseconds")
+    threshold_db: float = Field(-45.0, description="minimum frame energy in dBFS counted as speech")
+    margin_db: float = Field(10.0, description="dB a speech frame must exceed the estimated noise floor by")
+    min_speech_ms: int = Field(250, description="total speech below this duration is treated as no speech")
+    padding_ms: int = Field(200, description="audio kept on both sides of the detected speech")
+
+
+class StreamSettings(SettingsModel):
+    coalesce: bool = Field(True, description="merge consecutive streamed text events before sending them")
+    flush_chars: int = Field(64, description="send buffered text once it reaches this many characters")
+    flush_ms: int = Field(30, description="send buffered text at most this many milliseconds after its first character")
+
+
+class BrowserSettings(SettingsModel):
+    headless: bool = Field(True, description="run browsers in headless mode")
+    max_concurrency: int = Field(2, description="maximum number of concurrent browser tasks")
+    max_idle: int = Field(1, description="number of warm browsers kept when idle")
+    max_uses_per_browser: int = Field(20, description="tasks served before a browser is recycled")
+    warm_up: bool = Field(True, description="launch max_idle browsers in the background at startup")
+    llm: str = Field("default", description="[llm.<name>] entry driving the browser agent, default is [llm]")
+
+
+class SearchCacheSettings(SettingsModel):
+    enabled: bool = Field(True, description="cache diagnosis search results")
+    path: str = Field("data/search_cache.sqlite3", description="sqlite file path relative to the project root")
+    ttl_seconds: float = Field(7 * 24 * 3600, description="how long cached results stay valid")
+    fuzzy_threshold: float = Field(0.8, description="keyword-set similarity for near matches, 1 disables fuzzy matching")
 
 
+class SearchFetcherSettings(SettingsModel):
+    enabled: bool = Field(True, description="try a plain HTTP search before the LLM browser agent")
+    base_url: str = Field("https://search.bilibili.com", description="search site base URL")
+    timeout: float = Field(5.0, description="HTTP request timeout in seconds")
+    min_results: int = Field(3, description="fall back to the browser agent below this many results")
 
-class AppConfig(BaseModel):
+
+class ExtractCacheSettings(SettingsModel):
+    enabled: bool = Field(True, description="memoize ContentExtractor keyword extraction")
+    path: str = Field("data/extract_cache.sqlite3", description="sqlite file path relative to the project root, empty for memory only")
+    max_entries: int = Field(1024, description="entries kept in the in-memory LRU")
+
+
+class DiagnosisSettings(SettingsModel):
+    mode: str = Field("pipeline", description="pipeline runs extract then search directly, autogen uses a GroupChat")
+    fan_out: bool = Field(False, description="search each key issue concurrently in pipeline mode")
+    search_concurrency: int = Field(3, description="maximum concurrent sub-searches when fanning out")
+    max_results: int = Field(8, description="results kept after merging sub-searches")
+
+
+class HotReloadSettings(SettingsModel):
+    enabled: bool = Field(True, description="watch the config file and apply changes without a restart")
+    interval: float = Field(2.0, description="seconds between checks of the config file's modification time")
+
+
+class AppConfig(SettingsModel):
     """存储LLM的配置"""
     llm: Dict[str, LLMSettings]
     tts: TTSSettings
     whisper: WhisperSettings
+    coach: CoachSettings = Field(default_factory=CoachSettings)
+    router: RouterSettings = Field(default_factory=RouterSettings)
+    http_pool: HTTPPoolSettings = Field(default_factory=HTTPPoolSettings)
+    resilience: ResilienceSettings = Field(default_factory=ResilienceSettings)
+    response_cache: ResponseCacheSettings = Field(default_factory=ResponseCacheSettings)
+    vad: VADSettings = Field(default_factory=VADSettings)
+    stream: StreamSettings = Field(default_factory=StreamSettings)
+    browser: BrowserSettings = Field(default_factory=BrowserSettings)
+    search_cache: SearchCacheSettings = Field(default_factory=SearchCacheSettings)
+    search_fetcher: SearchFetcherSettings = Field(default_factory=SearchFetcherSettings)
+    extract_cache: ExtractCacheSettings = Field(default_factory=ExtractCacheSettings)
+    diagnosis: DiagnosisSettings = Field(default_factory=DiagnosisSettings)
+    hot_reload: HotReloadSettings = Field(default_factory=HotReloadSettings)
+
+    @model_validator(mode="after")
+    def _check_llm_names(self) -> "AppConfig":
+        """引用 [llm.<name>] 的配置在加载时检查名称，而不是等到第一次诊断时才出错"""
+        if self.browser.llm not in self.llm:
+            raise ValueError(
+                f"[browser] llm = \"{self.browser.llm}\" 没有对应的 [llm.{self.browser.llm}] 配置，"
+                f"可用选项: {', '.join(self.llm)}"
+            )
+        if not self.router.providers:
+            raise ValueError("[router] providers 至少需要一个提供方")
+        unknown = [name for name in self.router.providers if name not in self.llm]
+        if unknown:
+            raise ValueError(
+                f"[router] providers 中的 {', '.join(unknown)} 没有对应的 [llm.<name>] 配置，"
+                f"可用选项: {', '.join(self.llm)}"
+            )
+        return self
+
+# 修改后需要重新加载模型才能生效的配置段，热加载时只给出提示
+RESTART_SECTIONS = ("tts", "whisper")
+
 
 class Config:
-    """单例模式：获取LLM的配置，把AppConfig保存进_instance中"""
+    """单例模式：获取LLM的配置，把AppConfig保存进_instance中
+
+    配置文件变化时可以热加载：重新解析后整体替换不可变的AppConfig，
+    再通知订阅了变化配置段的组件。读取配置的代码每次通过属性访问即可拿到最新的配置。
+    """
     _instance = None
     _lock = threading.Lock()
     _initialized = False
@@ -59,6 +222,11 @@ class Config:
             with self._lock:
                 if not self._initialized:
                     self._config = None
+                    self._file_state: Optional[Tuple[Path, int, int]] = None
+                    self._reload_lock = threading.Lock()
+                    self._subscribers: Dict[str, List[Callable[[], Optional[Callable]]]] = {}
+                    self._watcher: Optional[threading.Thread] = None
+                    self._stop_watching = threading.Event()
                     self._load_initial_config()
                     self._initialized = True
 
@@ -73,17 +241,41 @@ class Config:
             return example_path
         raise FileNotFoundError("No configuration file found in config directory")
 
+    @staticmethod
+    def _stat(config_path: Path) -> Tuple[Path, int, int]:
+        stat = config_path.stat()
+        return (config_path, stat.st_mtime_ns, stat.st_size)
+
     def _load_config(self) -> dict:
         config_path = self._get_config_path()
+        # 先记录文件状态再读取，读取期间的修改会在下一次检查时发现
+        self._file_state = self._stat(config_path)
         with config_path.open("rb") as f:
             return tomllib.load(f)
 
     def _load_initial_config(self):
         """Load the configuration"""
-        raw_config = self._load_config()
+        self._config = self._build_config(self._load_config())
+
+    @staticmethod
+    def _build_config(raw_config: dict) -> AppConfig:
+        """把解析后的TOML转换为AppConfig"""
         base_llm = raw_config.get("llm", {})
         base_tts = raw_config.get("tts", {})
         base_whisper = raw_config.get("whisper", {})
+        base_coach = raw_config.get("coach", {})
+        base_router = raw_config.get("router", {})
+        base_http_pool = raw_config.get("http_pool", {})
+        base_resilience = raw_config.get("resilience", {})
+        base_response_cache = raw_config.get("response_cache", {})
+        base_vad = raw_config.get("vad", {})
+        base_stream = raw_config.get("stream", {})
+        base_browser = raw_config.get("browser", {})
+        base_search_cache = raw_config.get("search_cache", {})
+        base_search_fetcher = raw_config.get("search_fetcher", {})
+        base_extract_cache = raw_config.get("extract_cache", {})
+        base_diagnosis = raw_config.get("diagnosis", {})
+        base_hot_reload = raw_config.get("hot_reload", {})
         # [llm.openai] 会被解析为 {llm: {openai: {}}} 
         llm_overrides = {
             k: v for k, v in raw_config.get("llm", {}).items() if isinstance(v, dict)
@@ -109,10 +301,111 @@ class Config:
                 },
             },
             "tts": base_tts,
-            "whisper": base_whisper
+            "whisper": base_whisper,
+            "coach": base_coach,
+            "router": base_router,
+            "http_pool": base_http_pool,
+            "resilience": base_resilience,
+            "response_cache": base_response_cache,
+            "vad": base_vad,
+            "stream": base_stream,
+            "browser": base_browser,
+            "search_cache": base_search_cache,
+            "search_fetcher": base_search_fetcher,
+            "extract_cache": base_extract_cache,
+            "diagnosis": base_diagnosis,
+            "hot_reload": base_hot_reload
         }
 
-        self._config = AppConfig(**config_dict)
+        return AppConfig(**config_dict)
+
+    def subscribe(self, section: str, callback: Callable[[Any], None]):
+        """
+        订阅配置段的变化
+
+        热加载后该配置段与之前不同时调用 callback(新的配置段)，回调在检查配置文件的线程中执行。
+        绑定方法以弱引用保存，组件被回收后自动取消订阅。
+
+        Args:
+            section: 配置段名称，与AppConfig的字段相同，例如 "llm"、"http_pool"
+            callback: 回调函数
+        """
+        if hasattr(callback, "__self__"):
+            ref = weakref.WeakMethod(callback)
+        else:
+            ref = lambda: callback
+        with self._reload_lock:
+            self._subscribers.setdefault(section, []).append(ref)
+
+    def reload(self) -> List[str]:
+        """
+        配置文件有变化时重新解析并替换配置
+
+        只比较文件的修改时间和大小，没有变化时不解析。新的配置校验失败时保留原来的配置。
+
+        Returns:
+            发生变化的配置段名称
+        """
+        with self._reload_lock:
+            try:
+                if self._stat(self._get_config_path()) == self._file_state:
+                    return []
+                new_config = self._build_config(self._load_config())
+            except Exception as e:
+                logger.error(f"重新加载配置失败，继续使用原来的配置: {e}")
+                return []
+
+            old_config, self._config = self._config, new_config
+            changed = [
+                name for name in AppConfig.model_fields
+                if getattr(old_config, name) != getattr(new_config, name)
+            ]
+            callbacks = []
+            for name in changed:
+                refs = self._subscribers.get(name, [])
+                alive = [(ref, ref()) for ref in refs]
+                self._subscribers[name] = [ref for ref, callback in alive if callback is not None]
+                callbacks.extend((name, callback) for _, callback in alive if callback is not None)
+
+        if not changed:
+            return changed
+        logger.info(f"配置已重新加载，变化的配置段: {', '.join(changed)}")
+        for name in changed:
+            if name in RESTART_SECTIONS:
+                logger.warning(f"[{name}] 的修改需要重启服务后才能生效")
+        for name, callback in callbacks:
+            try:
+                callback(getattr(new_config, name))
+            except Exception as e:
+                logger.error(f"应用 [{name}] 配置变化失败: {e}")
+        return changed
+
+    def start_watching(self, interval: Optional[float] = None):
+        """
+        启动后台线程，定期检查配置文件并热加载
+
+        Args:
+            interval: 检查间隔（秒），为None时使用 [hot_reload] 配置
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        interval = interval or self._config.hot_reload.interval
+        self._stop_watching.clear()
+
+        def watch():
+            while not self._stop_watching.wait(interval):
+                self.reload()
+
+        self._watcher = threading.Thread(target=watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"已启动配置文件热加载，检查间隔 {interval}s")
+
+    def stop_watching(self):
+        """停止检查配置文件"""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
 
     @property
     def llm(self) -> Dict[str, LLMSettings]:
@@ -126,6 +419,62 @@ class Config:
     def tts(self) -> TTSSettings:
         return self._config.tts
         
+    @property
+    def whisper(self) -> WhisperSettings:
+        return self._config.whisper
+        
+    @property
+    def coach(self) -> CoachSettings:
+        return self._config.coach
+        
+    @property
+    def router(self) -> RouterSettings:
+        return self._config.router
+        
+    @property
+    def http_pool(self) -> HTTPPoolSettings:
+        return self._config.http_pool
+        
+    @property
+    def resilience(self) -> ResilienceSettings:
+        return self._config.resilience
+        
+    @property
+    def response_cache(self) -> ResponseCacheSettings:
+        return self._config.response_cache
+        
+    @property
+    def vad(self) -> VADSettings:
+        return self._config.vad
+        
+    @property
+    def stream(self) -> StreamSettings:
+        return self._config.stream
+        
+    @property
+    def browser(self) -> BrowserSettings:
+        return self._config.browser
+    
+    @property
+    def search_cache(self) -> SearchCacheSettings:
+        return self._config.search_cache
+    
+    @property
+    def search_fetcher(self) -> SearchFetcherSettings:
+        return self._config.search_fetcher
+    
+    @property
+    def extract_cache(self) -> ExtractCacheSettings:
+        return self._config.extract_cache
+    
+    @property
+    def diagnosis(self) -> DiagnosisSettings:
+        return self._config.diagnosis
+        
+    @property
+    def hot_reload(self) -> HotReloadSettings:
+        return self._config.hot_reload
+        
     @property
     def TTS_MODEL_DIR(self) -> Path:
         """获取TTS模型目录"""
@@ -0,0 +1,119 @@
+"""
+流式事件合并模块
+
+LLM的流式输出会产生大量很短的 text 和 {标签}_delta 事件，每个事件都要单独序列化并写一次网络。
+这里在SpeakingCoach和EventSourceResponse之间按大小或时间合并连续的同类文本事件：
+缓冲的字符数达到上限，或第一个字符已经等待超过时限时立即发送，其余事件原样按顺序透传。
+"""
+
+import asyncio
+import contextlib
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, FrozenSet, Iterable, List, Optional
+
+# 默认可以合并的事件类型：标签外的文本和增量模式下各部分的增量文本
+MERGEABLE_TYPES = frozenset({
+    "text",
+    "response_delta",
+    "pronunciationSuggestion_delta",
+    "grammarSuggestion_delta",
+    "userResponseSuggestion_delta",
+})
+
+
+class EventCoalescer:
+    """按大小或时间合并连续的文本事件
+
+    只合并只有type和data两个字段、data为字符串的事件，
+    带有其它字段的事件（例如音频）会先发送已缓冲的文本再原样发送。
+
+    Attributes:
+        max_chars: 缓冲的字符数达到该值时立即发送
+        max_delay: 缓冲的第一个字符最多等待的秒数
+        types: 可以合并的事件类型
+    """
+
+    def __init__(
+        self,
+        max_chars: int = 64,
+        max_delay: float = 0.03,
+        types: Iterable[str] = MERGEABLE_TYPES
+    ):
+        self.max_chars = max_chars
+        self.max_delay = max_delay
+        self.types: FrozenSet[str] = frozenset(types)
+
+    def _mergeable(self, event: Dict[str, Any]) -> bool:
+        return (
+            event.get("type") in self.types
+            and isinstance(event.get("data"), str)
+            and len(event) == 2
+        )
+
+    async def coalesce(self, events: AsyncIterator[Dict[str, Any]]) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        合并事件流
+
+        Args:
+            events: 原始事件流
+
+        Yields:
+            合并后的事件，顺序与原始事件一致
+        """
+        loop = asyncio.get_running_loop()
+        iterator = events.__aiter__()
+        pending: Optional[asyncio.Future] = None
+        buffer_type: Optional[str] = None
+        parts: List[str] = []
+        size = 0
+        deadline: Optional[float] = None
+
+        def flush() -> Dict[str, Any]:
+            nonlocal buffer_type, parts, size, deadline
+            event = {"type": buffer_type, "data": "".join(parts)}
+            buffer_type, parts, size, deadline = None, [], 0, None
+            return event
+
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    # 超时，发送已缓冲的文本，继续等待同一个事件
+                    yield flush()
+                    continue
+
+                task, pending = pending, None
+                try:
+                    event = task.result()
+                except StopAsyncIteration:
+                    break
+
+                if not self._mergeable(event):
+                    if parts:
+                        yield flush()
+                    yield event
+                    continue
+
+                if parts and event["type"] != buffer_type:
+                    yield flush()
+                if not parts:
+                    buffer_type = event["type"]
+                    deadline = loop.time() + self.max_delay
+                parts.append(event["data"])
+                size += len(event["data"])
+                if size >= self.max_chars:
+                    yield flush()
+
+            if parts:
+                yield flush()
+        finally:
+            # 提前结束（例如客户端断开）时，先停止正在等待的事件再关闭原始事件流
+            if pending is not None and not pending.done():
+                pending.cancel()
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await pending
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
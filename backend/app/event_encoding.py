@@ -0,0 +1,29 @@
+"""
+SSE事件编码模块
+
+流式接口每秒要编码大量事件，这里优先使用orjson序列化，没有安装时退回标准库json。
+输出不转义非ASCII字符、不带多余空白，中文内容的体积也更小。
+"""
+
+import json
+from typing import Any, Dict
+
+try:
+    import orjson
+except ImportError:  # orjson是可选依赖
+    orjson = None
+
+
+def encode_event(event: Dict[str, Any]) -> str:
+    """
+    将事件序列化为紧凑的JSON字符串
+
+    Args:
+        event: 事件字典
+
+    Returns:
+        JSON字符串
+    """
+    if orjson is not None:
+        return orjson.dumps(event).decode("utf-8")
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"))
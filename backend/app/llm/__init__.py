@@ -5,8 +5,14 @@
 
 from app.llm.base import BaseLLM
 from app.llm.openaiLLM import OpenaiLLM
+from app.llm.resilient import ResilientLLM
+from app.llm.router import LLMRouter
+from app.llm.cache import CachingLLM
 
 __all__ = [
     'BaseLLM',
     'OpenaiLLM',
+    'ResilientLLM',
+    'LLMRouter',
+    'CachingLLM',
 ] 
\ No newline at end of file
@@ -15,13 +15,19 @@ class BaseLLM(ABC):
         """
         初始化大语言模型基类
         """
+        self._apply_settings(config)
+        
+        self._initialize_client()
+    
+    def _apply_settings(self, config):
+        """
+        读取模型配置，配置热加载后也通过它更新
+        """
         self.model_name=config.model
         self.api_key=config.api_key
         self.base_url=config.base_url
         self.max_tokens=config.max_tokens
         self.temperature=config.temperature
-        
-        self._initialize_client()
     
     @abstractmethod
     def _initialize_client(self):
@@ -0,0 +1,280 @@
+"""
+LLM响应缓存
+
+很多会话的第一句几乎相同（"Hi, how are you?"），历史为空时发给LLM的是同样的系统提示词加同样的用户消息。
+这里缓存历史较短的请求的完整文本块序列，命中时按记录的节奏回放，首个token立即返回。
+回放的文本与原来一致，规范化后的句子相同，语音合成会直接命中按内容哈希的音频缓存。
+
+先按消息原文精确匹配，未命中时再按规范化的文本匹配（忽略大小写、标点和多余空白）。
+"""
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import AsyncGenerator, Dict, List, Optional, Union
+
+from app.config import config
+from app.llm.base import BaseLLM
+from app.logger import logger
+
+# 规范化匹配时忽略的字符
+PUNCTUATION = re.compile(r"[^\w\s]+")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(text: str) -> str:
+    """
+    规范化消息文本：小写，去掉标点，合并空白
+
+    Args:
+        text: 消息文本
+
+    Returns:
+        规范化后的文本
+    """
+    return WHITESPACE.sub(" ", PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+def messages_key(namespace: str, messages: List[Dict[str, str]], normalize: bool = False) -> str:
+    """
+    计算消息列表的缓存键
+
+    系统提示词总是按原文参与计算，normalize只作用于对话消息
+
+    Args:
+        namespace: 区分不同模型的前缀
+        messages: 消息列表
+        normalize: 是否规范化对话消息
+
+    Returns:
+        十六进制的哈希字符串
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(namespace.encode("utf-8") + b"\0")
+    digest.update(b"n" if normalize else b"e")
+    for message in messages:
+        content = message.get("content", "")
+        if normalize and message.get("role") != "system":
+            content = normalize_message(content)
+        digest.update(f"\0{message.get('role')}\0{content}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@dataclass
+class CachedResponse:
+    """缓存的流式响应
+
+    Attributes:
+        chunks: 文本块
+        delays: 每个文本块与上一个文本块的间隔（秒），第一个为首个token延迟
+        created_at: 写入时间
+    """
+    chunks: List[str]
+    delays: List[float]
+    created_at: float
+
+    @property
+    def text(self) -> str:
+        return "".join(self.chunks)
+
+
+class ResponseCache:
+    """按条目数限制容量、带过期时间的LRU响应缓存
+
+    Attributes:
+        max_entries: 最多保留的条目数
+        ttl_seconds: 条目的有效期（秒）
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        读取缓存的响应，过期的条目会被删除
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            缓存的响应，未命中时返回None
+        """
+        with self._lock:
+            response = self._items.get(key)
+            if response is None:
+                return None
+            if time.monotonic() - response.created_at > self.ttl_seconds:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return response
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._items.clear()
+
+    def put(self, keys: List[str], response: CachedResponse):
+        """
+        写入响应，同一个响应可以对应多个键
+
+        Args:
+            keys: 缓存键
+            response: 响应
+        """
+        with self._lock:
+            for key in keys:
+                self._items[key] = response
+                self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+class CachingLLM(BaseLLM):
+    """为历史较短的请求缓存响应的LLM包装
+
+    Attributes:
+        llm: 实际请求的模型
+        cache: 响应缓存
+        max_history: 参与缓存的请求最多包含的对话消息数（不含系统提示词），1表示只缓存第一轮
+        normalize: 精确匹配未命中时是否按规范化的文本匹配
+        replay_speed: 回放速度倍数，0表示不等待直接输出
+        max_chunk_delay: 回放时相邻文本块的最大间隔（秒）
+    """
+
+    def __init__(self, llm: BaseLLM, cache: Optional[ResponseCache] = None):
+        """
+        初始化响应缓存包装
+
+        Args:
+            llm: 实际请求的模型
+            cache: 响应缓存，为None时按 [response_cache] 配置创建
+        """
+        self.llm = llm
+        self.cache = cache
+        super().__init__(config.default_llm)
+
+    def _initialize_client(self):
+        settings = config.response_cache
+        if self.cache is None:
+            self.cache = ResponseCache(settings.max_entries, settings.ttl_seconds)
+        self._apply_response_cache(settings)
+        config.subscribe("response_cache", self._apply_response_cache)
+        # 模型或地址变化后，之前缓存的响应不再代表当前模型
+        config.subscribe("llm", self._on_llm_changed)
+
+    def _apply_response_cache(self, settings):
+        """读取 [response_cache] 配置，配置热加载后也通过它更新"""
+        self.cache.max_entries = settings.max_entries
+        self.cache.ttl_seconds = settings.ttl_seconds
+        self.max_history = settings.max_history
+        self.normalize = settings.normalize
+        self.replay_speed = settings.replay_speed
+        self.max_chunk_delay = settings.max_chunk_delay
+
+    def _on_llm_changed(self, llm):
+        self.cache.clear()
+
+    def _keys(self, messages: List[Dict[str, str]], stop: Optional[Union[str, List[str]]]) -> List[str]:
+        """可缓存的请求返回精确匹配和规范化匹配的键，否则返回空列表
+
+        只缓存历史不超过 max_history 的请求（例如开场白），键覆盖完整的消息列表，
+        依赖上文的回复（"Yes"、"Why?"）不会命中其它对话的响应
+        """
+        history = [message for message in messages if message.get("role") != "system"]
+        if not history or len(history) > self.max_history:
+            return []
+        namespace = f"{type(self.llm).__name__}:{self.llm.model_name}\0{stop!r}"
+        keys = [messages_key(namespace, messages)]
+        if self.normalize:
+            keys.append(messages_key(namespace, messages, normalize=True))
+        return keys
+
+    def _lookup(self, keys: List[str]) -> Optional[CachedResponse]:
+        for key in keys:
+            response = self.cache.get(key)
+            if response is not None:
+                return response
+        return None
+
+    async def generate(
+        self,
+        messages: List[Dict[str, str]],
+        stop: Optional[Union[str, List[str]]] = None
+    ) -> str:
+        """
+        生成文本响应，命中缓存时直接返回
+
+        Args:
+            messages: 消息列表，包含角色和内容
+            stop: 停止序列
+
+        Returns:
+            生成的文本响应
+        """
+        keys = self._keys(messages, stop)
+        cached = self._lookup(keys)
+        if cached is not None:
+            logger.debug("LLM响应缓存命中")
+            return cached.text
+
+        started = time.monotonic()
+        result = await self.llm.generate(messages, stop)
+        if keys:
+            self.cache.put(keys, CachedResponse([result], [time.monotonic() - started], time.monotonic()))
+        return result
+
+    async def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        stop: Optional[Union[str, List[str]]] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        流式生成，命中缓存时按记录的节奏回放
+
+        只有完整结束的流才会写入缓存，中途出错或被关闭的流不缓存
+
+        Args:
+            messages: 消息列表，包含角色和内容
+            stop: 停止序列
+
+        Yields:
+            生成的文本片段
+        """
+        keys = self._keys(messages, stop)
+        cached = self._lookup(keys)
+        if cached is not None:
+            logger.debug(f"LLM响应缓存命中，回放 {len(cached.chunks)} 个文本块")
+            async for chunk in self._replay(cached):
+                yield chunk
+            return
+
+        if not keys:
+            async for chunk in self.llm.generate_stream(messages, stop):
+                yield chunk
+            return
+
+        chunks: List[str] = []
+        delays: List[float] = []
+        last = time.monotonic()
+        async for chunk in self.llm.generate_stream(messages, stop):
+            now = time.monotonic()
+            chunks.append(chunk)
+            delays.append(now - last)
+            last = now
+            yield chunk
+        self.cache.put(keys, CachedResponse(chunks, delays, time.monotonic()))
+
+    async def _replay(self, cached: CachedResponse) -> AsyncGenerator[str, None]:
+        """回放缓存的文本块，首个文本块立即输出，之后按记录的间隔输出"""
+        for index, (chunk, delay) in enumerate(zip(cached.chunks, cached.delays)):
+            if index and self.replay_speed > 0:
+                await asyncio.sleep(min(delay, self.max_chunk_delay) / self.replay_speed)
+            yield chunk
@@ -0,0 +1,352 @@
+"""
+进程级共享的HTTP和LLM客户端
+
+口语教练、诊断智能体（AutoGen内部的OpenAI客户端）和浏览器智能体（ChatOpenAI）原来各自创建客户端和连接池，
+每次诊断都要重新建立TLS连接。这里按LLMSettings的连接参数共享客户端，同一个进程中只握手和预热一次：
+- 同步客户端线程安全，全进程共享一个
+- 异步客户端的连接绑定在创建它的事件循环上，浏览器任务可能在单独线程的事件循环中运行，
+  因此按事件循环分别共享，事件循环被回收后对应的客户端也随之释放
+"""
+
+import abc
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+import openai
+
+from app.config import LLMSettings, config
+from app.logger import logger
+
+
+class _ReleasingStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """包装流式响应的数据流，响应关闭时通知客户端请求已结束"""
+
+    def __init__(self, stream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        return iter(self._stream)
+
+    def __aiter__(self):
+        return self._stream.__aiter__()
+
+    def _done(self):
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._done()
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._done()
+
+
+class _InFlightTracker(abc.ABC):
+    """记录正在进行的请求数
+
+    配置变化后注册表停用（retire）旧的客户端，等正在进行的请求（包括未读完的流式响应）都结束后再关闭它。
+    仍然持有旧客户端的调用方（例如正在运行的智能体）之后发出的请求转交给注册表中的新客户端。
+    """
+
+    def _init_tracking(self, successor: Optional[Callable[[], Any]]):
+        self._successor = successor
+        self._active = 0
+        self._retired = False
+        self._tracking_lock = threading.Lock()
+
+    def _acquire(self) -> bool:
+        """登记一个新请求，客户端已停用时返回False，请求应转交给新客户端"""
+        with self._tracking_lock:
+            if self._retired and self._successor is not None:
+                return False
+            self._active += 1
+            return True
+
+    def _release(self):
+        with self._tracking_lock:
+            self._active -= 1
+            idle = self._retired and self._active == 0
+        if idle:
+            self._close_idle()
+
+    def _track_response(self, response: httpx.Response, stream: bool) -> httpx.Response:
+        if stream:
+            response.stream = _ReleasingStream(response.stream, self._release)
+        else:
+            self._release()
+        return response
+
+    def retire(self):
+        """停用客户端，没有正在进行的请求时立即关闭"""
+        with self._tracking_lock:
+            self._retired = True
+            idle = self._active == 0
+        if idle:
+            self._close_idle()
+
+    @abc.abstractmethod
+    def _close_idle(self):
+        """停用且空闲后关闭客户端"""
+
+
+class SharedHTTPClient(_InFlightTracker, httpx.Client):
+    """可以放进AutoGen llm_config的共享同步客户端
+
+    AutoGen会深拷贝llm_config，深拷贝时返回自身，保证所有智能体共用同一个连接池
+    """
+
+    def __init__(self, *args, successor: Optional[Callable[[], "SharedHTTPClient"]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_tracking(successor)
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def send(self, request: httpx.Request, *, stream: bool = False, **kwargs) -> httpx.Response:
+        if not self._acquire():
+            return self._successor().send(request, stream=stream, **kwargs)
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        return self._track_response(response, stream)
+
+    def _close_idle(self):
+        self.close()
+
+
+class SharedAsyncHTTPClient(_InFlightTracker, httpx.AsyncClient):
+    """深拷贝时返回自身的共享异步客户端，停用后在创建它的事件循环上关闭"""
+
+    def __init__(self, *args, successor: Optional[Callable[[], "SharedAsyncHTTPClient"]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._init_tracking(successor)
+        try:
+            self._loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._closing: Optional[asyncio.Task] = None
+
+    def __deepcopy__(self, memo):
+        return self
+
+    async def send(self, request: httpx.Request, *, stream: bool = False, **kwargs) -> httpx.Response:
+        if not self._acquire():
+            return await self._successor().send(request, stream=stream, **kwargs)
+        try:
+            response = await super().send(request, stream=stream, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        return self._track_response(response, stream)
+
+    def _close_idle(self):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        def close():
+            self._closing = loop.create_task(self.aclose())
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            close()
+        else:
+            # 配置热加载在监听线程上回调
+            loop.call_soon_threadsafe(close)
+
+
+def _settings_key(settings: LLMSettings) -> Tuple[str, str]:
+    """连接参数相同的配置共用客户端，模型和温度等请求参数不影响连接；日志只输出第一项"""
+    return (settings.base_url, settings.api_key)
+
+
+class ClientRegistry:
+    """按LLM配置共享客户端的注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shared: Dict[Tuple, Any] = {}
+        self._per_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, Any]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # 连接池大小或超时变化后，之后获取的客户端按新的配置创建
+        config.subscribe("http_pool", self._on_pool_changed)
+        config.subscribe("resilience", self._on_pool_changed)
+
+    def _on_pool_changed(self, settings):
+        """丢弃已创建的客户端，正在进行的请求继续使用原来的客户端，结束后关闭原来的客户端"""
+        with self._lock:
+            clients = list(self._shared.values())
+            for scope in self._per_loop.values():
+                clients.extend(scope.values())
+            self._shared.clear()
+            self._per_loop.clear()
+        for client in clients:
+            if isinstance(client, _InFlightTracker):
+                client.retire()
+        logger.info("连接池配置已变化，之后的请求使用新的客户端")
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        settings = config.http_pool
+        return httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry
+        )
+
+    @staticmethod
+    def _timeout() -> httpx.Timeout:
+        # 启用ResilientLLM时读取超时由它按token控制，这里只限制建立连接
+        if config.resilience.enabled:
+            return httpx.Timeout(None, connect=config.resilience.connect_timeout)
+        return httpx.Timeout(600.0, connect=5.0)
+
+    def _scope(self) -> Dict[Tuple, Any]:
+        """当前事件循环的客户端表，没有运行中的事件循环时使用全进程共享的表"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._shared
+        scope = self._per_loop.get(loop)
+        if scope is None:
+            scope = self._per_loop[loop] = {}
+        return scope
+
+    def _get(self, scope: Dict[Tuple, Any], key: Tuple, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            client = scope.get(key)
+            if client is None:
+                client = scope[key] = factory()
+                logger.info(f"创建共享客户端: {key[0]} {key[1]}")
+            return client
+
+    def http_client(self, settings: Optional[LLMSettings] = None) -> SharedHTTPClient:
+        """
+        获取共享的同步HTTP客户端
+
+        Args:
+            settings: LLM配置，为None时使用默认配置
+
+        Returns:
+            同步HTTP客户端
+        """
+        settings = settings or config.default_llm
+        return self._get(
+            self._shared,
+            ("http", *_settings_key(settings)),
+            lambda: SharedHTTPClient(
+                limits=self._limits(),
+                timeout=self._timeout(),
+                successor=lambda: self.http_client(settings)
+            )
+        )
+
+    def async_http_client(self, settings: Optional[LLMSettings] = None) -> SharedAsyncHTTPClient:
+        """
+        获取当前事件循环共享的异步HTTP客户端
+
+        Args:
+            settings: LLM配置，为None时使用默认配置
+
+        Returns:
+            异步HTTP客户端
+        """
+        settings = settings or config.default_llm
+        return self._get(
+            self._scope(),
+            ("async_http", *_settings_key(settings)),
+            lambda: SharedAsyncHTTPClient(
+                limits=self._limits(),
+                timeout=self._timeout(),
+                successor=lambda: self.async_http_client(settings)
+            )
+        )
+
+    def openai_client(self, settings: Optional[LLMSettings] = None) -> openai.AsyncOpenAI:
+        """
+        获取当前事件循环共享的异步OpenAI客户端
+
+        重试由ResilientLLM负责时关闭客户端自带的重试
+
+        Args:
+            settings: LLM配置，为None时使用默认配置
+
+        Returns:
+            异步OpenAI客户端
+        """
+        settings = settings or config.default_llm
+        http_client = self.async_http_client(settings)
+        options = {"max_retries": 0} if config.resilience.enabled else {}
+        return self._get(
+            self._scope(),
+            ("openai", *_settings_key(settings)),
+            lambda: openai.AsyncOpenAI(
+                api_key=settings.api_key,
+                base_url=settings.base_url,
+                http_client=http_client,
+                **options
+            )
+        )
+
+    def chat_model(self, settings: Optional[LLMSettings] = None):
+        """
+        获取当前事件循环共享的LangChain ChatOpenAI，供browser-use使用
+
+        Args:
+            settings: LLM配置，为None时使用默认配置
+
+        Returns:
+            使用共享连接池的ChatOpenAI
+        """
+        from langchain_openai import ChatOpenAI
+
+        settings = settings or config.default_llm
+        http_client = self.http_client(settings)
+        http_async_client = self.async_http_client(settings)
+        return self._get(
+            self._scope(),
+            ("chat_model", *_settings_key(settings), settings.model, settings.temperature),
+            lambda: ChatOpenAI(
+                model=settings.model,
+                api_key=settings.api_key,
+                base_url=settings.base_url,
+                temperature=settings.temperature,
+                http_client=http_client,
+                http_async_client=http_async_client
+            )
+        )
+
+    async def aclose(self):
+        """关闭全进程共享的客户端和当前事件循环的客户端"""
+        with self._lock:
+            clients = list(self._shared.values())
+            self._shared.clear()
+            try:
+                clients.extend(self._per_loop.pop(asyncio.get_running_loop(), {}).values())
+            except RuntimeError:
+                pass
+        for client in clients:
+            if isinstance(client, httpx.AsyncClient):
+                await client.aclose()
+            elif isinstance(client, httpx.Client):
+                client.close()
+
+
+client_registry = ClientRegistry()
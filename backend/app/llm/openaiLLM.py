@@ -3,28 +3,71 @@ from typing import Dict, List, Optional, Union, AsyncGenerator
 
 from app.logger import logger
 from app.llm.base import BaseLLM
-from app.config import config
+from app.llm.clients import client_registry
+from app.config import LLMSettings, config
 
 
 
 class OpenaiLLM(BaseLLM):
     """使用openai框架的大语言模型类"""
 
-    def __init__(self):
+    def __init__(self, settings: Optional[LLMSettings] = None, name: str = "default"):
         """
         初始化模型
 
+        Args:
+            settings: 模型配置，为None时使用 [llm.<name>] 的配置并跟随配置热加载
+            name: 配置名称，default 即 [llm]
         """
+        self.name = name
         # 调用父类初始化
-        super().__init__(config.default_llm)
+        super().__init__(settings or config.llm[name])
+        if settings is None:
+            config.subscribe("llm", self._on_llm_changed)
+
+    def _apply_settings(self, config: LLMSettings):
+        """
+        配置是不可变对象，整体替换；热加载发生在监听线程上，
+        请求开始时读取一次 self.settings，不会读到新旧混合的模型和地址
+        """
+        self.settings = config
+
+    @property
+    def model_name(self) -> str:
+        return self.settings.model
+
+    @property
+    def api_key(self) -> str:
+        return self.settings.api_key
+
+    @property
+    def base_url(self) -> str:
+        return self.settings.base_url
+
+    @property
+    def max_tokens(self) -> int:
+        return self.settings.max_tokens
+
+    @property
+    def temperature(self) -> float:
+        return self.settings.temperature
 
     def _initialize_client(self):
-        """初始化OpenAI客户端"""
-        self.client = openai.OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
-        )
-        logger.info(f"openaiLLM 已初始化客户端，模型: {self.model_name}")
+        """客户端由注册表按连接参数共享，请求时再获取"""
+        logger.info(f"openaiLLM 已初始化，模型: {self.model_name}")
+
+    def _on_llm_changed(self, llm: Dict[str, LLMSettings]):
+        """配置热加载后切换到新的模型和地址，客户端按新的连接参数从注册表获取"""
+        settings = llm.get(self.name)
+        if settings is None or settings == self.settings:
+            return
+        self._apply_settings(settings)
+        logger.info(f"openaiLLM 已应用新的配置 [{self.name}]，模型: {settings.model}")
+
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        """当前事件循环共享的异步OpenAI客户端"""
+        return client_registry.openai_client(self.settings)
 
     async def generate(
         self,
@@ -42,11 +85,12 @@ class OpenaiLLM(BaseLLM):
             生成的文本响应
         """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
+            settings = self.settings
+            response = await client_registry.openai_client(settings).chat.completions.create(
+                model=settings.model,
                 messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
+                temperature=settings.temperature,
+                max_tokens=settings.max_tokens,
                 stop=stop
             )
             
@@ -71,16 +115,17 @@ class OpenaiLLM(BaseLLM):
             生成的文本片段
         """
         try:
-            stream = self.client.chat.completions.create(
-                model=self.model_name,
+            settings = self.settings
+            stream = await client_registry.openai_client(settings).chat.completions.create(
+                model=settings.model,
                 messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
+                temperature=settings.temperature,
+                max_tokens=settings.max_tokens,
                 stop=stop,
                 stream=True
             )
             
-            for chunk in stream:
+            async for chunk in stream:
                 if chunk.choices and chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
                     logger.debug(f"流式生成块: {content}")
@@ -0,0 +1,256 @@
+"""
+LLM请求的超时、重试和熔断
+
+上游连接卡住时，流式请求会一直挂起，SSE连接和工作协程都被占用。这里包装任意BaseLLM：
+- 首个token和相邻token之间分别有超时，连接超时由客户端设置（见OpenaiLLM）
+- 首个token输出之前的可重试错误按指数退避加随机抖动重试，之后的错误直接抛出
+- 连续失败达到阈值时熔断，冷却期内的请求立即失败，冷却结束后放行一个探测请求
+"""
+
+import asyncio
+import random
+import time
+from typing import AsyncGenerator, Dict, List, Optional, Union
+
+import httpx
+import openai
+
+from app.config import config
+from app.llm.base import BaseLLM
+from app.logger import logger
+
+# 超时和连接错误说明上游暂时不可用，可以重试（openai的超时错误也是连接错误的子类）
+RETRYABLE_ERRORS = (TimeoutError, ConnectionError, openai.APIConnectionError, httpx.TransportError)
+# 限流状态码，5xx 服务端错误同样可以重试
+RETRYABLE_STATUS = frozenset({408, 429})
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断期间的请求直接失败"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    判断错误是否可以重试：只有超时、连接错误、限流和服务端错误可以重试，
+    其它错误（请求错误、熔断、代码中的TypeError/KeyError等）重试也不会成功
+
+    Args:
+        error: 请求抛出的异常
+
+    Returns:
+        是否可以重试
+    """
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and (status in RETRYABLE_STATUS or status >= 500)
+
+
+class CircuitBreaker:
+    """连续失败计数的熔断器
+
+    closed: 正常放行；连续失败达到阈值后进入open
+    open: 冷却期内拒绝请求；冷却结束后进入half-open
+    half-open: 只放行一个探测请求，成功则closed，失败则重新open；
+        探测请求被取消而没有结果时，经过一个冷却时间后再放行下一个
+
+    Attributes:
+        failure_threshold: 进入open的连续失败次数
+        reset_timeout: open状态的冷却时间（秒）
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half-open"
+
+    def allow(self) -> bool:
+        """
+        是否放行一个请求，half-open状态下同时只放行一个探测请求
+
+        Returns:
+            是否放行
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open":
+            now = time.monotonic()
+            if self._probe_started is None or now - self._probe_started >= self.reset_timeout:
+                self._probe_started = now
+                return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probe_started is not None or self.failures >= self.failure_threshold:
+            logger.warning(f"LLM连续失败 {self.failures} 次，熔断 {self.reset_timeout}s")
+            self.opened_at = time.monotonic()
+        self._probe_started = None
+
+
+class ResilientLLM(BaseLLM):
+    """为LLM请求增加超时、重试和熔断的包装
+
+    Attributes:
+        llm: 实际请求的模型
+        breaker: 熔断器
+        first_token_timeout: 等待首个token的超时（秒）
+        inter_token_timeout: 相邻token之间的超时（秒）
+        max_retries: 首个token之前的最大重试次数
+        backoff_base: 退避的基础时间（秒），第n次重试最多等待 backoff_base * 2^n
+        backoff_max: 单次退避的最长时间（秒）
+    """
+
+    def __init__(self, llm: BaseLLM, max_retries: Optional[int] = None):
+        """
+        初始化包装
+
+        Args:
+            llm: 实际请求的模型
+            max_retries: 最大重试次数，为None时使用 [resilience] 配置；
+                由LLMRouter在提供方之间切换时传0，把重试交给路由
+        """
+        self.llm = llm
+        self._max_retries = max_retries
+        super().__init__(config.default_llm)
+
+    def _initialize_client(self):
+        self.model_name = self.llm.model_name
+        self.breaker = CircuitBreaker()
+        self._apply_resilience(config.resilience)
+        config.subscribe("resilience", self._apply_resilience)
+
+    def _apply_resilience(self, settings):
+        """读取 [resilience] 配置，配置热加载后也通过它更新"""
+        self.breaker.failure_threshold = settings.failure_threshold
+        self.breaker.reset_timeout = settings.reset_timeout
+        self.first_token_timeout = settings.first_token_timeout
+        self.inter_token_timeout = settings.inter_token_timeout
+        self.max_retries = settings.max_retries if self._max_retries is None else self._max_retries
+        self.backoff_base = settings.backoff_base
+        self.backoff_max = settings.backoff_max
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"LLM {self.llm.model_name} 已熔断，{self.breaker.reset_timeout}s 内不再请求")
+
+    def _record_failure(self, error: Exception):
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # 请求本身的错误不说明服务不可用
+            self.breaker.record_success()
+
+    def _backoff(self, attempt: int) -> float:
+        """第attempt次重试前的等待时间，full jitter"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def generate(
+        self,
+        messages: List[Dict[str, str]],
+        stop: Optional[Union[str, List[str]]] = None
+    ) -> str:
+        """
+        生成文本响应，整个请求受首个token超时限制，失败时重试
+
+        Args:
+            messages: 消息列表，包含角色和内容
+            stop: 停止序列
+
+        Returns:
+            生成的文本响应
+        """
+        attempt = 0
+        while True:
+            self._check_breaker()
+            try:
+                result = await asyncio.wait_for(self.llm.generate(messages, stop), self.first_token_timeout)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    e = TimeoutError(f"LLM {self.llm.model_name} 超过 {self.first_token_timeout}s 没有响应")
+                self._record_failure(e)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise e
+                delay = self._backoff(attempt)
+                attempt += 1
+                logger.warning(f"LLM请求失败，{delay:.2f}s 后第 {attempt} 次重试: {e}")
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        stop: Optional[Union[str, List[str]]] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        流式生成，首个token之前失败会重试，之后的超时或错误直接抛出
+
+        Args:
+            messages: 消息列表，包含角色和内容
+            stop: 停止序列
+
+        Yields:
+            生成的文本片段
+        """
+        attempt = 0
+        while True:
+            self._check_breaker()
+            stream = self.llm.generate_stream(messages, stop)
+            try:
+                first_chunk = await asyncio.wait_for(stream.__anext__(), self.first_token_timeout)
+            except StopAsyncIteration:
+                self.breaker.record_success()
+                return
+            except asyncio.CancelledError:
+                # 例如LLMRouter取消对冲中落败的请求
+                await stream.aclose()
+                raise
+            except Exception as e:
+                await stream.aclose()
+                if isinstance(e, asyncio.TimeoutError):
+                    e = TimeoutError(f"LLM {self.llm.model_name} 超过 {self.first_token_timeout}s 没有输出首个token")
+                self._record_failure(e)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise e
+                delay = self._backoff(attempt)
+                attempt += 1
+                logger.warning(f"LLM流式请求在首个token之前失败，{delay:.2f}s 后第 {attempt} 次重试: {e}")
+                await asyncio.sleep(delay)
+                continue
+            break
+
+        # 收到首个token说明服务可用；已经输出内容后不能重试，否则客户端会收到重复的文本
+        self.breaker.record_success()
+        try:
+            yield first_chunk
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), self.inter_token_timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"LLM {self.llm.model_name} 超过 {self.inter_token_timeout}s 没有输出新的token")
+                yield chunk
+        except Exception as e:
+            self._record_failure(e)
+            raise
+        finally:
+            await stream.aclose()
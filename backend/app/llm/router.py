@@ -0,0 +1,245 @@
+"""
+多提供方LLM路由
+
+配置中的每个 [llm.<name>] 都可以作为一个提供方。路由器为每个提供方记录最近若干次请求的
+首个token延迟和失败情况，新的流式请求交给最快的健康提供方；
+如果在期限内没有收到首个token，就把同一请求对冲到下一个提供方，先返回首个token的一方胜出，
+另一方被取消。首个token输出之前的失败会自动切换到下一个提供方。
+"""
+
+import asyncio
+import contextlib
+import time
+from collections import deque
+from statistics import median
+from typing import AsyncGenerator, Dict, List, Optional, Tuple, Union
+
+from app.config import config
+from app.llm.base import BaseLLM
+from app.llm.openaiLLM import OpenaiLLM
+from app.llm.resilient import ResilientLLM
+from app.logger import logger
+
+
+class ProviderStats:
+    """单个提供方的滚动统计
+
+    Attributes:
+        ttft: 最近的首个token延迟（秒）
+        outcomes: 最近的请求结果，True为成功
+        last_failure: 最近一次失败的时间
+        slower_than: 对冲落败后已知的首个token延迟下限，收到下一个首个token时清除
+    """
+
+    def __init__(self, window_size: int = 20):
+        self.ttft: deque = deque(maxlen=window_size)
+        self.outcomes: deque = deque(maxlen=window_size)
+        self.last_failure: float = 0.0
+        self.slower_than: float = 0.0
+
+    @property
+    def latency(self) -> float:
+        """首个token延迟的中位数，还没有样本时为0，让新的提供方优先被尝试；对冲落败后不低于已等待的时间"""
+        return max(median(self.ttft) if self.ttft else 0.0, self.slower_than)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+    def record_first_token(self, seconds: float):
+        self.ttft.append(seconds)
+        self.slower_than = 0.0
+
+    def record_hedge_loss(self, waited: float):
+        """对冲落败、在首个token之前被取消：不是延迟样本也不算失败，只用于排序"""
+        self.slower_than = max(self.slower_than, waited)
+
+    def record_success(self):
+        self.outcomes.append(True)
+
+    def record_failure(self):
+        self.outcomes.append(False)
+        self.last_failure = time.monotonic()
+
+
+class LLMRouter(BaseLLM):
+    """在多个提供方之间按延迟路由并对冲的LLM
+
+    Attributes:
+        providers: 提供方名称到模型实例的映射，按配置顺序排列
+        stats: 每个提供方的滚动统计
+        hedge_after: 等待首个token的期限（秒），超过后对冲到下一个提供方
+        error_threshold: 错误率达到该值的提供方视为不健康
+        cooldown: 不健康的提供方在最近一次失败后经过该时间（秒）重新参与路由
+    """
+
+    def __init__(self, providers: Optional[Dict[str, BaseLLM]] = None):
+        """
+        初始化路由器
+
+        Args:
+            providers: 提供方名称到模型实例的映射，为None时按 [router] 配置创建
+        """
+        self._providers = providers
+        super().__init__(config.default_llm)
+
+    def _initialize_client(self):
+        """按配置创建各个提供方的模型实例"""
+        settings = config.router
+        if self._providers is None:
+            self._providers = {name: OpenaiLLM(name=name) for name in settings.providers}
+            if config.resilience.enabled:
+                # 每个提供方单独超时和熔断，失败后由路由切换提供方而不是原地重试
+                self._providers = {
+                    name: ResilientLLM(llm, max_retries=0) for name, llm in self._providers.items()
+                }
+        self.providers: Dict[str, BaseLLM] = self._providers
+        self.stats: Dict[str, ProviderStats] = {
+            name: ProviderStats(settings.window_size) for name in self.providers
+        }
+        self._apply_router(settings)
+        config.subscribe("router", self._apply_router)
+        logger.info(f"LLM路由已初始化，提供方: {', '.join(self.providers)}")
+
+    def _apply_router(self, settings):
+        """读取 [router] 配置，配置热加载后也通过它更新；提供方列表的变化需要重启后生效"""
+        self.hedge_after = settings.hedge_after
+        self.error_threshold = settings.error_threshold
+        self.cooldown = settings.cooldown
+
+    def _healthy(self, name: str) -> bool:
+        stats = self.stats[name]
+        return stats.error_rate < self.error_threshold or time.monotonic() - stats.last_failure > self.cooldown
+
+    def ranked(self) -> List[str]:
+        """
+        按路由优先级排列的提供方：健康的在前，同类按首个token延迟的中位数排序
+
+        Returns:
+            提供方名称列表
+        """
+        return sorted(self.providers, key=lambda name: (not self._healthy(name), self.stats[name].latency))
+
+    async def generate(
+        self,
+        messages: List[Dict[str, str]],
+        stop: Optional[Union[str, List[str]]] = None
+    ) -> str:
+        """
+        按优先级依次尝试各个提供方，直到有一个成功
+
+        Args:
+            messages: 消息列表，包含角色和内容
+            stop: 停止序列
+
+        Returns:
+            生成的文本响应
+        """
+        last_error: Optional[Exception] = None
+        for name in self.ranked():
+            started = time.monotonic()
+            try:
+                result = await self.providers[name].generate(messages, stop)
+            except Exception as e:
+                logger.warning(f"提供方 {name} 生成失败，尝试下一个: {e}")
+                self.stats[name].record_failure()
+                last_error = e
+                continue
+            self.stats[name].record_first_token(time.monotonic() - started)
+            self.stats[name].record_success()
+            return result
+        raise last_error or RuntimeError("没有可用的LLM提供方")
+
+    async def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        stop: Optional[Union[str, List[str]]] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        流式生成，首个token之前按延迟对冲并在失败时切换提供方
+
+        Args:
+            messages: 消息列表，包含角色和内容
+            stop: 停止序列
+
+        Yields:
+            生成的文本片段
+        """
+        name, stream, first_chunk = await self._first_token(messages, stop)
+        # 首个token已经输出后不能再切换提供方，之后的错误直接抛出
+        try:
+            if first_chunk is not None:
+                yield first_chunk
+                async for chunk in stream:
+                    yield chunk
+        except Exception:
+            self.stats[name].record_failure()
+            raise
+        finally:
+            await stream.aclose()
+        self.stats[name].record_success()
+
+    async def _first_token(
+        self,
+        messages: List[Dict[str, str]],
+        stop: Optional[Union[str, List[str]]]
+    ) -> Tuple[str, AsyncGenerator[str, None], Optional[str]]:
+        """
+        启动流式请求并等待首个token，必要时对冲或切换到下一个提供方
+
+        Returns:
+            (胜出的提供方, 它的流, 首个文本片段；流直接结束时为None)
+        """
+        candidates = self.ranked()
+        attempts: Dict[asyncio.Future, Tuple[str, AsyncGenerator[str, None], float]] = {}
+        last_error: Optional[Exception] = None
+
+        def launch() -> bool:
+            if not candidates:
+                return False
+            name = candidates.pop(0)
+            stream = self.providers[name].generate_stream(messages, stop)
+            attempts[asyncio.ensure_future(stream.__anext__())] = (name, stream, time.monotonic())
+            return True
+
+        launch()
+        try:
+            while attempts:
+                done, _ = await asyncio.wait(
+                    attempts, timeout=self.hedge_after, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # 期限内没有首个token，对冲到下一个提供方，已有的请求继续等待
+                    if launch():
+                        logger.info(f"首个token超过 {self.hedge_after}s，对冲到提供方 {list(attempts.values())[-1][0]}")
+                    continue
+
+                for task in done:
+                    name, stream, started = attempts.pop(task)
+                    try:
+                        first_chunk = task.result()
+                    except StopAsyncIteration:
+                        first_chunk = None
+                    except Exception as e:
+                        logger.warning(f"提供方 {name} 在首个token之前失败: {e}")
+                        self.stats[name].record_failure()
+                        last_error = e
+                        await stream.aclose()
+                        if not attempts:
+                            launch()
+                        continue
+
+                    self.stats[name].record_first_token(time.monotonic() - started)
+                    return name, stream, first_chunk
+            raise last_error or RuntimeError("没有可用的LLM提供方")
+        finally:
+            # 取消落败的请求；它们还没有返回首个token，等待的时间不是延迟样本，也不算失败
+            for task, (name, stream, started) in attempts.items():
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await task
+                with contextlib.suppress(Exception):
+                    await stream.aclose()
+                self.stats[name].record_hedge_loss(time.monotonic() - started)
@@ -0,0 +1,247 @@
+"""
+本地口语分析模块
+
+在识别出的文本和Whisper的逐词置信度上做轻量的规则分析：
+- 语法：预编译的正则规则，覆盖学习者最常见的错误
+- 发音：识别置信度低的单词通常是发音不清楚的地方
+
+这一步不需要LLM，可以和LLM生成回复并行执行。
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Pattern, Sequence
+
+from app.logger import logger
+from app.speech_recognition import WordInfo
+
+
+@dataclass
+class GrammarRule:
+    """一条语法规则
+
+    Attributes:
+        pattern: 预编译的匹配模式
+        message: 根据匹配结果生成建议的函数，返回None表示不是错误
+    """
+    pattern: Pattern
+    message: Callable[[re.Match], Optional[str]]
+
+
+NUMBER_WORDS = "two|three|four|five|six|seven|eight|nine|ten|many|several|few|both"
+# 数词后面常见的非名词，不提示复数
+NOT_NOUNS = {
+    "of", "and", "or", "to", "in", "on", "at", "more", "less", "other", "times", "a", "the",
+    "hundred", "thousand", "million", "people", "children", "men", "women", "years", "days",
+    "minutes", "hours", "weeks", "months", "fish", "sheep", "news", "thing",
+    # 不规则复数
+    "teeth", "feet", "geese", "mice", "lice", "oxen", "dice", "police", "cattle",
+    # 单复数同形和度量单位
+    "deer", "aircraft", "series", "species", "percent", "dozen", "o'clock", "am", "pm",
+}
+# 时间和数字的读法中数词后面跟的还是数词（"ten thirty"、"five fifteen"），不提示复数
+NUMERALS = {
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen",
+    "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety", "oh", "half", "quarter",
+}
+# 数词后的单词后面是这些词或标点时，它才是名词短语的最后一个词；"two black cats" 中的 black 是形容词
+NOUN_PHRASE_END = r"(?=\s*(?:[.,!?;:]|$)|\s+(?:and|or|but|in|on|at|for|with|to|from|of|that|which|who|are|were|is|was|have|had|ago|here|there)\b)"
+# 这些词后面的主语不需要第三人称单数：疑问句和否定句的助动词、情态动词、虚拟语气
+AGREEMENT_EXEMPT = {
+    "do", "does", "did", "don't", "doesn't", "didn't", "can", "could", "will", "would", "shall", "should",
+    "may", "might", "must", "let", "make", "makes", "made", "help", "helps", "if", "wish", "wished", "though",
+}
+# 以元音字母开头但读辅音的单词，使用 a：one、euro、university、user、usual、utility
+A_PREFIXES = ("one", "once", "eu", "ewe", "uni", "use", "usu", "uti", "ure", "uro", "ubi")
+# 以辅音字母开头但读元音的单词，使用 an
+AN_EXCEPTIONS = {"hour", "hours", "honest", "honestly", "honor", "honour", "honorable", "heir", "mp3"}
+# 缩写按字母读，这些字母的读音以元音开头（F读作 ef，M读作 em），使用 an
+VOWEL_SOUND_LETTERS = set("AEFHILMNORSX")
+# "more" 后面的这些形容词比较级已经包含了比较的意思
+COMPARATIVES = {
+    "better", "worse", "bigger", "smaller", "larger", "taller", "shorter", "longer", "older", "younger",
+    "faster", "slower", "quicker", "cheaper", "richer", "poorer", "higher", "lower", "greater", "stronger",
+    "weaker", "harder", "easier", "happier", "busier", "earlier", "heavier", "lighter", "darker", "brighter",
+    "hotter", "colder", "warmer", "cooler", "nicer", "smarter", "cleaner", "clearer", "closer", "wider",
+    "deeper", "safer", "simpler", "funnier", "prettier", "healthier", "lazier", "angrier", "louder",
+    "quieter", "newer", "kinder", "sweeter", "softer", "tougher", "calmer", "thinner", "fatter", "wetter",
+    "drier", "luckier", "noisier", "friendlier", "crazier", "scarier", "tinier", "uglier",
+}
+BASE_FORMS = {
+    "went": "go", "came": "come", "saw": "see", "did": "do", "ate": "eat", "had": "have",
+    "was": "be", "goes": "go", "does": "do", "bought": "buy", "made": "make", "took": "take",
+    "got": "get", "said": "say", "told": "tell", "thought": "think",
+}
+THIRD_PERSON_FIXES = {"don't": "doesn't", "have": "has", "do": "does", "are": "is", "were": "was"}
+PLURAL_SUBJECT_FIXES = {"is": "are", "was": "were", "doesn't": "don't", "has": "have"}
+
+
+def _plural_after_number(match: re.Match) -> Optional[str]:
+    number, noun = match.group(1), match.group(2)
+    word = noun.lower()
+    if word in NOT_NOUNS or word in NUMERALS or word.endswith("s") or len(word) < 3:
+        return None
+    return f"After '{number}', use the plural noun: '{number} {noun}s' instead of '{number} {noun}'."
+
+
+def _third_person(match: re.Match) -> Optional[str]:
+    before, subject, verb = match.group(1), match.group(2), match.group(3)
+    if before and before.lower() in AGREEMENT_EXEMPT:
+        return None
+    return f"With '{subject}', use '{THIRD_PERSON_FIXES[verb.lower()]}' instead of '{verb}'."
+
+
+def _is_acronym(word: str) -> bool:
+    return len(word) > 1 and word.isupper()
+
+
+def _article_a(match: re.Match) -> Optional[str]:
+    word = match.group(2)
+    if _is_acronym(word):
+        if word[0] not in VOWEL_SOUND_LETTERS:
+            return None
+    elif word.lower().startswith(A_PREFIXES):
+        return None
+    return f"Use 'an' before a vowel sound: 'an {word}' instead of '{match.group(1)} {word}'."
+
+
+def _article_an(match: re.Match) -> Optional[str]:
+    word = match.group(2)
+    if _is_acronym(word):
+        if word[0] in VOWEL_SOUND_LETTERS:
+            return None
+    elif word.lower() in AN_EXCEPTIONS:
+        return None
+    return f"Use 'a' before a consonant sound: 'a {word}' instead of '{match.group(1)} {word}'."
+
+
+ENGLISH_RULES: List[GrammarRule] = [
+    GrammarRule(
+        re.compile(rf"\b({NUMBER_WORDS}|\d+)\s+([a-z]+)\b{NOUN_PHRASE_END}", re.IGNORECASE),
+        _plural_after_number
+    ),
+    GrammarRule(re.compile(r"\b(a)\s+([aeiou][a-z]*|(?-i:[A-Z]{2,}))\b", re.IGNORECASE), _article_a),
+    # 缩写 U 读作 you，"an UFO" 也是错误
+    GrammarRule(re.compile(r"\b(an)\s+([b-df-hj-np-tv-z][a-z]*|(?-i:U[A-Z]+))\b", re.IGNORECASE), _article_an),
+    GrammarRule(
+        # 连同前一个词一起匹配，"Does she have"、"what does he do"、"if he were" 不是错误
+        re.compile(r"(?:\b([a-z']+)\s+)?\b(he|she|it)\s+(don't|have|do|are|were)\b", re.IGNORECASE),
+        _third_person
+    ),
+    GrammarRule(
+        re.compile(r"\b(we|they|you)\s+(is|was|doesn't|has)\b", re.IGNORECASE),
+        lambda m: f"With '{m.group(1)}', use '{PLURAL_SUBJECT_FIXES[m.group(2).lower()]}' instead of '{m.group(2)}'."
+    ),
+    GrammarRule(re.compile(r"\bI\s+(is|are)\b"), lambda m: f"Use 'I am' instead of 'I {m.group(1)}'."),
+    GrammarRule(
+        re.compile(rf"\b(didn't|did not|doesn't|don't|does not|do not)\s+({'|'.join(BASE_FORMS)})\b", re.IGNORECASE),
+        lambda m: f"After '{m.group(1)}', use the base form: '{m.group(1)} {BASE_FORMS[m.group(2).lower()]}' instead of '{m.group(1)} {m.group(2)}'."
+    ),
+    GrammarRule(
+        re.compile(rf"\bmore\s+({'|'.join(COMPARATIVES)})\b", re.IGNORECASE),
+        lambda m: f"'{m.group(1)}' is already comparative, drop 'more': say '{m.group(1)}' instead of 'more {m.group(1)}'."
+    ),
+    GrammarRule(
+        re.compile(r"\b([a-z]+)\s+\1\b", re.IGNORECASE),
+        lambda m: None if m.group(1).lower() in {"that", "had", "very"}
+        else f"The word '{m.group(1)}' is repeated."
+    ),
+]
+
+# 按语言注册的语法规则
+GRAMMAR_RULES: Dict[str, List[GrammarRule]] = {
+    "en": ENGLISH_RULES,
+}
+
+
+@dataclass
+class LocalAnalysis:
+    """本地分析结果"""
+    grammar: List[str] = field(default_factory=list)
+    pronunciation: List[str] = field(default_factory=list)
+
+    def to_events(self) -> List[Dict[str, str]]:
+        """
+        转换为与LLM输出相同类型的事件，没有发现问题的部分不输出
+
+        Returns:
+            grammarSuggestion 和 pronunciationSuggestion 事件
+        """
+        events = []
+        if self.pronunciation:
+            events.append({"type": "pronunciationSuggestion", "data": "\n".join(self.pronunciation)})
+        if self.grammar:
+            events.append({"type": "grammarSuggestion", "data": "\n".join(self.grammar)})
+        return events
+
+
+class LocalAnalyzer:
+    """基于规则和识别置信度的本地口语分析器
+
+    Attributes:
+        language: 规则语言
+        low_confidence_threshold: 低于该识别概率的单词视为发音不清楚
+        max_pronunciation_hints: 最多给出的发音提示数量
+    """
+
+    def __init__(self, language: str = "en", low_confidence_threshold: float = 0.5, max_pronunciation_hints: int = 3):
+        self.language = language
+        self.low_confidence_threshold = low_confidence_threshold
+        self.max_pronunciation_hints = max_pronunciation_hints
+
+    def analyze(self, text: str, words: Sequence[WordInfo] = ()) -> LocalAnalysis:
+        """
+        分析识别出的文本和逐词置信度
+
+        Args:
+            text: 识别出的文本
+            words: Whisper的逐词结果
+
+        Returns:
+            本地分析结果
+        """
+        analysis = LocalAnalysis(
+            grammar=self.check_grammar(text),
+            pronunciation=self.check_pronunciation(words)
+        )
+        logger.debug(f"本地分析完成: {analysis}")
+        return analysis
+
+    def check_grammar(self, text: str) -> List[str]:
+        """
+        用语法规则检查文本
+
+        Args:
+            text: 识别出的文本
+
+        Returns:
+            去重后的语法建议
+        """
+        suggestions = []
+        for rule in GRAMMAR_RULES.get(self.language, []):
+            for match in rule.pattern.finditer(text):
+                message = rule.message(match)
+                if message and message not in suggestions:
+                    suggestions.append(message)
+        return suggestions
+
+    def check_pronunciation(self, words: Sequence[WordInfo]) -> List[str]:
+        """
+        找出识别置信度最低的单词作为发音提示
+
+        Args:
+            words: Whisper的逐词结果
+
+        Returns:
+            发音建议
+        """
+        unclear = sorted(
+            (word for word in words if word.probability < self.low_confidence_threshold and word.word.strip()),
+            key=lambda word: word.probability
+        )[:self.max_pronunciation_hints]
+        return [
+            f"The word '{word.word.strip()}' at {word.start:.1f}s was hard to recognize "
+            f"(confidence {word.probability:.0%}). Try pronouncing it more clearly."
+            for word in sorted(unclear, key=lambda word: word.start)
+        ]
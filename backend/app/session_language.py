@@ -0,0 +1,99 @@
+"""
+会话语言模块
+
+faster-whisper在没有指定语言时，每次识别都要先做一遍语言检测。
+同一段对话里用户的语言基本不变，这里在第一句话上检测语言并固定下来，
+后续识别直接指定语言跳过检测，语音合成也使用同一种语言。
+当固定语言下的识别质量明显变差时，重新检测一次，以便用户切换语言。
+"""
+
+import threading
+from typing import Optional, Union
+
+import numpy as np
+
+from app.logger import logger
+from app.speech_recognition import Transcription, WhisperRecognizer
+
+# Whisper的语言代码与XTTS不一致的部分
+WHISPER_TO_XTTS = {"zh": "zh-cn"}
+# XTTS v2支持的语言
+XTTS_LANGUAGES = {
+    "en", "es", "fr", "de", "it", "pt", "pl", "tr", "ru", "nl",
+    "cs", "ar", "zh-cn", "hu", "ko", "ja", "hi",
+}
+
+
+class SessionLanguage:
+    """检测一次后固定的会话语言
+
+    Attributes:
+        recognizer: 语音识别器
+        default_tts_language: 还没有检测出语言，或检测出的语言不支持合成时使用的合成语言
+        detect_threshold: 检测概率不低于该值时才固定语言
+        redetect_logprob: 固定语言下识别的平均对数概率低于该值时重新检测
+        language: 当前固定的Whisper语言代码，为None时每次都自动检测
+    """
+
+    def __init__(
+        self,
+        recognizer: WhisperRecognizer,
+        default_tts_language: str = "en",
+        detect_threshold: float = 0.7,
+        redetect_logprob: float = -1.0
+    ):
+        self.recognizer = recognizer
+        self.default_tts_language = default_tts_language
+        self.detect_threshold = detect_threshold
+        self.redetect_logprob = redetect_logprob
+        self.language: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def tts_language(self) -> str:
+        """与识别语言一致的合成语言"""
+        if self.language is None:
+            return self.default_tts_language
+        language = WHISPER_TO_XTTS.get(self.language, self.language)
+        return language if language in XTTS_LANGUAGES else self.default_tts_language
+
+    def reset(self):
+        """清除固定的语言，下一句话重新检测"""
+        with self._lock:
+            self.language = None
+
+    def _pin(self, language: str, probability: float):
+        with self._lock:
+            if probability < self.detect_threshold or language == self.language:
+                return
+            logger.info(f"固定会话语言: {self.language} -> {language} (概率 {probability:.2f})")
+            self.language = language
+
+    def transcribe(self, audio: Union[bytes, np.ndarray], **options) -> Transcription:
+        """
+        按会话语言识别音频，这是阻塞调用
+
+        Args:
+            audio: 音频字节数据或已解码的音频
+            options: 传给识别器的其它参数，例如TieredRecognizer的tier
+
+        Returns:
+            识别结果
+        """
+        pinned = self.language
+        if pinned is None:
+            transcription = self.recognizer.transcribe(audio, **options)
+            self._pin(transcription.language, transcription.language_probability)
+            return transcription
+
+        transcription = self.recognizer.transcribe(audio, language=pinned, **options)
+        quality = transcription.mean_logprob
+        if quality is None or quality >= self.redetect_logprob:
+            return transcription
+
+        # 固定语言下识别质量很差，可能是用户换了语言，重新检测
+        language, probability = self.recognizer.detect_language(audio)
+        if language == pinned or probability < self.detect_threshold:
+            return transcription
+        self._pin(language, probability)
+        return self.recognizer.transcribe(audio, language=language, **options)
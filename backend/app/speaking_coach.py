@@ -1,17 +1,48 @@
+import asyncio
+import contextlib
+import functools
 import os
-import re
-from typing import List, Dict, Any, AsyncGenerator
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, AsyncGenerator, AsyncIterator, Iterator, Optional, Tuple, Union
 
 from loguru import logger
 import base64
 from app.llm.openaiLLM import OpenaiLLM
-from app.speech_recognition import WhisperRecognizer
+from app.llm.resilient import ResilientLLM
+from app.llm.router import LLMRouter
+from app.llm.cache import CachingLLM
+from app.speech_recognition import WhisperRecognizer, Transcription
+from app.whisper_models import TieredRecognizer, WhisperModelManager
 from app.speech_synthesis import CoquiTTS
-from app.config import Config
-from app.prompt.coach import SYSTEM_PROMPT
+from app.tts_scheduler import TTSScheduler
+from app.audio_cache import AudioCache, audio_key
+from app.config import Config, PROJECT_ROOT
+from app.prompt.coach import SYSTEM_PROMPT, RESPONSE_ONLY_SYSTEM_PROMPT
+from app.local_analysis import LocalAnalysis, LocalAnalyzer
+from app.transcript_cache import TranscriptCache, audio_fingerprint
+from app.session_language import SessionLanguage
+from app.vad import EnergyVAD
+from app.tag_stream import TagEvent, TagStreamParser
+from app.text_normalizer import StreamingNormalizer, get_normalizer
 # 加载配置
 config = Config()
 
+
+@dataclass
+class TurnState:
+    """一轮对话中输出和语音合成需要的状态"""
+    session_id: str
+    started_at: float
+    language: str
+    inline_audio: bool = True
+    delta: bool = False
+    sentences: Optional[StreamingNormalizer] = None
+    sentence_count: int = 0
+    jobs: List[Tuple[str, asyncio.Future]] = field(default_factory=list)
+
+
 class SpeakingCoach:
     """口语教练类，整合语音识别、语音合成和大语言模型"""
 
@@ -29,7 +60,14 @@ class SpeakingCoach:
             system_prompt: 系统提示
         """
         self.language = config.tts.language or language
-        self.system_prompt = SYSTEM_PROMPT
+        # 本地分析模式下语法和发音建议由本地规则生成，LLM只生成回复
+        self.local_analyzer = None
+        if config.coach.analysis_mode == "local":
+            self.local_analyzer = LocalAnalyzer(
+                language=self.language,
+                low_confidence_threshold=config.coach.low_confidence_threshold
+            )
+        self.system_prompt = RESPONSE_ONLY_SYSTEM_PROMPT if self.local_analyzer else SYSTEM_PROMPT
         
         # 获取模型路径
         tts_model_name = config.tts.model
@@ -44,36 +82,112 @@ class SpeakingCoach:
             tts_model_path = None
         
         # 初始化各个组件
-        self.llm = OpenaiLLM()
-        self.recognizer = WhisperRecognizer(whisper_model_path)
+        # 配置了多个提供方时按首个token延迟路由
+        if config.router.enabled:
+            self.llm = LLMRouter()
+        else:
+            self.llm = ResilientLLM(OpenaiLLM()) if config.resilience.enabled else OpenaiLLM()
+        # 第一轮等历史较短的请求命中缓存时直接回放
+        if config.response_cache.enabled:
+            self.llm = CachingLLM(self.llm)
+        # 配置了fast或accurate分级时按录音时长和置信度选择模型
+        if config.whisper.fast_model or config.whisper.accurate_model:
+            self.recognizer = TieredRecognizer(WhisperModelManager(config.whisper))
+        else:
+            self.recognizer = WhisperRecognizer(whisper_model_path)
+        # 识别前的语音活动检测
+        self.vad = None
+        if config.vad.enabled:
+            self.vad = EnergyVAD(
+                sampling_rate=self.recognizer.sampling_rate,
+                frame_ms=config.vad.frame_ms,
+                threshold_db=config.vad.threshold_db,
+                margin_db=config.vad.margin_db,
+                min_speech_ms=config.vad.min_speech_ms,
+                padding_ms=config.vad.padding_ms
+            )
+        # 会话语言：第一句话检测后固定，识别和合成都使用该语言
+        self.session_language = None
+        if config.whisper.pin_language:
+            self.session_language = SessionLanguage(
+                self.recognizer,
+                default_tts_language=self.language,
+                detect_threshold=config.whisper.detect_threshold,
+                redetect_logprob=config.whisper.redetect_logprob
+            )
+        self.transcript_cache = None
+        if config.whisper.cache_entries > 0:
+            self.transcript_cache = TranscriptCache(
+                max_entries=config.whisper.cache_entries,
+                disk_dir=PROJECT_ROOT / config.whisper.cache_dir if config.whisper.cache_dir else None
+            )
         self.synthesizer = CoquiTTS(model_name=tts_model_name, model_path=tts_model_path)
+        self.tts_scheduler = TTSScheduler(
+            self.synthesizer,
+            workers=config.tts.workers,
+            cache=AudioCache(max_bytes=config.tts.audio_cache_mb * 1024 * 1024)
+        )
         
         # 对话历史
         self.conversation_history: List[dict] = []
         
         logger.info("SpeakingCoach initialized")
 
-    async def process_audio_input_stream(self, audio_bytes: bytes) -> AsyncGenerator[Dict[str, Any], None]:
+    async def process_audio_input_stream(
+        self,
+        audio_bytes: bytes,
+        session_id: Optional[str] = None,
+        inline_audio: bool = True,
+        delta: bool = False,
+        tier: Optional[str] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         流式处理音频输入
         
         Args:
             audio_bytes: 音频字节数据
+            session_id: 会话ID，用于TTS调度
+            inline_audio: 音频事件是否内嵌base64编码的音频
+            delta: 是否在生成过程中增量输出各部分的内容
+            tier: 识别分级（fast/default/accurate），为None时按录音时长和置信度自动选择，
+                只在配置了模型分级时生效
         
         Yields:
             包含类型和数据的字典
         """
         try:
-            # 1. 语音识别：将音频转换为文本
-            user_text = self.recognizer.transcribe_from_bytes(audio_bytes)
+            # 1. 语音识别：将音频转换为文本，同时得到逐词时间和置信度
+            transcription = await self._transcribe(audio_bytes, tier)
+            user_text = transcription.text
             logger.info(f"识别的文本: {user_text}")
             
-            # 输出识别的文本
-            yield {"type": "recognized_text", "data": user_text}
+            # 没有说话时直接结束本轮，不调用LLM和语音合成
+            if not user_text.strip():
+                yield {"type": "no_speech", "data": ""}
+                return
+            
+            # 输出识别的文本和逐词信息
+            yield {"type": "recognized_text", "data": user_text, "transcription": transcription.to_dict()}
+            
+            # 本地分析与LLM生成并行执行
+            analysis_task = None
+            if self.local_analyzer is not None:
+                analysis_task = asyncio.create_task(
+                    asyncio.to_thread(self.local_analyzer.analyze, user_text, list(transcription.iter_words()))
+                )
             
             # 2. 流式处理文本输入
-            async for response in self.process_text_input_stream(user_text):
+            async for response in self.process_text_input_stream(user_text, session_id, inline_audio, delta):
+                # 本地分析一完成就输出，不等待LLM结束
+                if analysis_task is not None and analysis_task.done():
+                    for event in self._analysis_events(await self._analysis_result(analysis_task), delta):
+                        yield event
+                    analysis_task = None
                 yield response
+            
+            if analysis_task is not None:
+                for event in self._analysis_events(await self._analysis_result(analysis_task), delta):
+                    yield event
                 
         except Exception as e:
             logger.error(f"流式处理音频输入失败: {str(e)}")
@@ -82,12 +196,108 @@ class SpeakingCoach:
 
     
     
-    async def process_text_input_stream(self, text: str) -> AsyncGenerator[Dict[str, Any], None]:
+    @staticmethod
+    async def _analysis_result(analysis_task: asyncio.Task) -> Optional[LocalAnalysis]:
+        """等待本地分析结果，分析失败只记录日志，本轮继续输出LLM的反馈"""
+        try:
+            return await analysis_task
+        except Exception as e:
+            logger.warning(f"本地分析失败，本轮不输出本地分析结果: {e!r}")
+            return None
+
+    @staticmethod
+    def _analysis_events(analysis: Optional[LocalAnalysis], delta: bool) -> List[Dict[str, Any]]:
+        """本地分析结果的输出事件，增量模式下与LLM生成的部分一样以 {标签}_done 输出"""
+        if analysis is None:
+            return []
+        events = analysis.to_events()
+        if delta:
+            events = [{**event, "type": f"{event['type']}_done"} for event in events]
+        return events
+
+    @property
+    def tts_language(self) -> str:
+        """语音合成使用的语言，开启会话语言时跟随识别出的语言"""
+        if self.session_language is not None:
+            return self.session_language.tts_language
+        return self.language
+
+    async def _transcribe(self, audio_bytes: bytes, tier: Optional[str] = None) -> Transcription:
+        """
+        识别音频，相同的音频直接返回缓存的识别结果
+        
+        Args:
+            audio_bytes: 音频字节数据
+            tier: 识别分级，为None时自动选择
+            
+        Returns:
+            识别结果
+        """
+        cache_key = None
+        if self.transcript_cache is not None:
+            # 固定的语言会影响识别结果，作为缓存键的一部分
+            pinned = self.session_language.language if self.session_language else None
+            cache_key = audio_fingerprint(
+                audio_bytes, f"{self.recognizer.model_id}:{pinned or 'auto'}:{tier or 'auto'}"
+            )
+            transcription = self.transcript_cache.get(cache_key)
+            if transcription is not None:
+                logger.info("命中识别结果缓存，跳过语音识别")
+                return transcription
+        
+        # 解码、语音检测和Whisper识别都是阻塞的CPU计算，放到线程中执行
+        transcription = await asyncio.to_thread(self._transcribe_blocking, audio_bytes, tier)
+        if cache_key is not None:
+            self.transcript_cache.put(cache_key, transcription)
+        return transcription
+
+    def _transcribe_blocking(self, audio_bytes: bytes, tier: Optional[str] = None) -> Transcription:
+        """
+        裁掉首尾静音后识别音频，没有语音时返回空文本的识别结果
+        
+        Args:
+            audio_bytes: 音频字节数据
+            tier: 识别分级，为None时自动选择
+            
+        Returns:
+            识别结果，时间以原始录音为准
+        """
+        recognize = self.session_language.transcribe if self.session_language else self.recognizer.transcribe
+        # 只有分级识别器支持指定分级
+        options = {"tier": tier} if tier and isinstance(self.recognizer, TieredRecognizer) else {}
+        transcribe = functools.partial(recognize, **options)
+        if self.vad is None:
+            return transcribe(audio_bytes)
+        
+        audio = self.recognizer.decode(audio_bytes)
+        duration = len(audio) / self.recognizer.sampling_rate
+        span = self.vad.speech_span(audio)
+        if span is None:
+            logger.info(f"未检测到语音，跳过识别: 录音时长 {duration:.2f}s")
+            return Transcription(text="", duration=duration)
+        
+        start, end = span
+        transcription = transcribe(audio[start:end])
+        transcription.shift(start / self.recognizer.sampling_rate)
+        transcription.duration = duration
+        return transcription
+
+    async def process_text_input_stream(
+        self,
+        text: str,
+        session_id: Optional[str] = None,
+        inline_audio: bool = True,
+        delta: bool = False
+    ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         流式处理文本输入
         
         Args:
             text: 用户输入的文本
+            session_id: 会话ID，用于TTS调度，为空时自动生成
+            inline_audio: 音频事件是否内嵌base64编码的音频，为False时客户端通过audio_key获取音频
+            delta: 增量模式，各部分的内容在生成过程中以 {标签}_delta 事件输出，
+                结束时以 {标签}_done 事件输出完整内容，代替一次性输出的 {标签} 事件
         
         Yields:
             包含类型和数据的字典：
@@ -95,8 +305,20 @@ class SpeakingCoach:
             - 发音建议类型: {"type": "pronunciationSuggestion", "data": 发音建议文本}
             - 语法建议类型: {"type": "grammarSuggestion", "data": 语法建议文本}
             - 用户响应建议类型: {"type": "userResponseSuggestion", "data": 用户响应建议文本}
-            - 音频类型: {"type": "audio", "data": 音频字节的base64编码字符串, "format": "mp3"}
+            - 音频类型: {"type": "audio", "data": 音频字节的base64编码字符串, "format": "mp3", "audio_key": 内容哈希}，response按句子逐条输出，
+              每句合成完成后立即按顺序输出，不等response生成结束；不内嵌音频时没有data，改为音频字节数size
+            - 建议音频类型: {"type": "suggestionAudio", "data": 用户响应建议的单行文本, "audio_key": 内容哈希}，音频在后台预合成
+            - 标签外的文本: {"type": "text", "data": 文本}
+            - 增量模式下: {"type": "response_delta", "data": 新生成的文本}，{"type": "response_done", "data": 完整的响应文本}，其它标签同理
         """
+        turn = TurnState(
+            session_id=session_id or str(uuid.uuid4()),
+            started_at=time.monotonic(),
+            language=self.tts_language,
+            inline_audio=inline_audio,
+            delta=delta
+        )
+        turn.sentences = StreamingNormalizer(get_normalizer(turn.language))
         try:
             # 1. 添加到对话历史
             self.conversation_history.append({"role": "user", "content": text})
@@ -107,85 +329,25 @@ class SpeakingCoach:
             # 用于保存完整响应的缓冲区
             full_response = ""
             
-            # XML解析状态和缓冲区
-            current_tag = None
-            content_buffer = ""
-            tag_start_pattern = re.compile(r'<(response|pronunciationSuggestion|grammarSuggestion|userResponseSuggestion)>')
-            tag_end_pattern = re.compile(r'</(response|pronunciationSuggestion|grammarSuggestion|userResponseSuggestion)>')
+            # 增量解析标签，跨文本块的标签也能识别
+            parser = TagStreamParser()
             
-            # 从LLM获取流式响应
-            async for text_chunk in self.llm.generate_stream(messages_with_system):
-                full_response += text_chunk
-                
-                # 处理当前文本块
-                i = 0
-                while i < len(text_chunk):
-                    char = text_chunk[i]
-                    
-                    # 检查开始标签
-                    if char == '<' and current_tag is None:
-                        # 尝试匹配开始标签
-                        tag_match = None
-                        for j in range(i, min(i + 35, len(text_chunk))):
-                            partial_tag = text_chunk[i:j+1]
-                            start_match = tag_start_pattern.match(partial_tag)
-                            if start_match:
-                                tag_match = start_match
-                                current_tag = start_match.group(1)
-                                i = j + 1
-                                break
-                        
-                        if tag_match:
-                            content_buffer = ""  # 重置内容缓冲区
-                            continue
-                    
-                    # 检查结束标签
-                    if char == '<' and current_tag is not None:
-                        # 尝试匹配结束标签
-                        for j in range(i, min(i + 36, len(text_chunk))):
-                            partial_tag = text_chunk[i:j+1]
-                            end_match = tag_end_pattern.match(partial_tag)
-                            if end_match and end_match.group(1) == current_tag:
-                                # 发送标签内容
-                                if content_buffer:
-                                    clean_content = content_buffer.strip()
-                                    if clean_content:
-                                        yield {"type": current_tag, "data": clean_content}
-                                        
-                                        # 为response生成音频
-                                        if current_tag == "response":
-                                            clean_text = self._clean_text_for_audio(clean_content)
-                                            audio_bytes = await self.synthesizer.synthesize(clean_text, language=self.language)
-                                            yield {"type": "audio", "data": base64.b64encode(audio_bytes).decode('utf-8'), "format": "mp3"}
-                                
-                                current_tag = None
-                                content_buffer = ""
-                                i = j + 1
-                                break
-                        
-                        if current_tag is None:  # 如果找到结束标签
-                            continue
-                    
-                    # 在标签内部收集内容
-                    if current_tag is not None:
-                        content_buffer += char
-                    else:
-                        # 不在任何标签内，可能是其他文本或未完成的标签
-                        yield {"type": "text", "data": char}
-                    
-                    i += 1
+            # 从LLM获取流式响应，等待文本的同时输出已经合成好的句子音频
+            chunks = self._with_ready_audio(self.llm.generate_stream(messages_with_system), turn)
+            async with contextlib.aclosing(chunks):
+                async for text_chunk in chunks:
+                    if isinstance(text_chunk, dict):
+                        yield text_chunk
+                        continue
+                    full_response += text_chunk
+                    for tag_event in parser.feed(text_chunk):
+                        async for event in self._handle_tag_event(tag_event, turn):
+                            yield event
             
-            # 异常情况兜底
-            if current_tag is not None and content_buffer:
-                clean_content = content_buffer.strip()
-                if clean_content:
-                    yield {"type": current_tag, "data": clean_content}
-                    
-                    # 为response生成音频
-                    if current_tag == "response":
-                        clean_text = self._clean_text_for_audio(clean_content)
-                        audio_bytes = await self.synthesizer.synthesize(clean_text, language=self.language)
-                        yield {"type": "audio", "data": base64.b64encode(audio_bytes).decode('utf-8'), "format": "mp3"}
+            # 异常情况兜底：输出未闭合标签的内容
+            for tag_event in parser.close():
+                async for event in self._handle_tag_event(tag_event, turn):
+                    yield event
             
             # 3. 添加完整响应到对话历史
             self.conversation_history.append({"role": "assistant", "content": full_response})
@@ -195,54 +357,183 @@ class SpeakingCoach:
             # 输出错误信息
             yield {"type": "error", "data": str(e)}
             raise
-    
-    def _clean_text_for_audio(self, text: str) -> str:
+        finally:
+            # 客户端断开或出错时，丢弃本轮尚未合成的句子
+            self.tts_scheduler.cancel_session(turn.session_id)
+
+    async def _handle_tag_event(self, tag_event: TagEvent, turn: TurnState) -> AsyncGenerator[Dict[str, Any], None]:
         """
-        处理文本，移除markdown标记和特殊字符，保留原始纯文本用于语音合成
+        将解析出的片段转换为输出事件
+
+        response的内容一边生成一边规范化，每凑够一个完整的句子就提交语音合成，
+        标签结束时等待并输出剩余句子的音频
         
         Args:
-            text: 输入文本，可能包含markdown标记
-            
-        Returns:
-            清理后的文本
-        """
-        # 移除markdown链接，保留链接文本
-        text = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', text)
-        
-        # 移除markdown标题标记
-        text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
-        
-        # 移除markdown加粗和斜体
-        text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # 加粗
-        text = re.sub(r'\*([^*]+)\*', r'\1', text)      # 斜体
-        text = re.sub(r'__([^_]+)__', r'\1', text)      # 加粗
-        text = re.sub(r'_([^_]+)_', r'\1', text)        # 斜体
+            tag_event: 解析出的片段
+            turn: 本轮的状态
         
-        # 移除markdown代码块和行内代码
-        text = re.sub(r'```[a-zA-Z]*\n([\s\S]*?)\n```', r'\1', text)  # 代码块
-        text = re.sub(r'`([^`]+)`', r'\1', text)                      # 行内代码
-        
-        # 移除markdown列表标记
-        text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)  # 无序列表
-        text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)  # 有序列表
-        
-        # 移除markdown引用标记
-        text = re.sub(r'^\s*>\s+', '', text, flags=re.MULTILINE)
-        
-        # 处理HTML标签
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        # 处理特殊转义字符
-        text = text.replace('&amp;', '&')
-        text = text.replace('&lt;', '<')
-        text = text.replace('&gt;', '>')
-        text = text.replace('&quot;', '"')
-        text = text.replace('&#39;', "'")
+        Yields:
+            输出事件
+        """
+        if tag_event.kind == "text":
+            # 不在任何标签内的文本
+            yield {"type": "text", "data": tag_event.data}
+            return
+        if tag_event.kind == "delta":
+            if tag_event.tag == "response":
+                self._submit_sentences(turn, turn.sentences.feed(tag_event.data))
+            if turn.delta:
+                yield {"type": f"{tag_event.tag}_delta", "data": tag_event.data}
+            return
         
-        # 移除多余的空白字符
-        text = re.sub(r'\s+', ' ', text).strip()
+        clean_content = tag_event.data.strip()
+        if tag_event.tag == "response":
+            self._submit_sentences(turn, turn.sentences.flush())
+        if not clean_content:
+            return
+        yield {"type": f"{tag_event.tag}_done" if turn.delta else tag_event.tag, "data": clean_content}
         
-        return text
-    
-    
-    
\ No newline at end of file
+        # 输出response的音频
+        if tag_event.tag == "response":
+            async for audio_event in self._synthesize_response(turn):
+                yield audio_event
+        elif tag_event.tag == "userResponseSuggestion":
+            for suggestion_event in self._presynthesize_suggestions(clean_content, turn):
+                yield suggestion_event
+
+    def _submit_sentences(self, turn: TurnState, sentences: List[str]):
+        """
+        提交规范化后的句子的语音合成任务，句子越靠前优先级越高
+
+        Args:
+            turn: 本轮的状态
+            sentences: 规范化后的句子
+        """
+        for sentence in sentences:
+            future = self.tts_scheduler.submit(
+                sentence,
+                language=turn.language,
+                session_id=turn.session_id,
+                sentence_index=turn.sentence_count,
+                turn_started_at=turn.started_at
+            )
+            turn.sentence_count += 1
+            turn.jobs.append((sentence, future))
+
+    async def _with_ready_audio(
+        self,
+        chunks: AsyncIterator[str],
+        turn: TurnState
+    ) -> AsyncGenerator[Union[str, Dict[str, Any]], None]:
+        """
+        转发LLM的文本块，等待下一块文本的同时输出已经合成完成的response句子音频
+
+        Args:
+            chunks: LLM的流式文本
+            turn: 本轮的状态
+
+        Yields:
+            LLM的文本块，或音频类型的字典
+        """
+        iterator = chunks.__aiter__()
+        next_chunk = asyncio.ensure_future(iterator.__anext__())
+        try:
+            while True:
+                # 只等待下一个要输出的句子，保证音频按句子顺序输出
+                waiting = {next_chunk, turn.jobs[0][1]} if turn.jobs else {next_chunk}
+                await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for event in self._ready_audio(turn):
+                    yield event
+                if not next_chunk.done():
+                    continue
+                try:
+                    text_chunk = next_chunk.result()
+                except StopAsyncIteration:
+                    return
+                yield text_chunk
+                next_chunk = asyncio.ensure_future(iterator.__anext__())
+        finally:
+            # 客户端断开时停止读取LLM的输出
+            if not next_chunk.done():
+                next_chunk.cancel()
+                await asyncio.wait({next_chunk})
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+    def _ready_audio(self, turn: TurnState) -> Iterator[Dict[str, Any]]:
+        """按顺序输出已经合成完成的句子的音频，遇到尚未完成的句子时停止"""
+        while turn.jobs and turn.jobs[0][1].done():
+            sentence, future = turn.jobs.pop(0)
+            yield self._audio_event(turn, sentence, future.result())
+
+    async def _synthesize_response(self, turn: TurnState) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        等待并按顺序输出剩余的response句子的音频
+
+        Args:
+            turn: 本轮的状态
+
+        Yields:
+            音频类型的字典
+        """
+        jobs, turn.jobs = turn.jobs, []
+        for sentence, future in jobs:
+            yield self._audio_event(turn, sentence, await future)
+
+    def _audio_event(self, turn: TurnState, sentence: str, audio_bytes: bytes) -> Dict[str, Any]:
+        """构造一个句子的音频事件"""
+        key = audio_key(sentence, turn.language)
+        event = {"type": "audio", "format": "mp3", "audio_key": key}
+        if turn.inline_audio:
+            event["data"] = base64.b64encode(audio_bytes).decode('utf-8')
+        else:
+            # 音频留在缓存中，客户端通过 /audio/{audio_key} 以二进制获取，取走之前不会被淘汰
+            self.tts_scheduler.cache.put(key, audio_bytes, pin_seconds=config.tts.audio_pin_seconds)
+            event["size"] = len(audio_bytes)
+        return event
+
+    def _pin_audio(self, key: str, future: asyncio.Future):
+        """预合成完成后固定音频，直到客户端通过audio_key取走或到期"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.tts_scheduler.cache.put(key, future.result(), pin_seconds=config.tts.audio_pin_seconds)
+
+    def _presynthesize_suggestions(self, content: str, turn: TurnState) -> List[Dict[str, Any]]:
+        """
+        在后台预合成用户响应建议的每一行
+
+        此时response的音频已经全部完成，预合成任务以后台优先级排在所有前台任务之后，
+        同一时间最多合成一个。合成不能中途抢占，正在合成的建议最多让其它会话的下一句回复多等一句的时间。
+        客户端通过audio_key获取音频。
+
+        Args:
+            content: userResponseSuggestion的完整内容
+            turn: 本轮的状态
+
+        Returns:
+            每行建议对应的suggestionAudio事件
+        """
+        if not config.tts.presynthesize_suggestions:
+            return []
+
+        normalizer = get_normalizer(turn.language)
+        events = []
+        for index, line in enumerate(content.splitlines()):
+            clean_line = normalizer.normalize(line)
+            if not clean_line:
+                continue
+            key = audio_key(clean_line, turn.language)
+            future = self.tts_scheduler.submit(
+                clean_line,
+                language=turn.language,
+                session_id=turn.session_id,
+                sentence_index=index,
+                background=True
+            )
+            future.add_done_callback(functools.partial(self._pin_audio, key))
+            events.append({
+                "type": "suggestionAudio",
+                "data": clean_line,
+                "audio_key": key
+            })
+        return events
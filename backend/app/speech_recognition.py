@@ -1,21 +1,127 @@
 import os
 import logging
 import io
-from typing import Optional
-from faster_whisper import WhisperModel
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from faster_whisper import WhisperModel, decode_audio
+
+from app.config import config
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class WordInfo:
+    """识别出的单词及其时间和置信度"""
+    word: str
+    start: float
+    end: float
+    probability: float
+
+
+def _float_array(values=()) -> np.ndarray:
+    return np.asarray(values, dtype=np.float32)
+
+
+@dataclass
+class Transcription:
+    """语音识别结果
+
+    逐词和逐段的数值信息以列存储在float32数组中，按下标对应：
+    words[i] 的时间是 word_starts[i] ~ word_ends[i]，置信度是 word_probabilities[i]；
+    第 j 段包含的单词是 words[segment_word_offsets[j]:segment_word_offsets[j + 1]]。
+    """
+    text: str
+    language: str = ""
+    language_probability: float = 0.0
+    duration: float = 0.0
+    words: List[str] = field(default_factory=list)
+    word_starts: np.ndarray = field(default_factory=_float_array)
+    word_ends: np.ndarray = field(default_factory=_float_array)
+    word_probabilities: np.ndarray = field(default_factory=_float_array)
+    segment_starts: np.ndarray = field(default_factory=_float_array)
+    segment_ends: np.ndarray = field(default_factory=_float_array)
+    avg_logprobs: np.ndarray = field(default_factory=_float_array)
+    no_speech_probs: np.ndarray = field(default_factory=_float_array)
+    segment_word_offsets: np.ndarray = field(default_factory=lambda: np.zeros(1, dtype=np.int32))
+
+    def iter_words(self) -> Iterator[WordInfo]:
+        """逐个返回单词及其时间和置信度"""
+        for i, word in enumerate(self.words):
+            yield WordInfo(word, float(self.word_starts[i]), float(self.word_ends[i]), float(self.word_probabilities[i]))
+
+    def shift(self, offset: float) -> "Transcription":
+        """
+        将所有时间平移offset秒，用于裁剪掉开头静音后还原到原始录音的时间
+
+        Args:
+            offset: 平移的秒数
+
+        Returns:
+            识别结果本身
+        """
+        for name in ("word_starts", "word_ends", "segment_starts", "segment_ends"):
+            setattr(self, name, getattr(self, name) + np.float32(offset))
+        return self
+
+    @property
+    def mean_logprob(self) -> Optional[float]:
+        """各段平均对数概率的均值，衡量整体识别质量，没有识别出内容时为None"""
+        if self.avg_logprobs.size == 0:
+            return None
+        return float(self.avg_logprobs.mean())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为可以JSON序列化的列式字典，用于流式接口返回
+
+        Returns:
+            识别结果字典
+        """
+        def rounded(values: np.ndarray, digits: int = 3) -> List[float]:
+            return np.round(values.astype(np.float64), digits).tolist()
+
+        return {
+            "text": self.text,
+            "language": self.language,
+            "language_probability": round(self.language_probability, 3),
+            "duration": round(self.duration, 3),
+            "words": [word.strip() for word in self.words],
+            "word_starts": rounded(self.word_starts, 2),
+            "word_ends": rounded(self.word_ends, 2),
+            "word_probabilities": rounded(self.word_probabilities),
+            "segments": {
+                "starts": rounded(self.segment_starts, 2),
+                "ends": rounded(self.segment_ends, 2),
+                "avg_logprobs": rounded(self.avg_logprobs),
+                "no_speech_probs": rounded(self.no_speech_probs),
+                "word_offsets": self.segment_word_offsets.tolist(),
+            },
+        }
+
+
 class WhisperRecognizer:
     """使用 Whisper 进行语音识别的类"""
     
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        device: Optional[str] = None,
+        compute_type: Optional[str] = None,
+        cpu_threads: Optional[int] = None,
+        num_workers: Optional[int] = None
+    ):
         """
         初始化 WhisperRecognizer
         
         Args:
             model_path: Whisper 模型路径，如果为 None 则使用默认模型
+            device: 运行设备，为None时使用 [whisper] 配置，下同
+            compute_type: 量化类型
+            cpu_threads: CPU线程数
+            num_workers: 并发识别数
         """
         if model_path is None:
             # 使用默认模型路径
@@ -23,12 +129,15 @@ class WhisperRecognizer:
         
         # 使用支持的设备配置
         # 注意：faster-whisper 只支持 "cpu", "cuda", 或 "auto" 作为设备类型
+        # 标识当前模型，用于区分不同模型的识别结果缓存
+        self.model_id = os.path.basename(os.path.normpath(model_path))
+        settings = config.whisper
         self.model = WhisperModel(
             model_path,
-            device="auto",  # 自动选择最佳设备 (CPU 或 CUDA)
-            compute_type="int8", 
-            cpu_threads=8,  # 设置 CPU 线程数
-            num_workers=2   # 设置工作线程数
+            device=device or settings.device,
+            compute_type=compute_type or settings.compute_type,
+            cpu_threads=cpu_threads or settings.cpu_threads,
+            num_workers=num_workers or settings.num_workers
         )
         logger.info(f"Initialized Whisper model from {model_path}")
     
@@ -44,21 +153,104 @@ class WhisperRecognizer:
         Returns:
             识别出的文本
         """
+        return self.transcribe(audio_bytes).text
+
+    @property
+    def sampling_rate(self) -> int:
+        """模型要求的采样率"""
+        return self.model.feature_extractor.sampling_rate
+
+    def decode(self, audio_bytes: bytes) -> np.ndarray:
+        """
+        将音频字节解码为模型采样率的单声道float32数组
+        
+        Args:
+            audio_bytes: 音频字节数据
+        
+        Returns:
+            解码后的音频
+        """
+        return decode_audio(io.BytesIO(audio_bytes), sampling_rate=self.sampling_rate)
+
+    def detect_language(self, audio: Union[bytes, np.ndarray]) -> Tuple[str, float]:
+        """
+        只检测音频的语言，不做完整的转录
+        
+        Args:
+            audio: 音频字节数据或已解码的音频
+        
+        Returns:
+            (语言代码, 检测概率)
+        """
+        if isinstance(audio, bytes):
+            audio = self.decode(audio)
+        language, probability, _ = self.model.detect_language(
+            audio,
+            vad_filter=True,
+            vad_parameters=dict(min_silence_duration_ms=500)
+        )
+        logger.info(f"Detected language {language} ({probability:.2f})")
+        return language, probability
+
+    def transcribe(
+        self,
+        audio: Union[bytes, np.ndarray],
+        word_timestamps: bool = True,
+        language: Optional[str] = None
+    ) -> Transcription:
+        """
+        将音频字节数据转换为文本，一次解码同时得到逐词的时间和置信度
+        
+        Args:
+            audio: 音频字节数据或已解码的音频
+            word_timestamps: 是否计算逐词时间戳和置信度
+            language: 指定语言时跳过语言检测，为None时自动检测
+        
+        Returns:
+            识别结果
+        """
         try:
-            # 将字节流转换为 BytesIO 对象
-            audio_io = io.BytesIO(audio_bytes)
+            # 字节流转换为 BytesIO 对象，已解码的数组直接使用
+            if isinstance(audio, bytes):
+                audio = io.BytesIO(audio)
             
-            # 直接使用 BytesIO 对象作为输入进行转录
-            segments, _ = self.model.transcribe(
-                audio_io,
+            segments, info = self.model.transcribe(
+                audio,
                 vad_filter=True,  # 使用语音活动检测过滤
-                vad_parameters=dict(min_silence_duration_ms=500)  # 设置静音检测参数
+                vad_parameters=dict(min_silence_duration_ms=500),  # 设置静音检测参数
+                word_timestamps=word_timestamps,
+                language=language
             )
             
-            # 合并所有片段
-            text = " ".join([segment.text for segment in segments])
+            # 合并所有片段，同时按列收集逐段和逐词信息
+            texts, words, word_values, segment_values, offsets = [], [], [], [], [0]
+            for segment in segments:
+                texts.append(segment.text)
+                segment_values.append((segment.start, segment.end, segment.avg_logprob, segment.no_speech_prob))
+                for word in segment.words or []:
+                    words.append(word.word)
+                    word_values.append((word.start, word.end, word.probability))
+                offsets.append(len(words))
+            text = " ".join(texts)
             logger.info(f"Transcribed text from audio bytes: {text}")
-            return text
+            
+            word_array = np.asarray(word_values, dtype=np.float32).reshape(-1, 3)
+            segment_array = np.asarray(segment_values, dtype=np.float32).reshape(-1, 4)
+            return Transcription(
+                text=text,
+                language=info.language,
+                language_probability=info.language_probability,
+                duration=info.duration,
+                words=words,
+                word_starts=word_array[:, 0].copy(),
+                word_ends=word_array[:, 1].copy(),
+                word_probabilities=word_array[:, 2].copy(),
+                segment_starts=segment_array[:, 0].copy(),
+                segment_ends=segment_array[:, 1].copy(),
+                avg_logprobs=segment_array[:, 2].copy(),
+                no_speech_probs=segment_array[:, 3].copy(),
+                segment_word_offsets=np.asarray(offsets, dtype=np.int32)
+            )
         except Exception as e:
             logger.error(f"Error transcribing audio bytes: {str(e)}")
             raise 
\ No newline at end of file
@@ -1,4 +1,5 @@
 from pathlib import Path
+import asyncio
 import os
 import torch
 from typing import Optional
@@ -83,6 +84,25 @@ class CoquiTTS:
     ) -> bytes:
         """
         将文本转换为语音
+
+        模型推理是阻塞的CPU/GPU计算，放到线程中执行，避免阻塞事件循环
+
+        Args:
+            text: 要转换的文本
+            language: 语言代码，默认为英语
+
+        Returns:
+            MP3格式的音频字节数据
+        """
+        return await asyncio.to_thread(self._synthesize_blocking, text, language)
+
+    def _synthesize_blocking(
+        self,
+        text: str,
+        language: str = "en"
+    ) -> bytes:
+        """
+        将文本转换为语音（同步阻塞版本）
         
         Args:
             text: 要转换的文本
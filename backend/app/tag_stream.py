@@ -0,0 +1,143 @@
+"""
+流式标签解析模块
+
+LLM按 <response>...</response> 等标签输出不同部分的内容，流式输出时标签经常被切分在多个文本块中
+（例如 "</res" 和 "ponse>"）。这里增量地解析文本块，跨块的标签也能正确识别：
+- 标签外的文本作为 text 片段输出
+- 标签内的文本一产生就作为 delta 片段输出，不必等待结束标签
+- 遇到结束标签时输出该部分的完整内容
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+# 教练回复中的标签
+COACH_TAGS = ("response", "pronunciationSuggestion", "grammarSuggestion", "userResponseSuggestion")
+
+
+@dataclass
+class TagEvent:
+    """解析出的片段
+
+    Attributes:
+        kind: text（标签外文本）、delta（标签内的增量文本）或 done（标签结束，data为完整内容）
+        tag: 所属标签，text片段为None
+        data: 文本内容
+    """
+    kind: str
+    tag: Optional[str]
+    data: str
+
+
+class TagStreamParser:
+    """增量解析带标签的流式文本
+
+    Attributes:
+        tags: 需要识别的标签名
+        current_tag: 当前所在的标签，不在标签内时为None
+    """
+
+    def __init__(self, tags: Sequence[str] = COACH_TAGS):
+        self.tags = tuple(tags)
+        self._start_pattern = re.compile(rf"<({'|'.join(map(re.escape, self.tags))})>")
+        self._start_tags = [f"<{tag}>" for tag in self.tags]
+        self.current_tag: Optional[str] = None
+        self._pending = ""
+        self._content: List[str] = []
+
+    def _is_start_prefix(self, text: str) -> bool:
+        """text是否可能是某个开始标签的前半部分"""
+        return any(start_tag.startswith(text) for start_tag in self._start_tags)
+
+    def _delta(self, text: str) -> Optional[TagEvent]:
+        """记录标签内的文本，段首的空白不输出"""
+        if not self._content:
+            text = text.lstrip()
+        if not text:
+            return None
+        self._content.append(text)
+        return TagEvent("delta", self.current_tag, text)
+
+    def feed(self, chunk: str) -> List[TagEvent]:
+        """
+        解析一个文本块
+
+        Args:
+            chunk: LLM输出的文本块
+
+        Returns:
+            解析出的片段，可能因为等待被切分的标签而暂时没有输出
+        """
+        events: List[TagEvent] = []
+        text = self._pending + chunk
+        self._pending = ""
+        while text:
+            if self.current_tag is None:
+                index = text.find("<")
+                if index < 0:
+                    events.append(TagEvent("text", None, text))
+                    break
+                if index > 0:
+                    events.append(TagEvent("text", None, text[:index]))
+                    text = text[index:]
+                match = self._start_pattern.match(text)
+                if match:
+                    self.current_tag = match.group(1)
+                    self._content = []
+                    text = text[match.end():]
+                elif self._is_start_prefix(text):
+                    # 标签可能被切分到下一个文本块，先保留
+                    self._pending = text
+                    break
+                else:
+                    events.append(TagEvent("text", None, "<"))
+                    text = text[1:]
+                continue
+
+            end_tag = f"</{self.current_tag}>"
+            index = text.find(end_tag)
+            if index >= 0:
+                delta = self._delta(text[:index])
+                if delta is not None:
+                    events.append(delta)
+                events.append(TagEvent("done", self.current_tag, "".join(self._content)))
+                self.current_tag = None
+                self._content = []
+                text = text[index + len(end_tag):]
+                continue
+
+            # 末尾可能是被切分的结束标签，保留到下一个文本块再判断
+            keep = 0
+            for length in range(min(len(end_tag) - 1, len(text)), 0, -1):
+                if end_tag.startswith(text[-length:]):
+                    keep = length
+                    break
+            delta = self._delta(text[:len(text) - keep])
+            if delta is not None:
+                events.append(delta)
+            self._pending = text[len(text) - keep:]
+            break
+        return events
+
+    def close(self) -> List[TagEvent]:
+        """
+        结束解析，输出缓冲中剩余的内容；未闭合的标签按已结束处理
+
+        Returns:
+            剩余的片段
+        """
+        events: List[TagEvent] = []
+        pending, self._pending = self._pending, ""
+        if self.current_tag is None:
+            if pending:
+                events.append(TagEvent("text", None, pending))
+            return events
+
+        delta = self._delta(pending)
+        if delta is not None:
+            events.append(delta)
+        events.append(TagEvent("done", self.current_tag, "".join(self._content)))
+        self.current_tag = None
+        self._content = []
+        return events
@@ -0,0 +1,457 @@
+"""
+语音合成文本规范化模块
+
+LLM的回复里有markdown标记、HTML标签、表情符号、数字和缩写，XTTS遇到这些内容时
+要么读错，要么合成得很慢。这里把所有规则预编译成一个正则，一次扫描完成清理和规范化：
+- 通用规则：去掉markdown、HTML标签和表情符号
+- 语言规则：按语言注册，例如英语的数字、序数词、货币、时间和常见缩写
+
+规则只在匹配到的位置调用替换函数。StreamingNormalizer可以在流式生成的文本片段上
+增量工作，每凑够一个完整的句子就输出规范化后的结果。
+"""
+
+import html
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Pattern, Tuple, Union
+
+# 句末标点后跟空白处切分句子
+SENTENCE_BREAK = re.compile(r'(?<=[.!?。！？])\s+')
+# 流式输出时的候选断句位置，句末标点后可能还有闭合的markdown标记或引号（"**Keep going!** "）
+STREAM_BREAK = re.compile(r'(?<=[.!?。！？*_`"\')\]])\s+')
+SENTENCE_END = re.compile(r'[.!?。！？]["\')\]]*$')
+SENTENCE_PUNCTUATION = ".!?。！？"
+# 句末标点后可能跟着的闭合标记和引号
+CLOSING_MARKS = "*_`\"')]"
+# 有序列表的序号（"1."），后面的空白不是断句位置
+LIST_NUMBER = re.compile(r'[ \t]*\d+\.')
+WHITESPACE = re.compile(r'\s+')
+# 删除表情符号后标点前留下的空格
+SPACE_BEFORE_PUNCTUATION = re.compile(r' (?=[.,!?;:])')
+EMOJI = "[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D]"
+# 成对出现的markdown标记
+MARKUP_DELIMITER = re.compile(r"`+|\*+|_{2,}")
+
+
+@dataclass
+class NormalizationRule:
+    """一条规范化规则
+
+    Attributes:
+        pattern: 匹配模式，可以使用普通分组和后顾断言，不能使用命名分组和反向引用
+        replace: 替换文本，或接收匹配结果返回替换文本的函数
+        trigger: 匹配开头的简单模式（例如 "\\d" 或 "\\$"），用于快速跳过不可能匹配的位置，
+            为None时每个位置都要尝试该规则
+    """
+    pattern: str
+    replace: Union[str, Callable[[re.Match], str]]
+    trigger: Optional[str] = None
+
+    def __post_init__(self):
+        self.compiled: Pattern = re.compile(self.pattern, re.MULTILINE)
+
+
+def markup_balanced(text: str) -> bool:
+    """
+    判断文本中的markdown标记是否都已闭合，未闭合时在其中断句会把标记切开
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        加粗、斜体、代码和链接文字是否都已闭合
+    """
+    counts: Dict[str, int] = {}
+    for match in MARKUP_DELIMITER.finditer(text):
+        before = text[match.start() - 1] if match.start() > 0 else " "
+        after = text[match.end()] if match.end() < len(text) else " "
+        # 两边都是空白的不是标记，例如 "2 * 3" 和列表的 "* "
+        if before.isspace() and after.isspace():
+            continue
+        token = match.group(0)
+        # "***" 同时打开加粗和斜体
+        for delimiter in (["**", "*"] if token == "***" else [token]):
+            counts[delimiter] = counts.get(delimiter, 0) + 1
+    return all(count % 2 == 0 for count in counts.values()) and text.count("[") <= text.count("]")
+
+
+def may_end_sentence(text: str, end: int) -> bool:
+    """
+    不做规范化，快速判断 text[:end] 是否可能以完整的句子结尾
+
+    Args:
+        text: 原始文本
+        end: 候选断句位置
+
+    Returns:
+        去掉闭合标记后以句末标点结尾、且不是有序列表序号时为True
+    """
+    index = end
+    while index > 0 and text[index - 1] in CLOSING_MARKS:
+        index -= 1
+    if index == 0 or text[index - 1] not in SENTENCE_PUNCTUATION:
+        return False
+    line_start = text.rfind("\n", 0, end) + 1
+    return not LIST_NUMBER.fullmatch(text, line_start, end)
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    将文本按句末标点切分成句子
+
+    Args:
+        text: 规范化后的文本
+
+    Returns:
+        非空句子列表
+    """
+    return [sentence.strip() for sentence in SENTENCE_BREAK.split(text) if sentence.strip()]
+
+
+# ---------------------------------------------------------------- 英语数字 ----
+
+ONES = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen",
+]
+TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+SCALES = [(10 ** 12, "trillion"), (10 ** 9, "billion"), (10 ** 6, "million"), (1000, "thousand")]
+ORDINAL_WORDS = {
+    "one": "first", "two": "second", "three": "third", "five": "fifth",
+    "eight": "eighth", "nine": "ninth", "twelve": "twelfth",
+}
+
+
+def number_to_words(number: int) -> str:
+    """
+    将整数转换为英文读法
+
+    Args:
+        number: 整数
+
+    Returns:
+        英文读法，例如 1234 -> "one thousand two hundred thirty-four"
+    """
+    if number < 0:
+        return f"minus {number_to_words(-number)}"
+    if number < 20:
+        return ONES[number]
+    if number < 100:
+        tens, ones = divmod(number, 10)
+        return TENS[tens] + (f"-{ONES[ones]}" if ones else "")
+    if number < 1000:
+        hundreds, rest = divmod(number, 100)
+        return f"{ONES[hundreds]} hundred" + (f" {number_to_words(rest)}" if rest else "")
+    for scale, name in SCALES:
+        if number >= scale:
+            head, rest = divmod(number, scale)
+            return f"{number_to_words(head)} {name}" + (f" {number_to_words(rest)}" if rest else "")
+    return str(number)
+
+
+def ordinal_to_words(number: int) -> str:
+    """
+    将整数转换为英文序数词读法
+
+    Args:
+        number: 整数
+
+    Returns:
+        英文序数词，例如 21 -> "twenty-first"
+    """
+    words = number_to_words(number)
+    prefix, separator, last = words.rpartition("-" if "-" in words.split(" ")[-1] else " ")
+    if last in ORDINAL_WORDS:
+        last = ORDINAL_WORDS[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return prefix + separator + last
+
+
+def year_to_words(year: int) -> str:
+    """按年份的习惯读法：1990 -> nineteen ninety，1905 -> nineteen oh five"""
+    head, tail = divmod(year, 100)
+    if 2000 <= year < 2010:
+        return number_to_words(year)
+    if tail == 0:
+        return f"{number_to_words(head)} hundred"
+    if tail < 10:
+        return f"{number_to_words(head)} oh {ONES[tail]}"
+    return f"{number_to_words(head)} {number_to_words(tail)}"
+
+
+def _decimal_to_words(text: str) -> str:
+    sign = "minus " if text.startswith("-") else ""
+    integer, _, fraction = text.lstrip("-").replace(",", "").partition(".")
+    words = sign + number_to_words(int(integer))
+    if fraction:
+        words += " point " + " ".join(ONES[int(digit)] for digit in fraction)
+    return words
+
+
+def _money(match: re.Match) -> str:
+    dollars = int(match.group(1).replace(",", ""))
+    words = f"{number_to_words(dollars)} dollar{'' if dollars == 1 else 's'}"
+    if match.group(2) and int(match.group(2)):
+        cents = int(match.group(2))
+        words += f" and {number_to_words(cents)} cent{'' if cents == 1 else 's'}"
+    return words
+
+
+def _clock(match: re.Match) -> str:
+    hours, minutes = int(match.group(1)), int(match.group(2))
+    if minutes == 0:
+        return f"{number_to_words(hours)} o'clock"
+    if minutes < 10:
+        return f"{number_to_words(hours)} oh {ONES[minutes]}"
+    return f"{number_to_words(hours)} {number_to_words(minutes)}"
+
+
+ENGLISH_ABBREVIATIONS = {
+    "e.g.": "for example", "i.e.": "that is", "etc.": "et cetera", "vs.": "versus",
+    "Mr.": "Mister", "Mrs.": "Missus", "Ms.": "Miz", "Dr.": "Doctor",
+}
+# "St." 后面是这些名字时总是读作Saint（"Visit St. Louis"）
+SAINT_NAMES = (
+    "Albans", "Andrew", "Anthony", "Augustine", "Barts", "Catherine", "David", "Francis", "George", "Helena",
+    "Ives", "James", "John", "Joseph", "Kitts", "Lawrence", "Louis", "Lucia", "Luke", "Mark", "Martin",
+    "Mary", "Matthew", "Michael", "Moritz", "Nicholas", "Pancras", "Patrick", "Paul", "Peter", "Petersburg",
+    "Stephen", "Thomas", "Tropez", "Valentine", "Vincent",
+)
+SAINT_NAME = re.compile(r"\s+(?:" + "|".join(SAINT_NAMES) + r")\b")
+CAPITALISED_NAME = re.compile(r"\s+[A-Z]")
+# "St." 前面紧挨着的大写单词，例如 "Main St." 中的 "Main"
+PREVIOUS_CAPITALISED = re.compile(r"\b[A-Z][a-z]*[ \t]+$")
+# 负号前面不能是字母数字或连字符，"10-5" 中的 "-" 不是负号
+SIGN = r"(?:(?<![\w.-])-)?"
+
+
+def _saint_or_street(match: re.Match) -> str:
+    """
+    人名前的 "St." 读作Saint，街道名后的读作Street
+
+    "Visit St. Louis" 和 "Happy St. Patrick's Day" 中是Saint，"Live on Main St. My friend..."
+    中 "St." 前面是街道名，后面的大写单词是下一句的开头，读作Street并保留句号。
+    """
+    text, start, end = match.string, match.start(), match.end()
+    if SAINT_NAME.match(text, end):
+        return "Saint"
+    sentence_follows = CAPITALISED_NAME.match(text, end)
+    if sentence_follows and not PREVIOUS_CAPITALISED.search(text, max(0, start - 30), start):
+        return "Saint"
+    # 文本在 "St." 处结束时不补句号，流式断句时后面的人名可能还没有生成
+    return "Street." if sentence_follows else "Street"
+
+# 只有在这些词后面（"in 1990"、"since 2024"）或者带纪年（"1066 AD"）的四位数才按年份读，
+# 其余的数字（"1500 people"、"room 2010"）交给普通数字规则
+YEAR_CONTEXT_WORDS = ("in", "since", "by", "from", "of", "until", "till", "year")
+YEAR_CONTEXT = "(?:" + "|".join(f"(?<=\\b(?i:{word}) )" for word in YEAR_CONTEXT_WORDS) + ")"
+YEAR = r"1[1-9]\d\d|20\d\d"
+ERA = r"AD|BC|BCE|CE"
+
+
+def _year(match: re.Match) -> str:
+    if match.group(4):
+        return f"{year_to_words(int(match.group(3)))} {match.group(4)}"
+    words = year_to_words(int(match.group(1)))
+    if match.group(2):
+        words += f" to {year_to_words(int(match.group(2)))}"
+    return words
+
+
+def _digit_groups(match: re.Match) -> str:
+    """用连字符连接的数字：同样位数的升序区间读作 "X to Y"，电话号码等编号逐位读出"""
+    groups = match.group(0).split("-")
+    if len(groups) == 2 and len(groups[0]) == len(groups[1]) and int(groups[0]) < int(groups[1]):
+        return f"{number_to_words(int(groups[0]))} to {number_to_words(int(groups[1]))}"
+    return ", ".join(" ".join(ONES[int(digit)] for digit in group) for group in groups)
+
+
+ENGLISH_RULES: List[NormalizationRule] = [
+    NormalizationRule(
+        r"\b(?:" + "|".join(re.escape(abbreviation) for abbreviation in ENGLISH_ABBREVIATIONS) + ")",
+        lambda m: ENGLISH_ABBREVIATIONS[m.group(0)],
+        trigger="|".join(sorted({re.escape(abbreviation[:2]) for abbreviation in ENGLISH_ABBREVIATIONS}))
+    ),
+    NormalizationRule(r"\bSt\.", _saint_or_street, trigger="St"),
+    NormalizationRule(r"&(?:amp;)?(?!lt;|gt;|quot;|#39;)", " and ", trigger="&"),
+    NormalizationRule(r"\$(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d{2}))?\b", _money, trigger=r"\$"),
+    NormalizationRule(
+        rf"({SIGN}\d+(?:\.\d+)?)\s?%", lambda m: f"{_decimal_to_words(m.group(1))} percent", trigger=r"-?\d"
+    ),
+    NormalizationRule(r"\b(\d+)(?:st|nd|rd|th)\b", lambda m: ordinal_to_words(int(m.group(1))), trigger=r"\d"),
+    NormalizationRule(r"\b([01]?\d|2[0-3]):([0-5]\d)\b", _clock, trigger=r"\d"),
+    NormalizationRule(
+        rf"{YEAR_CONTEXT}({YEAR})(?:-({YEAR}))?\b(?![.,-]\d)|\b(\d{{3,4}}) ?({ERA})\b", _year, trigger=r"\d"
+    ),
+    # 至少有一组三位以上的数字才按编号处理，"3-2" 这样的比分仍按普通数字读
+    NormalizationRule(r"\b(?=[\d-]*\d{3})\d+(?:-\d+)+\b", _digit_groups, trigger=r"\d"),
+    NormalizationRule(
+        SIGN + r"(?:\b\d{1,3}(?:,\d{3})+(?:\.\d+)?\b|\b\d+(?:\.\d+)?\b)",
+        lambda m: _decimal_to_words(m.group(0)),
+        trigger=r"-?\d"
+    ),
+]
+
+# 按语言注册的规则，键为合成语言代码
+LANGUAGE_RULES: Dict[str, List[NormalizationRule]] = {
+    "en": ENGLISH_RULES,
+}
+
+
+def register_rules(language: str, rules: List[NormalizationRule]):
+    """
+    注册某种语言的规范化规则，覆盖已有的规则
+
+    Args:
+        language: 合成语言代码
+        rules: 规则列表，按顺序优先匹配
+    """
+    LANGUAGE_RULES[language] = rules
+    get_normalizer.cache_clear()
+
+
+# ---------------------------------------------------------------- 规范化器 ----
+
+class TextNormalizer:
+    """单次扫描的文本规范化器
+
+    通用的markdown/HTML规则和语言规则合并成一个正则，每个规则对应一个命名分组。
+    markdown包裹的内容（链接文字、加粗、代码等）会递归地规范化。
+
+    Attributes:
+        language: 合成语言代码
+        rules: 按优先级排列的全部规则
+    """
+
+    def __init__(self, language: str = "en"):
+        self.language = language
+        structure, inline = self._markup_rules()
+        # 行首标记要先于数字规则匹配（例如有序列表的 "1. "），其余清理规则放在语言规则之后
+        self.rules: List[NormalizationRule] = [*structure, *LANGUAGE_RULES.get(language, []), *inline]
+        pattern = "|".join(f"(?P<r{index}>{rule.pattern})" for index, rule in enumerate(self.rules))
+        # 所有规则都声明了trigger时，先用前瞻快速跳过不可能匹配的位置，避免在每个位置尝试全部规则
+        if all(rule.trigger for rule in self.rules):
+            triggers = dict.fromkeys(rule.trigger for rule in self.rules)
+            pattern = f"(?=(?:{'|'.join(triggers)}))(?:{pattern})"
+        self._pattern = re.compile(pattern, re.MULTILINE)
+
+    def _markup_rules(self) -> Tuple[List[NormalizationRule], List[NormalizationRule]]:
+        """通用的清理规则，包裹的内容递归规范化"""
+        def inner(group: int) -> Callable[[re.Match], str]:
+            return lambda m: self._sub(m.group(group))
+
+        structure = [
+            NormalizationRule(r"```[a-zA-Z]*\n([\s\S]*?)\n```", inner(1), trigger="`"),     # 代码块
+            NormalizationRule(r"`([^`]+)`", inner(1), trigger="`"),                         # 行内代码
+            NormalizationRule(r"^[ \t]*(?:#+|[-*+]|\d+\.|>)[ \t]+", "", trigger="^"),     # 标题、列表和引用标记
+        ]
+        inline = [
+            NormalizationRule(r"\[([^\]]+)\]\([^)]+\)", inner(1), trigger=r"\["),         # 链接，保留链接文字
+            NormalizationRule(
+                r"\*\*([^*]+)\*\*|__([^_]+)__", lambda m: self._sub(m.group(1) or m.group(2)), trigger=r"\*|_"
+            ),  # 加粗
+            NormalizationRule(
+                r"\*([^*\n]+)\*|\b_([^_\n]+)_\b", lambda m: self._sub(m.group(1) or m.group(2)), trigger=r"\*|_"
+            ),  # 斜体
+            NormalizationRule(r"<[^>]+>", "", trigger="<"),                                 # HTML标签
+            NormalizationRule(r"&(?:amp|lt|gt|quot|#39);", lambda m: html.unescape(m.group(0)), trigger="&"),
+            NormalizationRule(EMOJI, "", trigger=EMOJI),                                   # 表情符号
+        ]
+        return structure, inline
+
+    def _replace(self, match: re.Match) -> str:
+        rule = self.rules[int(match.lastgroup[1:])]
+        if isinstance(rule.replace, str):
+            return rule.replace
+        # 在原文中的同一位置重新匹配，规则里的后顾断言可以看到匹配之前的文本
+        start, end = match.span(match.lastgroup)
+        return rule.replace(rule.compiled.fullmatch(match.string, start, end))
+
+    def _sub(self, text: str) -> str:
+        return self._pattern.sub(self._replace, text)
+
+    def normalize(self, text: str) -> str:
+        """
+        规范化一段完整的文本
+
+        Args:
+            text: 输入文本，可能包含markdown标记
+
+        Returns:
+            适合语音合成的纯文本
+        """
+        text = WHITESPACE.sub(" ", self._sub(text)).strip()
+        return SPACE_BEFORE_PUNCTUATION.sub("", text)
+
+
+@lru_cache(maxsize=None)
+def get_normalizer(language: str) -> TextNormalizer:
+    """
+    获取某种语言的规范化器，编译结果会被复用
+
+    Args:
+        language: 合成语言代码
+
+    Returns:
+        规范化器
+    """
+    return TextNormalizer(language)
+
+
+class StreamingNormalizer:
+    """在流式文本片段上增量规范化，按完整的句子输出
+
+    Attributes:
+        normalizer: 规范化器
+    """
+
+    def __init__(self, normalizer: TextNormalizer):
+        self.normalizer = normalizer
+        self._buffer = ""
+        # 已经检查过断句位置的长度，被拒绝的断句位置不再重复规范化
+        self._scanned = 0
+
+    def feed(self, fragment: str) -> List[str]:
+        """
+        追加一个文本片段
+
+        Args:
+            fragment: 新生成的文本
+
+        Returns:
+            新凑够的完整句子（已规范化），可能为空
+        """
+        self._buffer += fragment
+        # 只在新追加的文本中找断句位置，断句规则的后顾断言仍能看到之前片段末尾的标点
+        breaks = [
+            match for match in STREAM_BREAK.finditer(self._buffer, self._scanned)
+            if may_end_sentence(self._buffer, match.start())
+        ]
+        self._scanned = len(self._buffer)
+        # 从最后一个新的断句位置往前找，保证切出来的前缀规范化后仍以句末标点结尾（排除 "Mr. " 这类缩写），
+        # 并且没有切在未闭合的markdown标记中间（"**Great job. Keep going!**"）
+        for match in reversed(breaks):
+            if not markup_balanced(self._buffer[:match.start()]):
+                continue
+            normalized = self.normalizer.normalize(self._buffer[:match.start()])
+            if SENTENCE_END.search(normalized):
+                self._buffer = self._buffer[match.end():]
+                self._scanned = len(self._buffer)
+                return split_sentences(normalized)
+        return []
+
+    def flush(self) -> List[str]:
+        """
+        输出剩余的文本
+
+        Returns:
+            剩余的句子（已规范化）
+        """
+        normalized = self.normalizer.normalize(self._buffer)
+        self._buffer = ""
+        self._scanned = 0
+        return split_sentences(normalized)
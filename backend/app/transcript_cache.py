@@ -0,0 +1,123 @@
+"""
+识别结果缓存模块
+
+客户端在网络抖动后会重传相同的录音，测试工具也会反复回放同一段录音。
+这里按原始音频字节的哈希缓存完整的识别结果（包括逐段和逐词信息），
+重复的上传可以完全跳过Whisper解码。内存中为LRU，可选地持久化到磁盘。
+"""
+
+import dataclasses
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from app.logger import logger
+from app.speech_recognition import Transcription
+
+# Transcription中的标量字段，其余字段都是数组
+SCALAR_FIELDS = ("text", "language", "language_probability", "duration")
+
+
+def audio_fingerprint(audio_bytes: bytes, namespace: str = "") -> str:
+    """
+    计算音频字节的快速哈希
+
+    Args:
+        audio_bytes: 原始音频字节
+        namespace: 区分不同模型或识别参数的前缀
+
+    Returns:
+        十六进制的哈希字符串
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(namespace.encode("utf-8") + b"\0")
+    digest.update(audio_bytes)
+    return digest.hexdigest()
+
+
+class TranscriptCache:
+    """内存LRU加可选磁盘层的识别结果缓存
+
+    Attributes:
+        max_entries: 内存中最多保留的条目数
+        disk_dir: 磁盘缓存目录，为空时只使用内存
+    """
+
+    def __init__(self, max_entries: int = 128, disk_dir: Optional[Path] = None):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._items: "OrderedDict[str, Transcription]" = OrderedDict()
+        self._lock = threading.Lock()
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.npz"
+
+    def _remember(self, key: str, transcription: Transcription):
+        self._items[key] = transcription
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Transcription]:
+        """
+        读取缓存的识别结果，内存未命中时查询磁盘
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            识别结果，未命中时返回None
+        """
+        with self._lock:
+            transcription = self._items.get(key)
+            if transcription is not None:
+                self._items.move_to_end(key)
+                return transcription
+
+        if self.disk_dir is None or not self._disk_path(key).exists():
+            return None
+        try:
+            with np.load(self._disk_path(key)) as data:
+                values = {}
+                for item in dataclasses.fields(Transcription):
+                    value = data[item.name]
+                    if item.name == "words":
+                        value = value.tolist()
+                    elif item.name in SCALAR_FIELDS:
+                        value = value.item()
+                    values[item.name] = value
+            transcription = Transcription(**values)
+        except Exception as e:
+            logger.warning(f"读取识别结果磁盘缓存失败: {e}")
+            return None
+
+        with self._lock:
+            self._remember(key, transcription)
+        return transcription
+
+    def put(self, key: str, transcription: Transcription):
+        """
+        写入识别结果
+
+        Args:
+            key: 缓存键
+            transcription: 识别结果
+        """
+        with self._lock:
+            self._remember(key, transcription)
+
+        if self.disk_dir is None:
+            return
+        try:
+            values = {item.name: getattr(transcription, item.name) for item in dataclasses.fields(Transcription)}
+            values["words"] = np.asarray(values["words"], dtype=str)
+            with self._disk_path(key).open("wb") as f:
+                np.savez_compressed(f, **values)
+        except Exception as e:
+            logger.warning(f"写入识别结果磁盘缓存失败: {e}")
@@ -0,0 +1,282 @@
+"""
+语音合成调度模块
+
+TTS 是所有会话共享的稀缺资源，这里用优先队列统一调度合成任务：
+每一轮回复的第一句话优先合成，保证在负载很高时首句音频依然能尽快返回。
+
+后台预合成任务排在所有前台任务之后，并且同一时间最多只合成一个。合成开始后不能中途抢占，
+所以正在合成的后台任务最多让之后到达的前台句子多等一句的合成时间。
+"""
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.audio_cache import AudioCache, audio_key
+from app.logger import logger
+
+# 任务类别：前台任务是用户正在等待的回复，后台任务是空闲时的预合成
+FOREGROUND = 0
+BACKGROUND = 1
+
+
+@dataclass(order=True)
+class TTSJob:
+    """一个待合成的句子
+
+    排序键 priority 为 (任务类别, 句子序号, 轮次开始时间, 提交序号)：
+    - 前台任务总是排在后台预合成任务之前
+    - 句子序号越小越优先，任何会话的首句都排在其它会话的后续句子之前
+    - 序号相同时按轮次开始时间排序，先开始的轮次先合成
+    - 提交序号保证同一轮内的先后顺序，并让排序稳定
+    这样不同会话之间按句子位置轮流获得 TTS，一个会话的长尾不会饿死其它会话。
+    """
+    priority: Tuple[int, int, float, int]
+    key: str = field(compare=False)
+    text: str = field(compare=False)
+    language: str = field(compare=False)
+    session_id: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    # 等待该任务的请求各自持有的Future，取消其中一个不影响其它请求
+    waiters: Set[asyncio.Future] = field(default_factory=set, compare=False)
+
+    @property
+    def background(self) -> bool:
+        return self.priority[0] == BACKGROUND
+
+
+class TTSScheduler:
+    """按优先级调度语音合成任务的调度器
+
+    Attributes:
+        synthesizer: 实际执行合成的 CoquiTTS 实例
+        workers: 并发合成的工作协程数量
+        cache: 合成结果的音频缓存
+    """
+
+    def __init__(self, synthesizer, workers: int = 1, cache: Optional[AudioCache] = None):
+        """
+        初始化调度器
+
+        Args:
+            synthesizer: 提供 async synthesize(text, language) 方法的合成器
+            workers: 并发合成的工作协程数量
+            cache: 音频缓存，为空时创建默认大小的缓存
+        """
+        self.synthesizer = synthesizer
+        self.workers = max(1, workers)
+        self.cache = cache or AudioCache()
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._worker_tasks: Set[asyncio.Task] = set()
+        self._counter = itertools.count()
+        # 每个会话尚未完成的前台任务，用于取消
+        self._pending: Dict[str, Set[asyncio.Future]] = {}
+        # 正在排队或合成中的任务，按内容哈希索引
+        self._inflight: Dict[str, TTSJob] = {}
+        # 是否有后台任务正在合成，以及等它完成后再重新排队的后台任务
+        self._background_busy = False
+        self._deferred: List[TTSJob] = []
+
+    def _ensure_started(self):
+        """在当前事件循环中懒启动工作协程"""
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        while len(self._worker_tasks) < self.workers:
+            task = asyncio.create_task(self._worker())
+            self._worker_tasks.add(task)
+            task.add_done_callback(self._worker_tasks.discard)
+
+    def submit(
+        self,
+        text: str,
+        language: str,
+        session_id: str,
+        sentence_index: int,
+        turn_started_at: Optional[float] = None,
+        background: bool = False
+    ) -> asyncio.Future:
+        """
+        提交一个句子的合成任务
+
+        Args:
+            text: 要合成的文本
+            language: 语言代码
+            session_id: 会话ID，用于取消和日志
+            sentence_index: 句子在本轮回复中的序号，从0开始
+            turn_started_at: 本轮开始的时间（time.monotonic），默认为当前时间
+            background: 是否为后台预合成任务，排在所有前台任务之后，同一时间最多合成一个，且不随会话取消
+
+        Returns:
+            合成完成后结果为MP3字节的Future；每次调用返回单独的Future，
+            相同内容的请求共用一个合成任务，只有所有前台请求都取消后任务才会取消
+        """
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        key = audio_key(text, language)
+
+        # 已经合成过的文本直接返回
+        cached = self.cache.get(key)
+        if cached is not None:
+            future = loop.create_future()
+            future.set_result(cached)
+            return future
+
+        # 相同内容已在排队且优先级不低于本次请求，复用同一个任务
+        inflight = self._inflight.get(key)
+        if inflight is not None and (background or not inflight.background):
+            return self._wait(inflight, session_id, background)
+
+        if turn_started_at is None:
+            turn_started_at = time.monotonic()
+
+        job = TTSJob(
+            priority=(
+                BACKGROUND if background else FOREGROUND,
+                sentence_index,
+                turn_started_at,
+                next(self._counter)
+            ),
+            key=key,
+            text=text,
+            language=language,
+            session_id=session_id,
+            future=loop.create_future()
+        )
+        self._inflight[key] = job
+        job.future.add_done_callback(lambda f: self._on_job_done(job))
+
+        self._queue.put_nowait(job)
+        return self._wait(job, session_id, background)
+
+    def _wait(self, job: TTSJob, session_id: str, background: bool) -> asyncio.Future:
+        """为一次请求创建等待任务结果的Future，前台请求可以随会话取消"""
+        waiter = asyncio.get_running_loop().create_future()
+        job.waiters.add(waiter)
+        waiter.add_done_callback(lambda f: self._on_waiter_done(job, f))
+        if background:
+            # 预合成的结果通过fetch获取，这里取走异常，避免事件循环打印未处理的异常
+            waiter.add_done_callback(lambda f: f.cancelled() or f.exception())
+        else:
+            self._track(session_id, waiter)
+        return waiter
+
+    async def fetch(self, key: str, timeout: Optional[float] = None) -> Optional[bytes]:
+        """
+        按内容哈希获取音频，如果仍在合成中则等待其完成
+
+        Args:
+            key: 内容哈希
+            timeout: 等待合成的超时时间（秒），为空时一直等待
+
+        Returns:
+            音频字节，未知的哈希或合成失败时返回None
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(inflight.future), timeout)
+        except Exception as e:
+            logger.warning(f"获取预合成音频失败: key={key}, error={e!r}")
+            return None
+
+    def cancel_session(self, session_id: str):
+        """
+        取消某个会话所有尚未完成的前台合成任务
+
+        Args:
+            session_id: 会话ID
+        """
+        for future in list(self._pending.get(session_id, ())):
+            future.cancel()
+
+    def _track(self, session_id: str, future: asyncio.Future):
+        pending = self._pending.setdefault(session_id, set())
+        pending.add(future)
+        future.add_done_callback(lambda f: self._discard_pending(session_id, f))
+
+    def _discard_pending(self, session_id: str, future: asyncio.Future):
+        pending = self._pending.get(session_id)
+        if pending is None:
+            return
+        pending.discard(future)
+        if not pending:
+            del self._pending[session_id]
+
+    def _on_waiter_done(self, job: TTSJob, waiter: asyncio.Future):
+        job.waiters.discard(waiter)
+        # 所有等待的会话都已取消时，前台任务不再需要合成；后台任务不随会话取消
+        if waiter.cancelled() and not job.waiters and not job.background:
+            job.future.cancel()
+
+    def _on_job_done(self, job: TTSJob):
+        if self._inflight.get(job.key) is job:
+            del self._inflight[job.key]
+        for waiter in list(job.waiters):
+            if waiter.done():
+                continue
+            if job.future.cancelled():
+                waiter.cancel()
+            elif job.future.exception() is not None:
+                waiter.set_exception(job.future.exception())
+            else:
+                waiter.set_result(job.future.result())
+        # 任务可能无人等待，这里取走异常，避免事件循环打印未处理的异常
+        if not job.future.cancelled():
+            job.future.exception()
+
+    def _release_background(self):
+        """后台任务合成结束，把搁置的后台任务重新排队，由优先队列决定下一个任务"""
+        self._background_busy = False
+        deferred, self._deferred = self._deferred, []
+        for job in deferred:
+            self._queue.put_nowait(job)
+
+    async def _worker(self):
+        """从优先队列中取出任务并执行合成"""
+        while True:
+            job = await self._queue.get()
+            try:
+                # 会话已经取消（例如客户端断开），直接跳过
+                if job.future.done():
+                    continue
+
+                # 排队期间可能已由其它任务合成完成
+                cached = self.cache.get(job.key)
+                if cached is not None:
+                    job.future.set_result(cached)
+                    continue
+
+                # 已有后台任务在合成时先搁置，其它工作协程留给前台任务
+                if job.background:
+                    if self._background_busy:
+                        self._deferred.append(job)
+                        continue
+                    self._background_busy = True
+
+                started = time.monotonic()
+                try:
+                    audio_bytes = await self.synthesizer.synthesize(job.text, language=job.language)
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                    continue
+                finally:
+                    if job.background:
+                        self._release_background()
+
+                self.cache.put(job.key, audio_bytes)
+                if not job.future.done():
+                    job.future.set_result(audio_bytes)
+                logger.debug(
+                    f"TTS任务完成: session={job.session_id}, priority={job.priority[:3]}, "
+                    f"距轮次开始 {started - job.priority[2]:.2f}s, 合成耗时 {time.monotonic() - started:.2f}s"
+                )
+            finally:
+                self._queue.task_done()
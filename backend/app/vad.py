@@ -0,0 +1,84 @@
+"""
+语音活动检测模块
+
+上传的录音经常前后带有很长的静音，甚至完全没有说话。
+这里在解码后的音频上做一次基于短时能量的检测：裁掉首尾静音后再交给Whisper，
+完全没有语音时直接跳过识别、LLM和语音合成。检测只是几次numpy向量运算，开销可以忽略。
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class EnergyVAD:
+    """基于分帧能量的语音活动检测
+
+    每帧的能量（dBFS）同时高于绝对阈值和噪声底噪加上余量时视为语音帧，
+    噪声底噪取所有帧能量的低分位数，相对阈值不超过峰值减去余量。
+
+    Attributes:
+        sampling_rate: 采样率
+        frame_ms: 帧长（毫秒）
+        threshold_db: 语音帧的最低能量（dBFS）
+        margin_db: 语音帧需要高出噪声底噪的分贝数
+        min_speech_ms: 语音帧总时长低于该值时视为没有说话
+        padding_ms: 裁剪时在语音两端保留的时长
+    """
+
+    def __init__(
+        self,
+        sampling_rate: int = 16000,
+        frame_ms: int = 30,
+        threshold_db: float = -45.0,
+        margin_db: float = 10.0,
+        min_speech_ms: int = 250,
+        padding_ms: int = 200
+    ):
+        self.sampling_rate = sampling_rate
+        self.frame_ms = frame_ms
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.min_speech_ms = min_speech_ms
+        self.padding_ms = padding_ms
+
+    @property
+    def frame_length(self) -> int:
+        """每帧的采样点数"""
+        return max(1, self.sampling_rate * self.frame_ms // 1000)
+
+    def _frame_energies(self, audio: np.ndarray) -> np.ndarray:
+        """计算每帧的能量（dBFS），不足一帧的尾部忽略"""
+        frame_length = self.frame_length
+        frame_count = len(audio) // frame_length
+        frames = audio[:frame_count * frame_length].astype(np.float32).reshape(frame_count, frame_length)
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        return 20 * np.log10(np.maximum(rms, 1e-10))
+
+    def speech_span(self, audio: np.ndarray) -> Optional[Tuple[int, int]]:
+        """
+        找出音频中语音所在的采样点范围
+
+        Args:
+            audio: 取值在[-1, 1]之间的单声道音频
+
+        Returns:
+            加上两端余量后的 (起始采样点, 结束采样点)，没有语音时返回None
+        """
+        energies = self._frame_energies(audio)
+        if energies.size == 0:
+            return None
+
+        noise_floor = np.percentile(energies, 10)
+        # 整段都在说话时低分位数就是语音本身，此时改为相对峰值判断
+        relative_threshold = min(noise_floor + self.margin_db, energies.max() - self.margin_db)
+        speech = energies > max(self.threshold_db, relative_threshold)
+        if speech.sum() * self.frame_ms < self.min_speech_ms:
+            return None
+
+        frame_length = self.frame_length
+        padding = self.sampling_rate * self.padding_ms // 1000
+        speech_frames = np.flatnonzero(speech)
+        start = max(0, speech_frames[0] * frame_length - padding)
+        end = min(len(audio), (speech_frames[-1] + 1) * frame_length + padding)
+        return int(start), int(end)
@@ -0,0 +1,279 @@
+"""
+Whisper模型分级
+
+不同大小的Whisper模型在速度和准确度之间取舍：短句用 tiny/base 就足够准确而且很快，
+长录音或识别置信度低的录音值得交给更大的模型。这里管理多个模型：
+- WhisperModelManager 按需加载模型，在内存预算内保留最近使用的模型，超出预算时卸载最久未使用的
+- TieredRecognizer 与 WhisperRecognizer 接口相同，每次识别按录音时长选择模型，
+  置信度低时用更大的模型重新识别；也可以由请求直接指定 fast/default/accurate
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.config import PROJECT_ROOT, WhisperSettings
+from app.speech_recognition import Transcription, WhisperRecognizer
+
+logger = logging.getLogger(__name__)
+
+# 各个大小的模型在int8量化下大约占用的内存（MB），未列出的模型按模型文件大小估计
+MODEL_MEMORY_MB = {
+    "tiny": 80,
+    "base": 150,
+    "small": 500,
+    "medium": 1500,
+    "large": 3100,
+    "large-v2": 3100,
+    "large-v3": 3100,
+}
+
+# 从快到慢的模型分级
+TIERS = ("fast", "default", "accurate")
+
+
+def tier_model_path(settings: WhisperSettings, model: str) -> Path:
+    """
+    模型的本地目录：默认模型在 whisper_path，其它模型在 tier_path 中按模型名展开
+
+    Args:
+        settings: Whisper配置
+        model: 模型大小，例如 base
+
+    Returns:
+        模型目录
+    """
+    if model == settings.model:
+        return PROJECT_ROOT / settings.whisper_path
+    return PROJECT_ROOT / settings.tier_path.format(model=model)
+
+
+def estimate_memory_mb(model: str, path: Path) -> int:
+    """估计模型加载后占用的内存（MB）"""
+    if model in MODEL_MEMORY_MB:
+        return MODEL_MEMORY_MB[model]
+    model_file = path / "model.bin"
+    return int(model_file.stat().st_size / 1024 / 1024) if model_file.exists() else 0
+
+
+class WhisperModelManager:
+    """在内存预算内按需加载和卸载Whisper模型
+
+    默认模型启动时加载并且不会被卸载；正在识别的模型也不会被卸载，
+    这时会暂时超出预算，等识别结束后再卸载。
+
+    Attributes:
+        settings: Whisper配置
+        memory_budget_mb: 已加载模型的内存预算（MB），0表示不限制
+    """
+
+    def __init__(self, settings: WhisperSettings):
+        self.settings = settings
+        self.memory_budget_mb = settings.memory_budget_mb
+        self._models: "OrderedDict[str, WhisperRecognizer]" = OrderedDict()
+        self._memory: Dict[str, int] = {}
+        self._in_use: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # 同一个模型只加载一次，不同模型可以同时加载
+        self._loading: Dict[str, threading.Lock] = {}
+
+        self.get(settings.model)
+        if settings.preload_tiers:
+            for model in self.tier_models().values():
+                self.get(model)
+
+    def tier_models(self) -> Dict[str, str]:
+        """
+        配置的模型分级
+
+        Returns:
+            分级名称到模型大小的映射，未配置的分级不包含在内
+        """
+        tiers = {
+            "fast": self.settings.fast_model,
+            "default": self.settings.model,
+            "accurate": self.settings.accurate_model,
+        }
+        return {tier: model for tier, model in tiers.items() if model}
+
+    @property
+    def loaded(self) -> List[str]:
+        """已加载的模型，按最近使用排序"""
+        with self._lock:
+            return list(self._models)
+
+    def get(self, model: str) -> WhisperRecognizer:
+        """
+        获取模型，没有加载时先加载，必要时卸载最久未使用的模型
+
+        Args:
+            model: 模型大小
+
+        Returns:
+            该模型的识别器
+        """
+        with self._lock:
+            recognizer = self._models.get(model)
+            if recognizer is not None:
+                self._models.move_to_end(model)
+                return recognizer
+            loading = self._loading.setdefault(model, threading.Lock())
+
+        with loading:
+            with self._lock:
+                recognizer = self._models.get(model)
+                if recognizer is not None:
+                    return recognizer
+            path = tier_model_path(self.settings, model)
+            recognizer = WhisperRecognizer(
+                str(path),
+                device=self.settings.device,
+                compute_type=self.settings.compute_type,
+                cpu_threads=self.settings.cpu_threads,
+                num_workers=self.settings.num_workers
+            )
+            with self._lock:
+                self._models[model] = recognizer
+                self._memory[model] = estimate_memory_mb(model, path)
+                self._evict(keep=model)
+            logger.info(f"Loaded Whisper model {model}, loaded models: {', '.join(self._models)}")
+            return recognizer
+
+    @contextmanager
+    def use(self, model: str) -> Iterator[WhisperRecognizer]:
+        """
+        识别期间持有模型，保证它不会被卸载
+
+        Args:
+            model: 模型大小
+
+        Yields:
+            该模型的识别器
+        """
+        # 先标记为使用中，加载时不会因为超出预算而卸载它
+        with self._lock:
+            self._in_use[model] = self._in_use.get(model, 0) + 1
+        try:
+            yield self.get(model)
+        finally:
+            with self._lock:
+                self._in_use[model] -= 1
+                self._evict()
+
+    def _evict(self, keep: Optional[str] = None):
+        """卸载最久未使用的模型直到不超过预算，keep为刚加载的模型，调用时需要持有锁"""
+        if self.memory_budget_mb <= 0:
+            return
+        for model in list(self._models):
+            if sum(self._memory[name] for name in self._models) <= self.memory_budget_mb:
+                return
+            if model in (self.settings.model, keep) or self._in_use.get(model, 0) > 0:
+                continue
+            del self._models[model]
+            del self._memory[model]
+            logger.info(f"Unloaded Whisper model {model} to stay within {self.memory_budget_mb}MB")
+
+
+class TieredRecognizer:
+    """按录音时长和识别置信度选择模型的识别器
+
+    接口与WhisperRecognizer相同，可以直接交给SessionLanguage和SpeakingCoach使用
+
+    Attributes:
+        manager: 模型管理器
+        fast_max_duration: 不超过该时长（秒）的录音使用fast模型
+        accurate_min_duration: 不短于该时长（秒）的录音直接使用accurate模型，0表示不按时长选择
+        escalate_logprob: 识别的平均对数概率低于该值时，用大一级的模型重新识别
+    """
+
+    def __init__(self, manager: WhisperModelManager):
+        self.manager = manager
+        settings = manager.settings
+        self.fast_max_duration = settings.fast_max_duration
+        self.accurate_min_duration = settings.accurate_min_duration
+        self.escalate_logprob = settings.escalate_logprob
+        self._default = manager.get(settings.model)
+
+    @property
+    def model_id(self) -> str:
+        """区分识别结果缓存的标识，包含所有分级的模型"""
+        return "tiered:" + ",".join(f"{tier}={model}" for tier, model in self.manager.tier_models().items())
+
+    @property
+    def sampling_rate(self) -> int:
+        return self._default.sampling_rate
+
+    def decode(self, audio_bytes: bytes) -> np.ndarray:
+        return self._default.decode(audio_bytes)
+
+    def detect_language(self, audio: Union[bytes, np.ndarray]) -> Tuple[str, float]:
+        # 语言检测只看开头30秒，默认模型已经足够
+        return self._default.detect_language(audio)
+
+    def select_tier(self, duration: float) -> str:
+        """
+        按录音时长选择分级
+
+        Args:
+            duration: 录音时长（秒）
+
+        Returns:
+            分级名称
+        """
+        tiers = self.manager.tier_models()
+        if "fast" in tiers and duration <= self.fast_max_duration:
+            return "fast"
+        if "accurate" in tiers and 0 < self.accurate_min_duration <= duration:
+            return "accurate"
+        return "default"
+
+    def _larger_tier(self, tier: str) -> Optional[str]:
+        """比tier大一级的已配置分级，中间的分级未配置时跳过它"""
+        tiers = self.manager.tier_models()
+        larger = [name for name in TIERS[TIERS.index(tier) + 1:] if name in tiers]
+        return larger[0] if larger else None
+
+    def transcribe(
+        self,
+        audio: Union[bytes, np.ndarray],
+        word_timestamps: bool = True,
+        language: Optional[str] = None,
+        tier: Optional[str] = None
+    ) -> Transcription:
+        """
+        选择模型识别音频，置信度低时用大一级的模型重新识别
+
+        Args:
+            audio: 音频字节数据或已解码的音频
+            word_timestamps: 是否计算逐词时间戳和置信度
+            language: 指定语言时跳过语言检测，为None时自动检测
+            tier: 指定分级（fast/default/accurate），为None时按录音时长选择；指定的分级不会再升级
+
+        Returns:
+            识别结果
+        """
+        if isinstance(audio, bytes):
+            audio = self.decode(audio)
+        tiers = self.manager.tier_models()
+        if tier is not None and tier not in TIERS:
+            raise ValueError(f"不支持的识别分级: {tier}，可用选项: {', '.join(TIERS)}")
+        chosen = tier if tier in tiers else self.select_tier(len(audio) / self.sampling_rate)
+
+        with self.manager.use(tiers[chosen]) as recognizer:
+            transcription = recognizer.transcribe(audio, word_timestamps=word_timestamps, language=language)
+        if tier is not None:
+            return transcription
+
+        quality = transcription.mean_logprob
+        larger = self._larger_tier(chosen)
+        if quality is None or quality >= self.escalate_logprob or larger is None:
+            return transcription
+
+        logger.info(f"Low confidence ({quality:.2f}) with {tiers[chosen]}, retrying with {tiers[larger]}")
+        with self.manager.use(tiers[larger]) as recognizer:
+            return recognizer.transcribe(audio, word_timestamps=word_timestamps, language=language)
@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import FastAPI, BackgroundTasks, HTTPException, Body
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import router
@@ -21,6 +23,45 @@ app.include_router(router, prefix="/api")
 
 
 
+async def warm_up_browsers():
+    """预热浏览器池，浏览器启动失败不影响服务，第一次诊断时再启动"""
+    from app.agents.browser_pool import browser_pool
+    from app.logger import logger
+    try:
+        await browser_pool.warm_up(browser_pool.max_idle)
+    except Exception as e:
+        logger.warning(f"预热浏览器失败: {e}")
+
+
+@app.on_event("startup")
+async def startup():
+    """启动配置文件热加载，按配置在后台预热浏览器池"""
+    from app.config import config
+    if config.hot_reload.enabled:
+        config.start_watching()
+    # 浏览器池绑定在服务的事件循环上，在这里预热；不阻塞启动
+    app.state.browser_warm_up = None
+    if config.browser.warm_up:
+        app.state.browser_warm_up = asyncio.create_task(warm_up_browsers())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """关闭浏览器池中的浏览器、搜索使用的HTTP客户端和共享的LLM客户端"""
+    from app.agents.browser_pool import browser_pool
+    from app.agents.search_fetcher import search_fetcher
+    from app.llm.clients import client_registry
+    if app.state.browser_warm_up is not None:
+        app.state.browser_warm_up.cancel()
+        await asyncio.gather(app.state.browser_warm_up, return_exceptions=True)
+    await browser_pool.close()
+    if search_fetcher is not None:
+        await search_fetcher.close()
+    await client_registry.aclose()
+    from app.config import config
+    config.stop_watching()
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to PolyVoice API"} 
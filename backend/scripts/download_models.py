@@ -22,9 +22,16 @@ WHISPER_MODELS = {
 }
 
 def load_config():
+    default_config = {
+        "whisper_model": "base",
+        "whisper_model_local": "models/whisper",
+        "whisper_tiers": [],
+        "whisper_tier_path": "models/whisper-{model}",
+        "tts_model_local": "models/tts",
+        "tts_model": "tts_models/multilingual/multi-dataset/xtts_v2"
+    }
     try:
-        config_path = Path(__file__).parent / "config" / "config.toml"
-        default_config = {"whisper_model": "base", "whisper_model_local": "models/whisper", "tts_model_local": "models/tts", "tts_model": "tts_models/multilingual/multi-dataset/xtts_v2"}
+        config_path = Path(__file__).resolve().parent.parent / "config" / "config.toml"
 
         if not config_path.exists():
             return default_config
@@ -32,12 +39,51 @@ def load_config():
         with open(config_path, "rb") as f:
             config = tomllib.load(f)
 
-        return {"whisper_model": config["whisper"]["model"], "whisper_model_local": config["whisper"]["whisper_path"], "tts_model_local": config["tts"]["model_path"], "tts_model": config["tts"]["model"]}
+        whisper = config["whisper"]
+        # fast和accurate分级的模型，与 [whisper] model 相同或未配置时不需要单独下载
+        tiers = [
+            model for model in (whisper.get("fast_model", ""), whisper.get("accurate_model", ""))
+            if model and model != whisper["model"]
+        ]
+        return {
+            "whisper_model": whisper["model"],
+            "whisper_model_local": whisper["whisper_path"],
+            "whisper_tiers": tiers,
+            "whisper_tier_path": whisper.get("tier_path", default_config["whisper_tier_path"]),
+            "tts_model_local": config["tts"]["model_path"],
+            "tts_model": config["tts"]["model"]
+        }
     except FileNotFoundError:
         return default_config
     except KeyError as e:
         return default_config
 
+def download_whisper_model(whisper_model: str, output_dir: Path):
+    """下载Whisper模型，目录中已有模型时跳过
+    
+    Args:
+        whisper_model: Whisper模型大小
+        output_dir: 模型目录
+    """
+    if whisper_model not in WHISPER_MODELS:
+        raise ValueError(f"不支持的Whisper模型: {whisper_model}，可用选项: {', '.join(WHISPER_MODELS)}")
+    if (output_dir / "model.bin").exists():
+        logger.info(f"Whisper模型 {whisper_model} 已存在: {output_dir}")
+        return
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    logger.info(f"下载Whisper模型: {whisper_model}...")
+    try:
+        whisper_model_path = download_model(
+            WHISPER_MODELS[whisper_model],
+            output_dir=str(output_dir),
+            local_files_only=False
+        )
+        logger.info(f"Whisper模型已下载到: {whisper_model_path}")
+    except Exception as e:
+        logger.error(f"下载Whisper模型失败: {str(e)}")
+        raise RuntimeError(f"Whisper模型下载失败: {str(e)}")
+
 def download_models():
     """下载所有需要的模型到本地
     
@@ -53,10 +99,11 @@ def download_models():
     PROJECT_PATH = Path(__file__).resolve().parent.parent
     tts_model_dir = PROJECT_PATH / config["tts_model_local"]
     whisper_model_dir = PROJECT_PATH / config["whisper_model_local"]
-    # 获取Whisper模型
+    # 获取Whisper模型，分级模型在启动前校验
     whisper_model = config["whisper_model"]
-    if whisper_model not in WHISPER_MODELS:
-        raise ValueError(f"不支持的Whisper模型: {whisper_model}，可用选项: {', '.join(WHISPER_MODELS)}")
+    for model in [whisper_model, *config["whisper_tiers"]]:
+        if model not in WHISPER_MODELS:
+            raise ValueError(f"不支持的Whisper模型: {model}，可用选项: {', '.join(WHISPER_MODELS)}")
     
     # 确保模型目录存在
     tts_model_dir.mkdir(parents=True, exist_ok=True)
@@ -78,6 +125,10 @@ def download_models():
     #     logger.error(f"下载Whisper模型失败: {str(e)}")
     #     raise RuntimeError(f"Whisper模型下载失败: {str(e)}")
     
+    # fast/accurate分级的模型下载到 tier_path
+    for model in config["whisper_tiers"]:
+        download_whisper_model(model, PROJECT_PATH / config["whisper_tier_path"].format(model=model))
+    
     # 使用ModelManager下载TTS模型
     manager = ModelManager()
     
@@ -0,0 +1,38 @@
+"""
+音频缓存的测试
+"""
+
+from app import audio_cache
+from app.audio_cache import AudioCache
+
+
+def test_evicts_least_recently_used():
+    cache = AudioCache(max_bytes=4)
+    cache.put("a", b"aa")
+    cache.put("b", b"bb")
+    cache.get("a")
+    cache.put("c", b"cc")
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+
+def test_pinned_audio_survives_until_fetched():
+    cache = AudioCache(max_bytes=4)
+    cache.put("a", b"aa", pin_seconds=60)
+    cache.put("b", b"bb")
+    cache.put("c", b"cc")
+    assert "a" in cache and "b" not in cache
+
+    cache.unpin("a")
+    cache.put("d", b"dd")
+    assert "a" not in cache
+
+
+def test_pin_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(audio_cache.time, "monotonic", lambda: now[0])
+    cache = AudioCache(max_bytes=4)
+    cache.put("a", b"aa", pin_seconds=10)
+    cache.put("b", b"bb")
+    now[0] = 111.0
+    cache.put("c", b"cc")
+    assert "a" not in cache and "b" in cache
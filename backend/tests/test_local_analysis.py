@@ -0,0 +1,60 @@
+"""
+本地语法规则的测试
+"""
+
+import pytest
+
+from app.local_analysis import LocalAnalyzer
+
+
+@pytest.fixture
+def analyzer():
+    return LocalAnalyzer()
+
+
+@pytest.mark.parametrize("text", [
+    # 复数
+    "I have two black cats.",
+    "She lost my two teeth.",
+    "Prices went up ten percent.",
+    "Let's meet at ten thirty.",
+    "Both children are here.",
+    "I saw three deer in the park.",
+    # 冠词
+    "I paid a euro for it.",
+    "He had an MRI yesterday.",
+    "She went to a university.",
+    "It was an honest mistake.",
+    "I joined a UN program.",
+    "He works for an NGO.",
+    # 主谓一致
+    "Does she have a dog?",
+    "What does he do on weekends?",
+    "If he were rich, he would travel.",
+    # 比较级
+    "Can I have more paper?",
+    "I would like more butter.",
+    "We need more water.",
+])
+def test_correct_sentences_have_no_suggestions(analyzer, text):
+    assert analyzer.check_grammar(text) == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I have two cat.", "'two cats'"),
+    ("I saw 5 dog in the street.", "'5 dogs'"),
+    ("I ate a apple.", "'an apple'"),
+    ("I need a MRI scan.", "'an MRI'"),
+    ("She is an teacher.", "'a teacher'"),
+    ("He is an UFO fan.", "'a UFO'"),
+    ("She have a dog.", "'has'"),
+    ("They is late.", "'are'"),
+    ("I is happy.", "'I am'"),
+    ("I didn't went there.", "'didn't go'"),
+    ("My sister is more taller than me.", "'taller'"),
+    ("It is the the best.", "'the' is repeated"),
+])
+def test_common_mistakes_are_reported(analyzer, text, expected):
+    suggestions = analyzer.check_grammar(text)
+    assert len(suggestions) == 1
+    assert expected in suggestions[0]
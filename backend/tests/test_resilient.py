@@ -0,0 +1,46 @@
+"""
+LLM重试判断的测试
+"""
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from app.llm.resilient import CircuitOpenError, is_retryable
+
+REQUEST = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+
+
+def status_error(status: int) -> openai.APIStatusError:
+    return openai.APIStatusError("error", response=httpx.Response(status, request=REQUEST), body=None)
+
+
+@pytest.mark.parametrize("error", [
+    TimeoutError(),
+    asyncio.TimeoutError(),
+    ConnectionResetError(),
+    openai.APITimeoutError(request=REQUEST),
+    openai.APIConnectionError(request=REQUEST),
+    httpx.ReadError("connection reset"),
+    status_error(429),
+    status_error(500),
+    status_error(503),
+])
+def test_transient_errors_are_retried(error):
+    assert is_retryable(error)
+
+
+@pytest.mark.parametrize("error", [
+    status_error(400),
+    status_error(401),
+    status_error(404),
+    status_error(422),
+    CircuitOpenError("open"),
+    TypeError("bad argument"),
+    KeyError("choices"),
+    ValueError("bad value"),
+])
+def test_other_errors_are_not_retried(error):
+    assert not is_retryable(error)
@@ -0,0 +1,152 @@
+"""
+搜索结果直连抓取的测试
+
+用本地的HTML夹具服务器代替B站搜索页
+"""
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from app.agents import browser_agent
+from app.agents.search_fetcher import BilibiliSearchFetcher
+from app.config import config
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+# 关键词到夹具页面的映射，其它关键词返回完整的结果页
+PAGES = {
+    "few": "bilibili_search_few.html",
+}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        keyword = parse_qs(url.query).get("keyword", [""])[0]
+        if url.path != "/all" or keyword == "error":
+            self.send_error(500)
+            return
+        body = (FIXTURES / PAGES.get(keyword, "bilibili_search.html")).read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def fixture_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def search(fetcher: BilibiliSearchFetcher, query: str):
+    async def run():
+        try:
+            return await fetcher.search(query)
+        finally:
+            await fetcher.close()
+    return asyncio.run(run())
+
+
+def test_parses_video_cards(fixture_server):
+    results = search(BilibiliSearchFetcher(base_url=fixture_server), "英语发音")
+    assert results == [
+        {
+            "title": "英语音标 th 的正确发音",
+            # 省略协议的链接沿用搜索页的协议
+            "url": "http://www.bilibili.com/video/BV1xx411c7mA",
+            "snippet": "UP主: 口语老师A",
+        },
+        {
+            "title": "连读和弱读 & 语调练习",
+            "url": "https://www.bilibili.com/video/BV1yy411c7mB/",
+            "snippet": "UP主: 口语老师B",
+        },
+        {
+            "title": "每天十分钟纠正发音",
+            "url": f"{fixture_server}/video/BV1zz411c7mC",
+            "snippet": "UP主: 口语老师C",
+        },
+    ]
+
+
+def test_limits_results(fixture_server):
+    assert len(search(BilibiliSearchFetcher(base_url=fixture_server, max_results=2), "英语发音")) == 2
+
+
+def test_http_error_returns_empty(fixture_server):
+    assert search(BilibiliSearchFetcher(base_url=fixture_server), "error") == []
+
+
+@pytest.fixture
+def agent(fixture_server, monkeypatch):
+    """直连搜索指向夹具服务器、不使用缓存的浏览器智能体，记录回退到浏览器的任务"""
+    fetcher = BilibiliSearchFetcher(base_url=fixture_server)
+    monkeypatch.setattr(browser_agent, "search_fetcher", fetcher)
+    monkeypatch.setattr(browser_agent, "search_cache", None)
+    monkeypatch.setattr(
+        config,
+        "_config",
+        config._config.model_copy(update={
+            "search_fetcher": config.search_fetcher.model_copy(update={"min_results": 2})
+        })
+    )
+
+    agent = browser_agent.BrowserAgent()
+    agent.browser_tasks = []
+
+    async def run_browser_task(task):
+        agent.browser_tasks.append(task)
+        return [{"title": "浏览器结果", "url": "https://www.bilibili.com/video/BV1bb411c7mF", "snippet": ""}]
+
+    monkeypatch.setattr(agent, "_run_browser_task", run_browser_task)
+    return agent
+
+
+def agent_search(agent, keywords):
+    async def run():
+        try:
+            return await agent.search(keywords)
+        finally:
+            await browser_agent.search_fetcher.close()
+    return asyncio.run(run())
+
+
+def test_enough_results_skip_browser(agent):
+    results = agent_search(agent, ["英语发音"])
+    assert len(results) == 3
+    assert agent.browser_tasks == []
+
+
+def test_too_few_results_are_merged_with_browser(agent):
+    results = agent_search(agent, ["few"])
+    assert [result["title"] for result in results] == ["只有一个结果", "浏览器结果"]
+    assert len(agent.browser_tasks) == 1
+
+
+def test_browser_failure_keeps_fetched_results(agent, monkeypatch):
+    async def run_browser_task(task):
+        raise RuntimeError("browser crashed")
+
+    monkeypatch.setattr(agent, "_run_browser_task", run_browser_task)
+    assert [result["title"] for result in agent_search(agent, ["few"])] == ["只有一个结果"]
+
+
+def test_unparsable_browser_output_keeps_fetched_results(agent, monkeypatch):
+    async def run_browser_task(task):
+        return "no results found"
+
+    monkeypatch.setattr(agent, "_run_browser_task", run_browser_task)
+    assert [result["title"] for result in agent_search(agent, ["few"])] == ["只有一个结果"]
@@ -0,0 +1,117 @@
+"""
+语音合成文本规范化的测试
+"""
+
+import pytest
+
+from app.text_normalizer import StreamingNormalizer, get_normalizer, markup_balanced
+
+
+@pytest.fixture
+def normalizer():
+    return get_normalizer("en")
+
+
+def feed_all(normalizer, fragments):
+    """逐个片段喂给StreamingNormalizer，返回流式输出的句子和flush输出的句子"""
+    streaming = StreamingNormalizer(normalizer)
+    sentences = []
+    for fragment in fragments:
+        sentences.extend(streaming.feed(fragment))
+    return sentences, streaming.flush()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("**Great job. Keep going!**", True),
+    ("**Great job.", False),
+    ("*Nice. Really", False),
+    ("`a. b", False),
+    ("[Read this. Then", False),
+    ("2 * 3 is six.", True),
+    ("* item one.", True),
+    ("***Wow.***", True),
+])
+def test_markup_balanced(text, expected):
+    assert markup_balanced(text) is expected
+
+
+def test_streaming_does_not_cut_inside_bold(normalizer):
+    sentences, rest = feed_all(normalizer, ["**Great job. Keep going!** Next one. "])
+    assert sentences == ["Great job.", "Keep going!", "Next one."]
+    assert rest == []
+
+
+def test_streaming_waits_for_closing_delimiter(normalizer):
+    streaming = StreamingNormalizer(normalizer)
+    assert streaming.feed("**Great job. ") == []
+    assert streaming.feed("Keep going!** ") == ["Great job.", "Keep going!"]
+
+
+def test_streaming_character_by_character(normalizer):
+    sentences, rest = feed_all(normalizer, "**Great job. Keep going!** Next one. And *more. Text* here. Done")
+    assert sentences == ["Great job.", "Keep going!", "Next one.", "And more.", "Text here."]
+    assert rest == ["Done"]
+
+
+def test_streaming_does_not_cut_after_list_number(normalizer):
+    sentences, rest = feed_all(normalizer, "Tips:\n1. Try again.\n2. Slow down. ")
+    assert sentences == ["Tips: Try again.", "Slow down."]
+    assert rest == []
+
+
+def test_streaming_ignores_spaced_asterisks(normalizer):
+    streaming = StreamingNormalizer(normalizer)
+    assert streaming.feed("2 * 3 is six. ") == ["two * three is six."]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("In 1990 we met.", "In nineteen ninety we met."),
+    ("Since 2024, yes.", "Since twenty twenty-four, yes."),
+    ("Room 1234 is free.", "Room one thousand two hundred thirty-four is free."),
+    ("Go to room 2010 now.", "Go to room two thousand ten now."),
+    ("See page 1850.", "See page one thousand eight hundred fifty."),
+    ("Flight no. 1999 left.", "Flight no. one thousand nine hundred ninety-nine left."),
+    ("Call 555-1234 now.", "Call five five five, one two three four now."),
+    ("1500 people came.", "one thousand five hundred people came."),
+    ("From 1990-1995 it rained.", "From nineteen ninety to nineteen ninety-five it rained."),
+    ("It was built in 1066 AD.", "It was built in ten sixty-six AD."),
+    ("Read pages 100-200.", "Read pages one hundred to two hundred."),
+    ("The score was 3-2.", "The score was three-two."),
+])
+def test_year_rule_context(normalizer, text, expected):
+    assert normalizer.normalize(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Visit St. Louis today.", "Visit Saint Louis today."),
+    ("Happy St. Patrick's Day!", "Happy Saint Patrick's Day!"),
+    ("Main St. is busy.", "Main Street is busy."),
+    ("Turn left on Baker St., then stop.", "Turn left on Baker Street, then stop."),
+    ("I went to St. Mary's.", "I went to Saint Mary's."),
+    ("Live on Main St. My friend lives there.", "Live on Main Street. My friend lives there."),
+])
+def test_saint_and_street(normalizer, text, expected):
+    assert normalizer.normalize(text) == expected
+
+
+def test_streaming_keeps_sentence_after_street(normalizer):
+    sentences, rest = feed_all(normalizer, "Live on Main St. My friend lives there. ")
+    assert sentences == ["Live on Main Street.", "My friend lives there."]
+    assert rest == []
+
+
+def test_streaming_waits_for_saint_name(normalizer):
+    sentences, rest = feed_all(normalizer, "Visit St. Louis today. ")
+    assert sentences == ["Visit Saint Louis today."]
+    assert rest == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("It is -5 outside.", "It is minus five outside."),
+    ("Prices fell -2.5% today.", "Prices fell minus two point five percent today."),
+    ("Use -0.5 here.", "Use minus zero point five here."),
+    ("It is 10-5 now.", "It is ten-five now."),
+    ("5 - 3 is two.", "five - three is two."),
+])
+def test_negative_numbers(normalizer, text, expected):
+    assert normalizer.normalize(text) == expected
@@ -0,0 +1,70 @@
+"""
+语音合成调度的测试
+
+用记录调用顺序的假合成器代替XTTS
+"""
+
+import asyncio
+
+from app.tts_scheduler import TTSScheduler
+
+
+class FakeSynthesizer:
+    """每次合成耗时固定，记录开始顺序和同时在合成的后台任务数"""
+
+    def __init__(self, seconds: float = 0.05):
+        self.seconds = seconds
+        self.started = []
+        self.active = set()
+        self.max_background = 0
+
+    async def synthesize(self, text: str, language: str = "en") -> bytes:
+        self.started.append(text)
+        self.active.add(text)
+        self.max_background = max(self.max_background, sum(item.startswith("bg") for item in self.active))
+        await asyncio.sleep(self.seconds)
+        self.active.discard(text)
+        return text.encode()
+
+
+def test_first_sentences_go_first():
+    synthesizer = FakeSynthesizer()
+
+    async def run():
+        scheduler = TTSScheduler(synthesizer)
+        first = [scheduler.submit(f"a{index}", "en", "a", index, turn_started_at=1.0) for index in range(3)]
+        second = [scheduler.submit(f"b{index}", "en", "b", index, turn_started_at=2.0) for index in range(2)]
+        return await asyncio.gather(*first, *second)
+
+    assert asyncio.run(run()) == [b"a0", b"a1", b"a2", b"b0", b"b1"]
+    assert synthesizer.started == ["a0", "b0", "a1", "b1", "a2"]
+
+
+def test_one_background_job_at_a_time():
+    synthesizer = FakeSynthesizer()
+
+    async def run():
+        scheduler = TTSScheduler(synthesizer, workers=2)
+        background = [scheduler.submit(f"bg{index}", "en", "x", index, background=True) for index in range(3)]
+        await asyncio.sleep(0.01)
+        # 另一个工作协程没有被预合成占住，前台句子立即开始合成
+        foreground = scheduler.submit("fg", "en", "y", 0)
+        await foreground
+        return await asyncio.gather(*background)
+
+    assert asyncio.run(run()) == [b"bg0", b"bg1", b"bg2"]
+    assert synthesizer.max_background == 1
+    assert synthesizer.started[:2] == ["bg0", "fg"]
+
+
+def test_cancelling_one_session_keeps_shared_job():
+    synthesizer = FakeSynthesizer()
+
+    async def run():
+        scheduler = TTSScheduler(synthesizer)
+        first = scheduler.submit("hello", "en", "a", 0)
+        second = scheduler.submit("hello", "en", "b", 0)
+        scheduler.cancel_session("a")
+        return first.cancelled(), await second
+
+    assert asyncio.run(run()) == (True, b"hello")
@@ -73,6 +73,7 @@ export class ApiService {
               onTextReceived(data.data as string);
               break;
             case "audio":
+              // 每句回复一个audio事件，按到达顺序排队播放
               onAudioReceived(data.audio || data.data as string, data.format || "mp3");
               break;
             case "error":